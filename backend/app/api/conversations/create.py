@@ -1,6 +1,7 @@
 from app.api.conversations.router import conversations_router
 from app.core.database import get_db
 from app.core.dependencies import get_current_user, security
+from app.core.websocket import connection_manager
 from app.models.conversation_participants import ConversationParticipant
 from app.models.conversations import Conversation
 from app.models.users import User
@@ -126,4 +127,9 @@ async def create_conversation(
         .options(selectinload(Conversation.participants))
     )
     conv = result.scalars().one()
+
+    for participant in conv.participants:
+        await connection_manager.join_conversation(
+            str(conv.id), str(participant.user_id)
+        )
     return ConversationResponse.model_validate(conv)
@@ -3,6 +3,8 @@ from uuid import UUID
 from app.api.conversations.router import conversations_router
 from app.core.database import get_db
 from app.core.dependencies import get_current_user, security
+from app.core.websocket import connection_manager
+from app.models.conversation_participants import ConversationParticipant
 from app.models.conversations import Conversation
 from app.schemas.base import GenericMessageResponse, HTTPErrorResponse
 from app.utils.require_participant import require_participant
@@ -47,8 +49,20 @@ async def delete_or_leave_conversation(
 
     if conv.created_by == current_user.id and conv.type == "group":
         # Creator deletes the whole conversation
+        members_result = await db.execute(
+            select(ConversationParticipant.user_id).where(
+                ConversationParticipant.conversation_id == conversation_id
+            )
+        )
+        member_ids = [row[0] for row in members_result.fetchall()]
+
         await db.delete(conv)
         await db.commit()
+
+        for member_id in member_ids:
+            await connection_manager.leave_conversation(
+                str(conversation_id), str(member_id)
+            )
         return GenericMessageResponse(
             message="Conversation deleted successfully."
         )
@@ -56,4 +70,8 @@ async def delete_or_leave_conversation(
         # Other participants just leave
         await db.delete(participant)
         await db.commit()
+
+        await connection_manager.leave_conversation(
+            str(conversation_id), str(current_user.id)
+        )
         return GenericMessageResponse(message="Left conversation successfully.")
@@ -3,6 +3,7 @@ from uuid import UUID
 from app.api.conversations.router import conversations_router
 from app.core.database import get_db
 from app.core.dependencies import get_current_user, security
+from app.core.websocket import connection_manager
 from app.models.conversation_participants import ConversationParticipant
 from app.models.conversations import Conversation
 from app.models.users import User
@@ -88,6 +89,9 @@ async def add_participants(
     await db.commit()
     for p in new_participants:
         await db.refresh(p)
+        await connection_manager.join_conversation(
+            str(conversation_id), str(p.user_id)
+        )
 
     return [ParticipantResponse.model_validate(p) for p in new_participants]
 
@@ -150,4 +154,8 @@ async def remove_participant(
 
     await db.delete(target)
     await db.commit()
+
+    await connection_manager.leave_conversation(
+        str(conversation_id), str(user_id)
+    )
     return GenericMessageResponse(message="Participant removed successfully.")
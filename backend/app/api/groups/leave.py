@@ -3,6 +3,7 @@ from uuid import UUID
 from app.api.groups.router import groups_router
 from app.core.database import get_db
 from app.core.dependencies import get_current_user, security
+from app.core.websocket import connection_manager
 from app.models.conversation_participants import ConversationParticipant
 from app.models.conversations import Conversation
 from app.schemas.base import GenericMessageResponse, HTTPErrorResponse
@@ -65,6 +66,9 @@ async def leave_group(
             # Last person — delete the entire conversation
             await db.delete(conv)
             await db.commit()
+            await connection_manager.leave_conversation(
+                str(group_id), str(current_user.id)
+            )
             return GenericMessageResponse(
                 message="Left group successfully. Group deleted."
             )
@@ -90,4 +94,8 @@ async def leave_group(
 
     await db.delete(my_participant)
     await db.commit()
+
+    await connection_manager.leave_conversation(
+        str(group_id), str(current_user.id)
+    )
     return GenericMessageResponse(message="Left group successfully.")
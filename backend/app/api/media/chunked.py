@@ -114,11 +114,12 @@ async def upload_chunk(
 
     if attachment_data is None:
         # Count received chunks to report progress
-        chunks_received = 0
-        for i in range(total_chunks):
-            val = await redis.get(f"upload:{upload_id}:chunk:{i}")
-            if val:
-                chunks_received += 1
+        async with redis.batch() as batch:
+            chunks = [
+                batch.exists(f"upload:{upload_id}:chunk:{i}")
+                for i in range(total_chunks)
+            ]
+        chunks_received = sum(chunk.value for chunk in chunks)
 
         return ChunkedUploadStatus(
             upload_id=upload_id,
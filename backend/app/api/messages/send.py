@@ -4,10 +4,11 @@ from uuid import UUID
 from app.api.messages.router import messages_router
 from app.core.database import get_db
 from app.core.dependencies import get_current_user, security
-from app.models.conversations import Conversation
+from app.core.websocket import connection_manager
 from app.models.messages import Message
 from app.schemas.base import HTTPErrorResponse
 from app.schemas.messages import MessageCreate, MessageResponse
+from app.utils.allocate_seq import allocate_seq
 from app.utils.require_participant import require_participant
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials
@@ -52,9 +53,13 @@ async def send_message(
 
     now = datetime.now(timezone.utc)
 
+    # Reserve the message's sequence number and bump last_message_at
+    seq = await allocate_seq(db, conversation_id, now)
+
     message = Message(
         conversation_id=conversation_id,
         sender_id=current_user.id,
+        seq=seq,
         content=data.content,
         message_type=data.message_type,
         metadata_=data.metadata,
@@ -63,14 +68,17 @@ async def send_message(
     )
     db.add(message)
 
-    # Update last_message_at on conversation
-    conv_result = await db.execute(
-        select(Conversation).where(Conversation.id == conversation_id)
-    )
-    conv = conv_result.scalars().first()
-    if conv:
-        conv.last_message_at = now
-
     await db.commit()
     await db.refresh(message)
-    return MessageResponse.model_validate(message)
+    response = MessageResponse.model_validate(message)
+
+    await connection_manager.broadcast_to_conversation(
+        str(conversation_id),
+        {
+            "type": "new_message",
+            "message": response.model_dump(mode="json"),
+            "timestamp": now.isoformat(),
+        },
+        seq=seq,
+    )
+    return response
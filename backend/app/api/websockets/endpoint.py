@@ -1,22 +1,43 @@
-import asyncio
-import json
 from datetime import datetime, timezone
+from uuid import UUID
 
-from app.api.websockets.messages import (
-    handle_websocket_message,
-    heartbeat_checker,
-)
+from app.api.websockets.messages import handle_websocket_message
 from app.api.websockets.router import ws_router
 from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
 from app.core.dependencies import get_user_from_token_ws
 from app.core.logger import get_logger
-from app.core.websocket import connection_manager
+from app.core.websocket import (
+    connection_manager,
+    decode_frame,
+    negotiate_encoding,
+)
+from app.utils.get_user_conversation_ids import get_user_conversation_ids
 from fastapi import WebSocket, WebSocketDisconnect, status
 
 logger = get_logger()
 settings = get_settings()
 
 
+async def load_conversation_ids(user_id: str) -> set[str]:
+    """
+    Load the conversations a user participates in for fan-out routing.
+
+    Uses a short-lived session so no DB connection is held for the
+    lifetime of the socket. Errors are logged and yield an empty set.
+
+    :param user_id: User ID from JWT token
+
+    :return: Set of conversation IDs
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            return await get_user_conversation_ids(db, UUID(user_id))
+    except Exception as e:
+        logger.error(f"Failed to load conversations for user {user_id}: {e}")
+        return set()
+
+
 @ws_router.websocket("")
 async def websocket_endpoint(websocket: WebSocket):
     """
@@ -24,15 +45,26 @@ async def websocket_endpoint(websocket: WebSocket):
 
     Connection Flow:
     1. Client connects with JWT token in query params: ws://host/ws?token=JWT_TOKEN
-    2. Server validates token and accepts connection
+    2. Server validates token and accepts connection. Frames are JSON text
+       unless the client negotiates binary MessagePack, either as
+       subprotocol (``new WebSocket(url, ["msgpack", "json"])``) or with
+       ``&encoding=msgpack``; the choice is echoed in connection_established
     3. Client receives connection_established message
-    4. Client must send heartbeat every 30 seconds
+    4. Server sends WebSocket ping frames; the browser answers them, so no
+       application heartbeat is needed (older clients may still send ping)
     5. Server broadcasts messages via Redis pub/sub
+    6. A node at capacity closes new sockets with 1013 (Try Again Later);
+       a draining node sends "reconnect" and closes with 1012 (Service
+       Restart). Clients reconnect after retry_after and resume
 
     Message Types:
-    - ping: Heartbeat from client
+    - ping: Optional JSON heartbeat from client
     - pong: Heartbeat response from server
-    - message: Chat message
+    - message: Chat message, acknowledged with message_ack
+    - read_receipt: Read receipt, broadcast as message_read
+    - resume: Replay missed events from the last seen seq per conversation
+    - subscribe / unsubscribe: Conversations in focus; typing events
+      arrive only for those once a client subscribed
     - typing: Typing indicator
     - presence: User presence update
 
@@ -45,6 +77,20 @@ async def websocket_endpoint(websocket: WebSocket):
     user_id = None
 
     try:
+        encoding, subprotocol = negotiate_encoding(
+            websocket.scope.get("subprotocols", ()),
+            websocket.query_params.get("encoding"),
+        )
+
+        # Shed load before authenticating when the node is full or draining
+        refusal = connection_manager.admission_refusal()
+        if refusal:
+            code, reason = refusal
+            await connection_manager.shed(
+                websocket, code, reason, subprotocol=subprotocol
+            )
+            return
+
         # Authenticate user from token
         user_id = await get_user_from_token_ws(websocket)
 
@@ -56,15 +102,43 @@ async def websocket_endpoint(websocket: WebSocket):
             return
 
         # Accept connection and register user
-        connection_id = await connection_manager.connect(websocket, user_id)
-
-        # Start heartbeat checker task
-        heartbeat_task = asyncio.create_task(heartbeat_checker(user_id))
+        conversation_ids = await load_conversation_ids(user_id)
+        connection_id = await connection_manager.connect(
+            websocket,
+            user_id,
+            conversation_ids=conversation_ids,
+            encoding=encoding,
+            subprotocol=subprotocol,
+        )
+        binary = encoding == "msgpack"
 
         while True:
             try:
-                data = await websocket.receive_text()
-                message = json.loads(data)
+                data: str | bytes
+                if binary:
+                    data = await websocket.receive_bytes()
+                else:
+                    data = await websocket.receive_text()
+
+                try:
+                    message = decode_frame(data, encoding)
+                except ValueError:
+                    logger.warning(
+                        f"Invalid {encoding} frame from user {user_id}: {data!r}"
+                    )
+                    await connection_manager.send_personal_message(
+                        connection_id,
+                        {
+                            "type": "error",
+                            "error": (
+                                "Invalid MessagePack format"
+                                if binary
+                                else "Invalid JSON format"
+                            ),
+                            "timestamp": datetime.now(timezone.utc).isoformat(),
+                        },
+                    )
+                    continue
 
                 await handle_websocket_message(
                     message, user_id, connection_id, websocket
@@ -74,17 +148,6 @@ async def websocket_endpoint(websocket: WebSocket):
                 logger.info(f"WebSocket disconnected: {user_id}")
                 break
 
-            except json.JSONDecodeError:
-                logger.warning(f"Invalid JSON from user {user_id}: {data}")
-                await connection_manager.send_personal_message(
-                    connection_id,
-                    {
-                        "type": "error",
-                        "error": "Invalid JSON format",
-                        "timestamp": datetime.now(timezone.utc).isoformat(),
-                    },
-                )
-
             except Exception as e:
                 logger.error(f"Error processing message from {user_id}: {e}")
                 await connection_manager.send_personal_message(
@@ -101,11 +164,4 @@ async def websocket_endpoint(websocket: WebSocket):
 
     finally:
         if connection_id and user_id:
-            if "heartbeat_task" in locals():
-                heartbeat_task.cancel()
-                try:
-                    await heartbeat_task
-                except asyncio.CancelledError:
-                    pass
-
             await connection_manager.disconnect(connection_id, user_id)
@@ -1,10 +1,18 @@
-import asyncio
 from datetime import datetime, timezone
+from uuid import UUID
+
+from fastapi import WebSocket
+from pydantic import ValidationError
+from sqlalchemy import select
 
 from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
 from app.core.logger import get_logger
+from app.core.message_writer import MessageRejected, message_writer
+from app.core.receipt_writer import receipt_writer
 from app.core.websocket import connection_manager
-from fastapi import WebSocket
+from app.models.messages import Message
+from app.schemas.messages import MessageCreate, MessageResponse
 
 settings = get_settings()
 logger = get_logger()
@@ -33,12 +41,27 @@ async def handle_websocket_message(
         await handle_typing(user_id, message)
 
     elif message_type == "message":
-        # Handle chat message (will be implemented in next phase)
-        await handle_chat_message(user_id, message)
+        # Handle chat message
+        await handle_chat_message(user_id, connection_id, message)
 
     elif message_type == "read_receipt":
-        # Handle read receipt (will be implemented in next phase)
-        await handle_read_receipt(user_id, message)
+        # Handle read receipt
+        await handle_read_receipt(user_id, connection_id, message)
+
+    elif message_type == "resume":
+        await handle_resume(connection_id, message)
+
+    elif message_type == "subscribe":
+        await handle_subscribe(connection_id, message)
+
+    elif message_type == "unsubscribe":
+        await handle_unsubscribe(connection_id, message)
+
+    elif message_type == "presence_subscribe":
+        await handle_presence_subscribe(connection_id, message)
+
+    elif message_type == "presence_unsubscribe":
+        await handle_presence_unsubscribe(connection_id, message)
 
     else:
         logger.warning(f"Unknown message type from {user_id}: {message_type}")
@@ -92,49 +115,309 @@ async def handle_typing(user_id: str, message: dict):
     )
 
 
-async def handle_chat_message(user_id: str, message: dict):
+async def handle_subscribe(connection_id: str, message: dict):
+    """
+    Declare conversations in focus on the connection; typing and other
+    ephemeral events then arrive only for those. Replies with the full
+    focus set.
+
+    :param connection_id: Connection ID
+    :param message: Subscribe message with conversation_ids
+    """
+    conversation_ids = message.get("conversation_ids")
+    if not isinstance(conversation_ids, list):
+        logger.warning(f"Subscribe without conversation_ids on {connection_id}")
+        return
+
+    focused = connection_manager.subscribe_conversations(
+        connection_id, [str(c) for c in conversation_ids]
+    )
+    await send_subscribed(connection_id, focused)
+
+
+async def handle_unsubscribe(connection_id: str, message: dict):
+    """
+    Take conversations out of focus (all when omitted). Replies with the
+    remaining focus set.
+
+    :param connection_id: Connection ID
+    :param message: Unsubscribe message with optional conversation_ids
+    """
+    conversation_ids = message.get("conversation_ids")
+    focused = connection_manager.unsubscribe_conversations(
+        connection_id,
+        [str(c) for c in conversation_ids] if conversation_ids else None,
+    )
+    await send_subscribed(connection_id, focused)
+
+
+async def send_subscribed(connection_id: str, conversation_ids: list[str]):
+    """Tell a connection which conversations are in focus."""
+    await connection_manager.send_personal_message(
+        connection_id,
+        {
+            "type": "subscribed",
+            "conversation_ids": conversation_ids,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        },
+    )
+
+
+async def handle_presence_subscribe(connection_id: str, message: dict):
+    """
+    Subscribe a connection to presence updates of the given users and
+    reply with their current presence.
+
+    :param connection_id: Connection ID
+    :param message: Subscribe message with user_ids
+    """
+    user_ids = message.get("user_ids")
+    if not isinstance(user_ids, list) or not user_ids:
+        logger.warning(f"Presence subscribe without user_ids on {connection_id}")
+        return
+
+    subscribed = connection_manager.subscribe_presence(
+        connection_id, [str(user_id) for user_id in user_ids]
+    )
+    presences = await connection_manager.get_bulk_presence(subscribed)
+
+    await connection_manager.send_personal_message(
+        connection_id,
+        {
+            "type": "presence_subscribed",
+            "presences": presences,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        },
+    )
+
+
+async def handle_presence_unsubscribe(connection_id: str, message: dict):
+    """
+    Stop presence updates of the given users (all users when omitted).
+
+    :param connection_id: Connection ID
+    :param message: Unsubscribe message with optional user_ids
+    """
+    user_ids = message.get("user_ids")
+    connection_manager.unsubscribe_presence(
+        connection_id,
+        [str(user_id) for user_id in user_ids] if user_ids else None,
+    )
+
+
+async def send_error(
+    connection_id: str, error: str, client_message_id: str | None = None
+):
+    """
+    Send an error frame to a connection.
+
+    :param connection_id: Connection ID
+    :param error: Error description
+    :param client_message_id: Client-side ID of the failed message, if any
+    """
+    payload = {
+        "type": "error",
+        "error": error,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+    if client_message_id is not None:
+        payload["client_message_id"] = client_message_id
+    await connection_manager.send_personal_message(connection_id, payload)
+
+
+async def handle_chat_message(user_id: str, connection_id: str, message: dict):
     """
     Handle chat message.
 
+    The payload is validated with ``MessageCreate`` and persisted through
+    the group-commit message writer. The sender gets a ``message_ack`` with
+    the persisted ID and the message is broadcast to the conversation as
+    ``new_message``.
+
     :param user_id: Sender user ID
-    :param message: Message data
+    :param connection_id: Sender connection ID
+    :param message: Message data with conversation_id, optional
+    client_message_id and the ``MessageCreate`` fields
     """
-    logger.info(f"Chat message from {user_id}: {message}")
+    client_message_id = message.get("client_message_id")
+
+    try:
+        conversation_id = UUID(str(message.get("conversation_id")))
+        data = MessageCreate.model_validate(message)
+    except ValueError as e:
+        # ValidationError is a ValueError as well
+        error = (
+            e.errors()[0]["msg"]
+            if isinstance(e, ValidationError)
+            else "Invalid conversation_id"
+        )
+        await send_error(connection_id, error, client_message_id)
+        return
+
+    try:
+        saved = await message_writer.submit(conversation_id, UUID(user_id), data)
+    except MessageRejected as e:
+        await send_error(connection_id, e.detail, client_message_id)
+        return
 
-    # TODO: Validate message
-    # TODO: Save to database
-    # TODO: Broadcast to conversation participants
-    # TODO: Queue notification task
+    response = MessageResponse.model_validate(saved).model_dump(mode="json")
+    await connection_manager.send_personal_message(
+        connection_id,
+        {
+            "type": "message_ack",
+            "client_message_id": client_message_id,
+            "message_id": response["id"],
+            "seq": saved.seq,
+            "created_at": response["created_at"],
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        },
+    )
+    await connection_manager.broadcast_to_conversation(
+        str(conversation_id),
+        {
+            "type": "new_message",
+            "message": response,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        },
+        seq=saved.seq,
+    )
 
 
-async def handle_read_receipt(user_id: str, message: dict):
+async def handle_read_receipt(user_id: str, connection_id: str, message: dict):
     """
     Handle read receipt.
 
+    The read pointer is written behind through the coalescing receipt
+    writer. Its flush checks the message against the conversation and
+    broadcasts the written receipt to the other participants, which
+    include the message's sender; receipts for messages outside the
+    conversation are rejected before anyone is told about them.
+
     :param user_id: User ID
-    :param message: Read receipt data with message_id
+    :param connection_id: Connection ID
+    :param message: Read receipt data with conversation_id and message_id
     """
-    logger.info(f"Read receipt from {user_id}: {message}")
+    try:
+        conversation_id = UUID(str(message.get("conversation_id")))
+        message_id = UUID(str(message.get("message_id")))
+    except ValueError:
+        await send_error(connection_id, "Invalid conversation_id or message_id")
+        return
 
-    # TODO: Update message read status in database
-    # TODO: Broadcast read receipt to sender
+    # Membership is known from the local fan-out index; no DB round trip
+    conversations = connection_manager.get_connection_conversations(
+        connection_id
+    )
+    if str(conversation_id) not in conversations:
+        await send_error(
+            connection_id, "You are not a participant of this conversation."
+        )
+        return
+
+    receipt_writer.record(
+        conversation_id,
+        UUID(user_id),
+        message_id,
+        datetime.now(timezone.utc),
+        connection_id=connection_id,
+    )
 
 
-async def heartbeat_checker(user_id: str):
+async def load_missed_messages(
+    conversation_id: str, after_seq: int, limit: int
+) -> list[dict]:
     """
-    Periodic task to check for stale connections.
+    Load ``new_message`` events after a sequence number from the database.
 
-    :param user_id: User ID
+    Used when the replay stream no longer holds the whole delta.
+
+    :param conversation_id: Conversation ID
+    :param after_seq: Last sequence number seen by the client
+    :param limit: Max messages to load
+
+    :return: Events in sequence order
     """
-    try:
-        while True:
-            await asyncio.sleep(settings.WS_HEARTBEAT_INTERVAL)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Message)
+            .where(
+                Message.conversation_id == UUID(conversation_id),
+                Message.seq > after_seq,
+                Message.is_deleted.is_(False),
+            )
+            .order_by(Message.seq)
+            .limit(limit)
+        )
+        messages = result.scalars().all()
 
-            await connection_manager.check_stale_connections(
-                timeout_seconds=settings.WS_HEARTBEAT_TIMEOUT
+    return [
+        {
+            "type": "new_message",
+            "message": MessageResponse.model_validate(m).model_dump(mode="json"),
+            "timestamp": m.created_at.isoformat(),
+            "seq": m.seq,
+        }
+        for m in messages
+    ]
+
+
+async def handle_resume(connection_id: str, message: dict):
+    """
+    Replay the sequenced events a reconnecting client missed.
+
+    The client sends the last ``seq`` it saw per conversation. Events come
+    from the conversation's replay stream, or from the database when the
+    stream has been trimmed. Each conversation replays at most
+    WS_REPLAY_MAX_EVENTS events; ``truncated`` tells the client to page
+    the rest through the messages API. A ``resume_complete`` frame follows
+    the replayed events. Delivery is paced by the connection's outbound
+    queue, which a long replay would otherwise overflow.
+
+    :param connection_id: Connection ID
+    :param message: Resume message with {conversation_id: last_seq}
+    """
+    positions = message.get("conversations")
+    if not isinstance(positions, dict):
+        await send_error(connection_id, "Invalid conversations")
+        return
+
+    # Only conversations the connection is a member of are replayed
+    member_of = connection_manager.get_connection_conversations(connection_id)
+    positions = {
+        str(conversation_id): seq
+        for conversation_id, seq in positions.items()
+        if str(conversation_id) in member_of
+        and isinstance(seq, int)
+        and seq >= 0
+    }
+
+    limit = settings.WS_REPLAY_MAX_EVENTS
+    replay = await connection_manager.get_replay(positions, limit)
+
+    frames: list[dict] = []
+    summary = {}
+    for conversation_id, after_seq in positions.items():
+        events = replay.get(conversation_id)
+        source = "buffer"
+        if events is None:
+            events = await load_missed_messages(
+                conversation_id, after_seq, limit
             )
+            source = "database"
+
+        frames.extend(events)
+        summary[conversation_id] = {
+            "source": source,
+            "count": len(events),
+            "last_seq": events[-1]["seq"] if events else after_seq,
+            "truncated": len(events) >= limit,
+        }
 
-    except asyncio.CancelledError:
-        pass
-    except Exception as e:
-        logger.error(f"Error in heartbeat checker for {user_id}: {e}")
+    frames.append(
+        {
+            "type": "resume_complete",
+            "conversations": summary,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+    )
+    await connection_manager.send_backlog(connection_id, frames)
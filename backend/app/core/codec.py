@@ -0,0 +1,126 @@
+"""
+Serialization of the payloads nodes exchange through Redis: pub/sub
+messages, inbox and replay stream events and JSON values.
+
+Every node decodes every format, whatever it writes. JSON payloads are
+untagged, as they were before formats were pluggable, and MessagePack
+payloads start with a tag naming the format and its version. No JSON
+document starts with ``~``, so nodes of different releases can share
+channels and streams while REDIS_CODEC is switched: roll out a release
+that reads the tagged format first, then switch the writers.
+"""
+
+import importlib
+import json
+from logging import Logger
+from types import ModuleType
+from typing import Any, Callable
+
+from app.core.logger import get_logger
+
+
+def optional_import(name: str) -> ModuleType | None:
+    """Import an optional extra, or return None if it is not installed."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+orjson = optional_import("orjson")  # optional "orjson" extra
+msgpack = optional_import("msgpack")  # optional "msgpack" extra
+
+# Tag of MessagePack payloads, format version 1
+MSGPACK_TAG = b"~m1"
+
+
+def _json_dumps(value: Any) -> str:
+    return json.dumps(value)
+
+
+def _orjson_dumps(value: Any) -> bytes:
+    if orjson is None:
+        raise ValueError("orjson is not installed")
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _msgpack_dumps(value: Any) -> bytes:
+    if msgpack is None:
+        raise ValueError("msgpack is not installed")
+    return MSGPACK_TAG + msgpack.packb(value)
+
+
+def _msgpack_loads(data: bytes) -> Any:
+    if msgpack is None:
+        raise ValueError("MessagePack payload, msgpack is not installed")
+    try:
+        return msgpack.unpackb(data[len(MSGPACK_TAG) :], raw=False)
+    except Exception as e:
+        raise ValueError(f"Invalid MessagePack payload: {e}") from e
+
+
+_json_loads: Callable[[str | bytes], Any] = (
+    orjson.loads if orjson else json.loads
+)
+
+
+def decode_payload(data: str | bytes) -> Any:
+    """
+    Decode a payload written by any codec.
+
+    A ``str`` is accepted as returned by a client with decode_responses;
+    binary payloads survive it thanks to the ``surrogateescape`` error
+    handler ``RedisClient`` connects with.
+
+    :raises ValueError: If the payload is malformed or of an unknown format
+    """
+    if isinstance(data, str):
+        if not data.startswith("~"):
+            return _json_loads(data)
+        data = data.encode("utf-8", "surrogateescape")
+
+    if data.startswith(MSGPACK_TAG):
+        return _msgpack_loads(data)
+    if data.startswith(b"~"):
+        raise ValueError(f"Unsupported payload format {data[:3]!r}")
+    return _json_loads(data)
+
+
+class Codec:
+    """
+    Encodes payloads in one format and decodes payloads of every format.
+    """
+
+    __slots__ = ("name", "dumps")
+
+    def __init__(self, name: str, dumps: Callable[[Any], str | bytes]):
+        self.name = name
+        self.dumps = dumps
+
+    @staticmethod
+    def loads(data: str | bytes) -> Any:
+        return decode_payload(data)
+
+
+# Codecs usable with the installed packages {name: codec}
+CODECS: dict[str, Codec] = {"json": Codec("json", _json_dumps)}
+if orjson:
+    CODECS["orjson"] = Codec("orjson", _orjson_dumps)
+if msgpack:
+    CODECS["msgpack"] = Codec("msgpack", _msgpack_dumps)
+
+
+def get_codec(name: str, logger: Logger | None = None) -> Codec:
+    """
+    Get a codec by name, falling back to JSON with a warning if it is
+    unknown or its package is not installed.
+
+    :param name: "json", "orjson" or "msgpack"
+    """
+    codec = CODECS.get(name)
+    if codec is None:
+        (logger or get_logger()).warning(
+            f"Redis codec {name!r} is not available, using json"
+        )
+        codec = CODECS["json"]
+    return codec
@@ -79,6 +79,15 @@ class Settings(BaseSettings):
     REDIS_PASSWORD: str | None = None
     REDIS_POOL_SIZE: int = 10
     REDIS_DECODE_RESPONSES: bool = True
+    # Serializer of pub/sub messages, stream events and JSON values: "json",
+    # "orjson" or "msgpack" (optional extras). Every node reads all of them;
+    # switch to msgpack once no node older than the tagged format is left
+    REDIS_CODEC: str = "json"
+    # Near cache: in-process LRU of reads of keys under these prefixes (e.g.
+    # ["denylist:", "user:presence:"]), invalidated by RESP3 client
+    # tracking; empty disables it
+    REDIS_NEAR_CACHE_PREFIXES: list[str] = []
+    REDIS_NEAR_CACHE_SIZE: int = 10000  # max cached keys
 
     # RabbitMQ settings
     RABBITMQ_HOST: str = "localhost"
@@ -90,7 +99,60 @@ class Settings(BaseSettings):
     # WebSocket settings
     WS_HEARTBEAT_INTERVAL: int = 30  # seconds
     WS_HEARTBEAT_TIMEOUT: int = 60  # seconds
+    # Liveness from WebSocket ping frames sent by the server (uvicorn
+    # --ws-ping-interval/--ws-ping-timeout); clients that send JSON pings
+    # are still supervised by WS_AWAY_THRESHOLD and WS_HEARTBEAT_TIMEOUT
+    WS_PROTOCOL_PING: bool = True
+    WS_AWAY_THRESHOLD: int = 30  # seconds without heartbeat before "away"
     WS_MESSAGE_MAX_SIZE: int = 1024 * 1024  # 1MB
+    WS_PUBSUB_BLOCK_TIMEOUT: float = 1.0  # max seconds a pub/sub read blocks
+    # Node identity for event routing; a random ID is used when unset
+    WS_NODE_ID: str | None = None
+    WS_CONNECTION_TTL: int = 3600  # seconds; refreshed by heartbeats
+    WS_NODE_TTL: int = 15  # seconds a node counts as alive after a refresh
+    # Seconds between node liveness refreshes; the elected reaper also
+    # removes connections of dead nodes from Redis at this pace
+    WS_REAPER_INTERVAL: float = 5.0
+    # Node inbox transport: "pubsub" (fire-and-forget) or "streams"
+    # (consumer groups with acknowledgements, at-least-once delivery)
+    WS_EVENT_TRANSPORT: str = "pubsub"
+    WS_STREAM_MAXLEN: int = 10000  # approx. entries kept per inbox stream
+    WS_STREAM_TTL: int = 3600  # seconds an inbox stream without traffic is kept
+    WS_STREAM_READ_COUNT: int = 100  # max entries per XREADGROUP/XAUTOCLAIM
+    WS_STREAM_CLAIM_IDLE: int = 30000  # ms before unacked entries are reclaimed
+    WS_STREAM_CLAIM_INTERVAL: float = 10.0  # seconds between reclaim passes
+    WS_SEND_QUEUE_SIZE: int = 256  # outbound frames buffered per connection
+    # On a full queue: "drop_ephemeral" drops WS_SEND_DROPPABLE_TYPES first
+    # and disconnects only if nothing can be dropped; "disconnect" always
+    # disconnects the slow consumer.
+    WS_SEND_OVERFLOW_POLICY: str = "drop_ephemeral"
+    WS_SEND_DROPPABLE_TYPES: set[str] = {
+        "typing",
+        "typing_summary",
+        "presence_update",
+    }
+    WS_SLOW_CONSUMER_CLOSE_CODE: int = 4008  # application-defined close code
+    WS_MAX_CONNECTIONS: int = 0  # sockets admitted per node; 0 disables
+    WS_OVERLOAD_CLOSE_CODE: int = 1013  # "Try Again Later"; sent at capacity
+    # Drain mode (SIGUSR1 to the server process, e.g. from a pre-stop hook)
+    # closes local sockets over WS_DRAIN_DURATION with a "reconnect" hint
+    WS_DRAIN_CLOSE_CODE: int = 1012  # "Service Restart"
+    WS_DRAIN_DURATION: float = 30.0  # seconds existing sockets are spread over
+    WS_DRAIN_RECONNECT_JITTER: float = 5.0  # max retry_after in reconnect hints
+    WS_PRESENCE_MAX_SUBSCRIPTIONS: int = 500  # explicit watches per socket
+    WS_TYPING_DEBOUNCE: float = 3.0  # min seconds between typing writes
+    WS_TYPING_INTERVAL: float = 1.0  # seconds between typing summaries
+    WS_TYPING_TIMEOUT: int = 5  # seconds before a typing entry is stale
+    # Conversation events sent only to connections that have the
+    # conversation in focus (after a client "subscribe"); others reach
+    # every member connection
+    WS_FOCUS_EVENT_TYPES: set[str] = {"typing", "typing_summary"}
+    WS_MESSAGE_BATCH_INTERVAL: float = 0.005  # seconds a commit batch stays open
+    WS_MESSAGE_BATCH_SIZE: int = 500  # max messages per group commit
+    WS_REPLAY_BUFFER_SIZE: int = 1000  # sequenced events kept per conversation
+    WS_REPLAY_TTL: int = 86400  # seconds an idle replay stream is kept
+    WS_REPLAY_MAX_EVENTS: int = 500  # max events replayed per conversation
+    WS_READ_RECEIPT_FLUSH_INTERVAL: float = 1.0  # seconds receipts are buffered
 
     # CORS settings
     ALLOWED_ORIGINS: list[str] = [
@@ -0,0 +1,276 @@
+import asyncio
+from datetime import datetime, timezone
+from logging import Logger
+from typing import Callable
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.codec import get_codec
+from app.core.config import Settings, get_settings
+from app.core.database import AsyncSessionLocal
+from app.core.logger import get_logger
+from app.core.redis import RedisClient, get_redis, register_script
+from app.core.websocket import (
+    NODES_KEY,
+    ConnectionManager,
+    connection_manager,
+    node_key,
+    presence_event,
+)
+from app.models.conversation_participants import ConversationParticipant
+
+# Leadership lease: KEYS[1] = leader key, ARGV[1] = node ID, ARGV[2] = TTL.
+# Taken when free and renewed by its holder.
+LEAD_SCRIPT = register_script(
+    "reaper_lead",
+    """
+local holder = redis.call('GET', KEYS[1])
+if holder and holder ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+""",
+)
+
+# Remove everything a dead node registered. KEYS[1] = node's connection
+# index {connection_id: user_id}, KEYS[2] = node's conversation set,
+# KEYS[3] = node registry, KEYS[4] = node's liveness key, ARGV[1] = node
+# ID, ARGV[2] = last_seen, ARGV[3] = offline presence TTL, ARGV[4] = "1"
+# to skip the liveness check.
+# Users left without connections are set offline without publishing; the
+# caller publishes their transitions with their conversations.
+# Returns {entries removed, users set offline}.
+REAP_NODE_SCRIPT = register_script(
+    "reap_node",
+    """
+if ARGV[4] ~= '1' and redis.call('EXISTS', KEYS[4]) == 1 then
+    return {0, {}}
+end
+local reclaimed = 0
+local offline = {}
+local entries = redis.call('HGETALL', KEYS[1])
+for i = 1, #entries, 2 do
+    local user_id = entries[i + 1]
+    local connections = 'user:connections:' .. user_id
+    reclaimed = reclaimed + redis.call('HDEL', connections, entries[i])
+    if redis.call('HLEN', connections) == 0 then
+        local presence = 'user:presence:' .. user_id
+        if redis.call('HGET', presence, 'status') ~= 'offline' then
+            redis.call('HSET', presence, 'status', 'offline',
+                'last_seen', ARGV[2])
+            redis.call('EXPIRE', presence, ARGV[3])
+            table.insert(offline, user_id)
+        end
+    end
+end
+for _, conversation_id in ipairs(redis.call('SMEMBERS', KEYS[2])) do
+    reclaimed = reclaimed + redis.call('SREM',
+        'conversation:nodes:' .. conversation_id, ARGV[1])
+end
+redis.call('DEL', KEYS[1], KEYS[2])
+redis.call('SREM', KEYS[3], ARGV[1])
+return {reclaimed, offline}
+""",
+)
+
+REAPER_LEADER_KEY = "reaper:leader"
+
+
+class ConnectionReaper:
+    """
+    Keeps this node's liveness key fresh and, on the one node holding the
+    reaper lease, removes the Redis registrations of dead nodes.
+
+    A crashed node cannot unregister its connections, so without the
+    reaper its users stayed online and fan-out kept routing to it until
+    WS_CONNECTION_TTL expired. Nodes whose ``alive`` key lapsed (no
+    refresh for WS_NODE_TTL seconds) are reaped in one script call each,
+    and the users who lost their last connection go offline.
+    """
+
+    def __init__(
+        self,
+        manager: ConnectionManager | None = None,
+        redis: RedisClient | None = None,
+        session_factory: Callable[[], AsyncSession] | None = None,
+        logger: Logger | None = None,
+        settings: Settings | None = None,
+    ):
+        self.manager = manager or connection_manager
+        self.redis = redis or get_redis()
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.logger = logger or get_logger()
+        self.settings = settings or get_settings()
+        self.codec = get_codec(self.settings.REDIS_CODEC, self.logger)
+        self.task: asyncio.Task | None = None
+
+        # Nodes reaped and registry entries removed, for monitoring
+        self.nodes_reaped = 0
+        self.entries_reclaimed = 0
+
+    async def start(self):
+        """
+        Start the liveness and reaper loop.
+        This should be called once on application startup, before the
+        node accepts connections.
+        """
+        # A node restarted under the same WS_NODE_ID has no connections
+        # yet; whatever its index still lists is left from a crash
+        await self.reap_node(self.manager.node_id, force=True)
+        await self.manager.refresh_node_liveness()
+        self.task = asyncio.create_task(self._run())
+        self.logger.info("Started connection reaper")
+
+    async def stop(self):
+        """Stop the loop and leave the node registry."""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+        await self.manager.deregister_node()
+        self.logger.info("Stopped connection reaper")
+
+    async def _run(self):
+        """Refresh liveness and, as leader, reap dead nodes every interval."""
+        while True:
+            try:
+                await asyncio.sleep(self.settings.WS_REAPER_INTERVAL)
+                await self.manager.refresh_node_liveness()
+                if await self._lead():
+                    await self.reap()
+
+            except Exception as e:
+                self.logger.error(f"Error in connection reaper: {e}")
+
+    async def _lead(self) -> bool:
+        """Take or renew the reaper lease; True if this node holds it."""
+        held = await self.redis.run_script(
+            LEAD_SCRIPT,
+            keys=[REAPER_LEADER_KEY],
+            args=[self.manager.node_id, self.settings.WS_NODE_TTL],
+        )
+        return bool(held)
+
+    async def reap(self) -> int:
+        """
+        Reap every registered node whose liveness key expired.
+
+        :return: Number of registry entries removed
+        """
+        nodes = [
+            node_id
+            for node_id in await self.redis.smembers(NODES_KEY)
+            if node_id != self.manager.node_id
+        ]
+        if not nodes:
+            return 0
+
+        async with self.redis.batch() as batch:
+            alive = [
+                batch.exists(node_key(node_id, "alive")) for node_id in nodes
+            ]
+        if not batch.executed:
+            return 0
+
+        reclaimed = 0
+        for node_id, is_alive in zip(nodes, alive):
+            if not is_alive.value:
+                reclaimed += await self.reap_node(node_id)
+        return reclaimed
+
+    async def reap_node(self, node_id: str, force: bool = False) -> int:
+        """
+        Remove the connections and conversation routes of a dead node and
+        publish offline transitions of the users left without connections.
+
+        :param node_id: Node to reap
+        :param force: Reap even if the node's liveness key still exists
+
+        :return: Number of registry entries removed
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        result = await self.redis.run_script(
+            REAP_NODE_SCRIPT,
+            keys=[
+                node_key(node_id, "connections"),
+                node_key(node_id, "conversations"),
+                NODES_KEY,
+                node_key(node_id, "alive"),
+            ],
+            args=[node_id, now, 86400, "1" if force else "0"],
+        )
+        if not result:
+            return 0
+
+        reclaimed, offline = result
+        if not reclaimed and not offline:
+            return 0
+
+        if offline:
+            conversations = await self._load_conversations(offline)
+            async with self.redis.batch() as batch:
+                for user_id in offline:
+                    batch.publish(
+                        "presence",
+                        self.codec.dumps(
+                            presence_event(
+                                user_id,
+                                "offline",
+                                now,
+                                conversations.get(user_id, ()),
+                            )
+                        ),
+                    )
+
+        self.nodes_reaped += 1
+        self.entries_reclaimed += reclaimed
+        self.logger.info(
+            f"Reaped node {node_id}: {reclaimed} entries reclaimed, "
+            f"{len(offline)} users offline"
+        )
+        return reclaimed
+
+    async def _load_conversations(
+        self, user_ids: list[str]
+    ) -> dict[str, list[str]]:
+        """
+        Load the conversations of several users in one query. Errors are
+        logged and yield no conversations.
+
+        :return: Conversation IDs by user ID
+        """
+        conversations: dict[str, list[str]] = {}
+        try:
+            async with self.session_factory() as db:
+                result = await db.execute(
+                    select(
+                        ConversationParticipant.user_id,
+                        ConversationParticipant.conversation_id,
+                    ).where(
+                        ConversationParticipant.user_id.in_(
+                            [UUID(user_id) for user_id in user_ids]
+                        )
+                    )
+                )
+                for user_id, conversation_id in result.fetchall():
+                    conversations.setdefault(str(user_id), []).append(
+                        str(conversation_id)
+                    )
+        except Exception as e:
+            self.logger.error(f"Failed to load conversations of users: {e}")
+        return conversations
+
+
+connection_reaper = ConnectionReaper()
+
+
+def get_connection_reaper() -> ConnectionReaper:
+    """Dependency to get the connection reaper instance."""
+    return connection_reaper
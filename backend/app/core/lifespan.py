@@ -1,9 +1,14 @@
+import asyncio
+import signal
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
+from app.core.connection_reaper import connection_reaper
 from app.core.logger import get_logger
+from app.core.message_writer import message_writer
 from app.core.rabbitmq import ALL_QUEUES, rabbitmq_client
+from app.core.receipt_writer import receipt_writer
 from app.core.redis import redis_client
 from app.core.websocket import connection_manager
 
@@ -35,8 +40,20 @@ async def lifespan(app: FastAPI):
 
         # Start Websocket Pub/Sub listener
         await connection_manager.start_pubsub_listener()
+        await connection_manager.start_heartbeat_supervisor()
+        await connection_reaper.start()
+
+        # SIGUSR1 drains WebSockets ahead of a stop; uvicorn itself closes
+        # them all at once on SIGTERM
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGUSR1, connection_manager.start_drain
+        )
         logger.info("Websocket manager initialized")
 
+        # Start group-commit message and read receipt writers
+        await message_writer.start()
+        await receipt_writer.start()
+
         logger.info("Application startup complete")
     except Exception as e:
         logger.error(f"Failed to start application: {e}")
@@ -48,7 +65,15 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down MINA application...")
 
     try:
-        # Stop WebSocket pub/sub listener
+        # Commit pending chat messages and read receipts
+        await message_writer.stop()
+        await receipt_writer.stop()
+
+        # Stop WebSocket drain, heartbeat supervisor and pub/sub listener
+        asyncio.get_running_loop().remove_signal_handler(signal.SIGUSR1)
+        await connection_manager.stop_drain()
+        await connection_reaper.stop()
+        await connection_manager.stop_heartbeat_supervisor()
         await connection_manager.stop_pubsub_listener()
 
         # Close RabbitMQ
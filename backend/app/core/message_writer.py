@@ -0,0 +1,284 @@
+import asyncio
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from logging import Logger
+from typing import Callable
+from uuid import UUID
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import Settings, get_settings
+from app.core.database import AsyncSessionLocal
+from app.core.logger import get_logger
+from app.models.conversation_participants import ConversationParticipant
+from app.models.messages import Message
+from app.schemas.messages import MessageCreate
+from app.utils.allocate_seq import allocate_seq
+
+
+class MessageRejected(Exception):
+    """A submitted message failed validation against the database."""
+
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.detail = detail
+
+
+@dataclass
+class PendingMessage:
+    """A message waiting for the next group commit."""
+
+    conversation_id: UUID
+    sender_id: UUID
+    data: MessageCreate
+    future: asyncio.Future = field(repr=False)
+
+
+class MessageWriter:
+    """
+    Group-commit writer for chat messages.
+
+    Messages submitted from many connections are collected for up to
+    WS_MESSAGE_BATCH_INTERVAL seconds (or WS_MESSAGE_BATCH_SIZE messages)
+    and inserted in one transaction. Each submitter waits only for the
+    commit of the batch its message was part of.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] | None = None,
+        logger: Logger | None = None,
+        settings: Settings | None = None,
+    ):
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.logger = logger or get_logger()
+        self.settings = settings or get_settings()
+
+        self._pending: list[PendingMessage] = []
+        self._wakeup = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+        # Committed batches and messages, for monitoring
+        self.batches_committed = 0
+        self.messages_committed = 0
+
+    async def start(self):
+        """
+        Start the flush task.
+        This should be called once on application startup.
+        """
+        self.task = asyncio.create_task(self._run())
+        self.logger.info("Started message writer")
+
+    async def stop(self):
+        """Stop the flush task and commit what is still pending."""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+        while self._pending:
+            await self.flush()
+        self.logger.info("Stopped message writer")
+
+    async def submit(
+        self, conversation_id: UUID, sender_id: UUID, data: MessageCreate
+    ) -> Message:
+        """
+        Queue a message for the next group commit and wait for it.
+
+        :param conversation_id: Target conversation ID
+        :param sender_id: Sender user ID
+        :param data: Validated message payload
+
+        :return: Persisted message
+
+        :raises MessageRejected: If the sender is not a participant or the
+        reply target does not exist
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(
+            PendingMessage(conversation_id, sender_id, data, future)
+        )
+        if self.task is None:
+            # No flush task (e.g. in scripts): commit right away
+            await self.flush()
+        elif (
+            len(self._pending) == 1
+            or len(self._pending) >= self.settings.WS_MESSAGE_BATCH_SIZE
+        ):
+            # Start a new batch window, or cut the current one short
+            self._wakeup.set()
+        return await future
+
+    async def _run(self):
+        """Flush a batch every interval while messages are pending."""
+        while True:
+            try:
+                if not self._pending:
+                    await self._wakeup.wait()
+                self._wakeup.clear()
+
+                # Let concurrent submitters join the batch
+                if len(self._pending) < self.settings.WS_MESSAGE_BATCH_SIZE:
+                    try:
+                        await asyncio.wait_for(
+                            self._wakeup.wait(),
+                            timeout=self.settings.WS_MESSAGE_BATCH_INTERVAL,
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wakeup.clear()
+
+                await self.flush()
+
+            except Exception as e:
+                self.logger.error(f"Error in message writer: {e}")
+                await asyncio.sleep(1)  # Back off on error
+
+    async def flush(self) -> int:
+        """
+        Commit up to WS_MESSAGE_BATCH_SIZE pending messages in one
+        transaction.
+
+        Participation and reply targets of the whole batch are checked with
+        one query each; rejected messages fail individually without
+        affecting the rest of the batch.
+
+        :return: Number of messages committed
+        """
+        size = self.settings.WS_MESSAGE_BATCH_SIZE
+        batch, self._pending = self._pending[:size], self._pending[size:]
+        if not batch:
+            return 0
+
+        try:
+            async with self.session_factory() as db:
+                committed = await self._write_batch(db, batch)
+        except Exception as e:
+            self.logger.error(f"Failed to commit message batch: {e}")
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return 0
+
+        self.batches_committed += 1
+        self.messages_committed += len(committed)
+        for pending, message in committed:
+            if not pending.future.done():
+                pending.future.set_result(message)
+        return len(committed)
+
+    async def _write_batch(
+        self, db: AsyncSession, batch: list[PendingMessage]
+    ) -> list[tuple[PendingMessage, Message]]:
+        """Validate and insert a batch; resolves rejected futures."""
+        pairs = list({(p.conversation_id, p.sender_id) for p in batch})
+        result = await db.execute(
+            select(
+                ConversationParticipant.conversation_id,
+                ConversationParticipant.user_id,
+            ).where(
+                tuple_(
+                    ConversationParticipant.conversation_id,
+                    ConversationParticipant.user_id,
+                ).in_(pairs)
+            )
+        )
+        participants = set(result.tuples().all())
+
+        reply_ids = list(
+            {
+                p.data.reply_to_message_id
+                for p in batch
+                if p.data.reply_to_message_id
+            }
+        )
+        reply_targets = set()
+        if reply_ids:
+            result = await db.execute(
+                select(Message.id, Message.conversation_id).where(
+                    Message.id.in_(reply_ids),
+                    Message.is_deleted.is_(False),
+                )
+            )
+            reply_targets = set(result.tuples().all())
+
+        now = datetime.now(timezone.utc)
+        accepted = []
+        for pending in batch:
+            data = pending.data
+            if pending.future.done():
+                # Submitter went away (e.g. the socket closed)
+                continue
+            if (pending.conversation_id, pending.sender_id) not in participants:
+                pending.future.set_exception(
+                    MessageRejected(
+                        "You are not a participant of this conversation."
+                    )
+                )
+                continue
+            if data.reply_to_message_id and (
+                (data.reply_to_message_id, pending.conversation_id)
+                not in reply_targets
+            ):
+                pending.future.set_exception(
+                    MessageRejected("Reply target message not found.")
+                )
+                continue
+
+            # Keys and timestamps are set here so no refresh is needed
+            message = Message(
+                id=uuid.uuid4(),
+                conversation_id=pending.conversation_id,
+                sender_id=pending.sender_id,
+                content=data.content,
+                message_type=data.message_type,
+                metadata_=data.metadata,
+                reply_to_message_id=data.reply_to_message_id,
+                is_edited=False,
+                is_deleted=False,
+                delivered_at=now,
+                created_at=now,
+                updated_at=now,
+                attachments=[],
+                reactions=[],
+            )
+            accepted.append((pending, message))
+
+        if not accepted:
+            return []
+
+        # One sequence range per conversation, assigned in submit order.
+        # Conversation rows are locked in ID order, so batches on other
+        # nodes and single sends cannot lock them in the opposite order
+        by_conversation: dict[UUID, list[Message]] = {}
+        for pending, message in accepted:
+            by_conversation.setdefault(pending.conversation_id, []).append(
+                message
+            )
+        for conversation_id, conversation_messages in sorted(
+            by_conversation.items()
+        ):
+            first = await allocate_seq(
+                db, conversation_id, now, count=len(conversation_messages)
+            )
+            for offset, message in enumerate(conversation_messages):
+                message.seq = first + offset
+
+        db.add_all([message for _, message in accepted])
+        await db.commit()
+        return accepted
+
+
+message_writer = MessageWriter()
+
+
+def get_message_writer() -> MessageWriter:
+    """Dependency to get the message writer instance."""
+    return message_writer
@@ -0,0 +1,253 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from logging import Logger
+from typing import Callable
+from uuid import UUID
+
+from sqlalchemy import and_, bindparam, exists, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import Settings, get_settings
+from app.core.database import AsyncSessionLocal
+from app.core.logger import get_logger
+from app.core.websocket import ConnectionManager, connection_manager
+from app.models.conversation_participants import ConversationParticipant
+from app.models.messages import Message
+
+participants = ConversationParticipant.__table__
+messages = Message.__table__
+new_message = messages.alias("new_message")
+last_read = messages.alias("last_read")
+
+# Move a participant's read pointer forward to a message of the same
+# conversation; older or foreign message IDs leave it untouched
+ADVANCE_LAST_READ = (
+    update(participants)
+    .where(
+        participants.c.conversation_id == bindparam("p_conversation_id"),
+        participants.c.user_id == bindparam("p_user_id"),
+        exists().where(
+            new_message.c.id == bindparam("p_message_id"),
+            new_message.c.conversation_id == participants.c.conversation_id,
+            new_message.c.is_deleted.is_(False),
+        ),
+        or_(
+            participants.c.last_read_message_id.is_(None),
+            select(last_read.c.created_at)
+            .where(last_read.c.id == participants.c.last_read_message_id)
+            .scalar_subquery()
+            <= select(new_message.c.created_at)
+            .where(new_message.c.id == bindparam("p_message_id"))
+            .scalar_subquery(),
+        ),
+    )
+    .values(last_read_message_id=bindparam("p_message_id"))
+)
+
+# Record the first read of a message
+SET_READ_AT = (
+    update(messages)
+    .where(
+        and_(
+            messages.c.id == bindparam("p_message_id"),
+            messages.c.conversation_id == bindparam("p_conversation_id"),
+            messages.c.read_at.is_(None),
+        )
+    )
+    .values(read_at=bindparam("p_read_at"))
+)
+
+
+@dataclass
+class PendingReceipt:
+    """A read receipt waiting for the next flush."""
+
+    conversation_id: UUID
+    user_id: UUID
+    message_id: UUID
+    read_at: datetime
+    connection_id: str | None = None
+
+
+class ReceiptWriter:
+    """
+    Write-behind buffer for read receipts.
+
+    Receipts are coalesced per (conversation, user): only the latest one
+    received within a WS_READ_RECEIPT_FLUSH_INTERVAL window is written to
+    Postgres, and all buffered receipts are written in one transaction.
+    The flush checks every receipt's message against the conversation
+    with one query, and only receipts that pass are broadcast to the
+    other participants.
+    """
+
+    def __init__(
+        self,
+        manager: ConnectionManager | None = None,
+        session_factory: Callable[[], AsyncSession] | None = None,
+        logger: Logger | None = None,
+        settings: Settings | None = None,
+    ):
+        self.manager = manager or connection_manager
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.logger = logger or get_logger()
+        self.settings = settings or get_settings()
+
+        # Latest receipt per (conversation_id, user_id)
+        self._pending: dict[tuple[UUID, UUID], PendingReceipt] = {}
+        self._wakeup = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+        # Receipts received and written, for monitoring
+        self.receipts_received = 0
+        self.receipts_written = 0
+
+    async def start(self):
+        """
+        Start the flush task.
+        This should be called once on application startup.
+        """
+        self.task = asyncio.create_task(self._run())
+        self.logger.info("Started read receipt writer")
+
+    async def stop(self):
+        """Stop the flush task and write what is still buffered."""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+        await self.flush()
+        self.logger.info("Stopped read receipt writer")
+
+    def record(
+        self,
+        conversation_id: UUID,
+        user_id: UUID,
+        message_id: UUID,
+        read_at: datetime,
+        connection_id: str | None = None,
+    ):
+        """
+        Buffer a read receipt, replacing an unwritten one of the same user
+        in the same conversation.
+
+        :param conversation_id: Conversation ID
+        :param user_id: Reader user ID
+        :param message_id: Last message read
+        :param read_at: Time the message was read
+        :param connection_id: Connection told if the message is not found
+        """
+        self._pending[(conversation_id, user_id)] = PendingReceipt(
+            conversation_id, user_id, message_id, read_at, connection_id
+        )
+        self.receipts_received += 1
+        self._wakeup.set()
+
+    async def _run(self):
+        """Flush the buffer every interval while receipts are pending."""
+        while True:
+            try:
+                if not self._pending:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+
+                await asyncio.sleep(self.settings.WS_READ_RECEIPT_FLUSH_INTERVAL)
+                await self.flush()
+
+            except Exception as e:
+                self.logger.error(f"Error in read receipt writer: {e}")
+                await asyncio.sleep(1)  # Back off on error
+
+    async def flush(self) -> int:
+        """
+        Write the buffered receipts in one transaction, then broadcast
+        them and reject those whose message is not in the conversation.
+
+        :return: Number of receipts written
+        """
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+
+        try:
+            async with self.session_factory() as db:
+                result = await db.execute(
+                    select(messages.c.id, messages.c.conversation_id).where(
+                        messages.c.id.in_(
+                            {r.message_id for r in pending.values()}
+                        ),
+                        messages.c.is_deleted.is_(False),
+                    )
+                )
+                found = {tuple(row) for row in result.all()}
+                written = [
+                    r
+                    for r in pending.values()
+                    if (r.message_id, r.conversation_id) in found
+                ]
+                if written:
+                    params = [
+                        {
+                            "p_conversation_id": r.conversation_id,
+                            "p_user_id": r.user_id,
+                            "p_message_id": r.message_id,
+                            "p_read_at": r.read_at,
+                        }
+                        for r in written
+                    ]
+                    await db.execute(ADVANCE_LAST_READ, params)
+                    await db.execute(SET_READ_AT, params)
+                    await db.commit()
+        except Exception as e:
+            self.logger.error(f"Failed to write read receipts: {e}")
+            # Keep newer receipts that arrived meanwhile
+            for key, receipt in pending.items():
+                self._pending.setdefault(key, receipt)
+            return 0
+
+        self.receipts_written += len(written)
+        for receipt in pending.values():
+            if (receipt.message_id, receipt.conversation_id) in found:
+                await self._broadcast(receipt)
+            elif receipt.connection_id:
+                await self.manager.send_personal_message(
+                    receipt.connection_id,
+                    {
+                        "type": "error",
+                        "error": "Message not found.",
+                        "timestamp": datetime.now(timezone.utc).isoformat(),
+                    },
+                )
+        return len(written)
+
+    async def _broadcast(self, receipt: PendingReceipt):
+        """
+        Tell the other participants, the message's sender among them,
+        that a receipt was written.
+
+        :param receipt: Written receipt
+        """
+        await self.manager.broadcast_to_conversation(
+            str(receipt.conversation_id),
+            {
+                "type": "message_read",
+                "conversation_id": str(receipt.conversation_id),
+                "message_id": str(receipt.message_id),
+                "user_id": str(receipt.user_id),
+                "read_at": receipt.read_at.isoformat(),
+            },
+            exclude_user_id=str(receipt.user_id),
+        )
+
+
+receipt_writer = ReceiptWriter()
+
+
+def get_receipt_writer() -> ReceiptWriter:
+    """Dependency to get the read receipt writer instance."""
+    return receipt_writer
@@ -1,13 +1,284 @@
-import json
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from logging import Logger
-from typing import Any, Set
+from typing import Any, AsyncIterator, Callable, Generic, Set, TypeVar
 
 import redis.asyncio as redis
+from redis import __version__ as REDIS_PY_VERSION
 from redis.asyncio.client import PubSub
+from redis.exceptions import NoScriptError
+from redis.typing import KeyT, StreamIdT
 
+from app.core.codec import Codec, get_codec
 from app.core.config import Settings, get_settings
 from app.core.logger import get_logger
 
+T = TypeVar("T")
+
+# Lua scripts run through RedisClient.run_script {source: name}; they are
+# loaded into the server's script cache on connect
+SCRIPTS: dict[str, str] = {}
+
+
+def register_script(name: str, source: str) -> str:
+    """
+    Register a Lua script so ``RedisClient.connect`` preloads it and its
+    calls are reported under ``name`` in ``RedisClient.script_stats``.
+
+    :param name: Name the script's statistics are kept under
+    :param source: Lua source
+
+    :return: The source, so it can be assigned to a module constant
+    """
+    SCRIPTS.setdefault(source, name)
+    return source
+
+
+class ScriptStats:
+    """Calls, errors and latency of one Lua script."""
+
+    __slots__ = ("calls", "errors", "fallbacks", "total_time", "max_time")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        # Calls that hit NOSCRIPT and were sent again with EVAL
+        self.fallbacks = 0
+        self.total_time = 0.0  # seconds
+        self.max_time = 0.0  # seconds
+
+    def record(self, elapsed: float):
+        """Record one call that took ``elapsed`` seconds."""
+        self.calls += 1
+        self.total_time += elapsed
+        if elapsed > self.max_time:
+            self.max_time = elapsed
+
+    @property
+    def mean_time(self) -> float:
+        """Mean seconds per call."""
+        return self.total_time / self.calls if self.calls else 0.0
+
+
+# Placeholder for a read the near cache has no reply for
+MISSING: Any = object()
+
+# Commands that leave their key unchanged, so running them does not
+# invalidate the key's near cache entry
+READ_COMMANDS = frozenset(
+    {"get", "exists", "ttl", "hget", "hgetall", "hlen", "smembers"}
+    | {"sismember", "scard", "xrange", "xrevrange", "xlen"}
+)
+
+
+class NearCache:
+    """
+    In-process LRU of read replies for keys under selected prefixes.
+
+    Entries are dropped when the server reports their key changed (see
+    ``RedisClient.track_invalidations``) and when this client writes the
+    key. Lookups miss while invalidations are not being received, since
+    entries could then go stale unnoticed.
+    """
+
+    def __init__(self, prefixes: list[str], max_size: int):
+        self.prefixes = tuple(prefixes)
+        self.max_size = max_size
+        # Replies by key and read, least recently used key first
+        # {key: {(command, *args): reply}}
+        self.entries: OrderedDict[str, dict[tuple, Any]] = OrderedDict()
+        # Reads in flight {key: [readers, invalidations since the first]}
+        self.loading: dict[str, list[int]] = {}
+        # Set while the tracking connection receives invalidations
+        self.active = False
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def covers(self, key: str) -> bool:
+        """True if reads of ``key`` can be served from the cache."""
+        return self.active and key.startswith(self.prefixes)
+
+    def lookup(self, key: str, read: tuple) -> Any:
+        """
+        :return: Cached reply of ``read`` on ``key``, or MISSING
+        """
+        replies = self.entries.get(key)
+        reply = MISSING if replies is None else replies.get(read, MISSING)
+        if reply is MISSING:
+            self.misses += 1
+            return MISSING
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        # Callers may modify hashes and sets they get back
+        if isinstance(reply, (dict, set, list)):
+            return reply.copy()
+        return reply
+
+    def begin(self, key: str) -> int:
+        """
+        Note a read of ``key`` sent to the server.
+
+        :return: Token to pass to ``end``
+        """
+        state = self.loading.get(key)
+        if state is None:
+            state = self.loading[key] = [0, 0]
+        state[0] += 1
+        return state[1]
+
+    def end(self, key: str, token: int, read: tuple, reply: Any):
+        """
+        Store the reply of a read begun with ``begin``, unless the key was
+        invalidated while the read was in flight or the read failed
+        (``reply`` is MISSING).
+        """
+        state = self.loading[key]
+        state[0] -= 1
+        if not state[0]:
+            del self.loading[key]
+        if reply is MISSING or state[1] != token or not self.active:
+            return
+
+        replies = self.entries.get(key)
+        if replies is None:
+            if len(self.entries) >= self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            replies = self.entries[key] = {}
+        else:
+            self.entries.move_to_end(key)
+        replies[read] = reply.copy() if isinstance(reply, (dict, set)) else reply
+
+    def invalidate(self, key: str):
+        """Drop the replies cached for ``key`` and discard reads in flight."""
+        if self.entries.pop(key, None) is not None:
+            self.invalidations += 1
+        state = self.loading.get(key)
+        if state is not None:
+            state[1] += 1
+
+    def clear(self):
+        """Drop every entry and discard all reads in flight."""
+        self.invalidations += len(self.entries)
+        self.entries.clear()
+        for state in self.loading.values():
+            state[1] += 1
+
+
+class Queued(Generic[T]):
+    """
+    Result of a command queued on a ``RedisBatch``.
+
+    ``value`` holds the command's default (what the matching
+    ``RedisClient`` method returns on error) until the batch executes.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, default: T):
+        self.value: T = default
+
+
+class RedisBatch:
+    """
+    Commands queued for a single round trip, see ``RedisClient.batch``.
+
+    The methods mirror those of ``RedisClient`` with the same result
+    conversions, but return a ``Queued`` handle instead of awaiting.
+    """
+
+    def __init__(self, codec: Codec):
+        self.codec = codec
+        # (command, args, handle, result conversion)
+        self.commands: list[
+            tuple[str, tuple[Any, ...], Queued, Callable[[Any], Any] | None]
+        ] = []
+        # Whether the commands were sent and answered
+        self.executed = False
+
+    def _queue(
+        self,
+        command: str,
+        *args: Any,
+        default: Any = None,
+        convert: Callable[[Any], Any] | None = None,
+    ) -> Queued:
+        queued = Queued(default)
+        self.commands.append((command, args, queued, convert))
+        return queued
+
+    def get(self, key: str) -> Queued[str | None]:
+        return self._queue("get", key)
+
+    def set(self, key: str, value: str, ttl: int | None = None) -> Queued[bool]:
+        if ttl:
+            return self._queue("setex", key, ttl, value, default=False)
+        return self._queue("set", key, value, default=False)
+
+    def delete(self, *keys: str) -> Queued[int]:
+        return self._queue("delete", *keys, default=0)
+
+    def exists(self, key: str) -> Queued[bool]:
+        return self._queue("exists", key, default=False, convert=_positive)
+
+    def expire(self, key: str, ttl: int) -> Queued[bool]:
+        return self._queue("expire", key, ttl, default=False)
+
+    def hget(self, name: str, key: str) -> Queued[str | None]:
+        return self._queue("hget", name, key)
+
+    def hset(self, name: str, key: str, value: str) -> Queued[bool]:
+        return self._queue(
+            "hset", name, key, value, default=False, convert=_positive
+        )
+
+    def hgetall(self, name: str) -> Queued[dict]:
+        return self._queue("hgetall", name, default={})
+
+    def hdel(self, name: str, *keys: str) -> Queued[int]:
+        return self._queue("hdel", name, *keys, default=0)
+
+    def sadd(self, key: str, *values: str) -> Queued[int]:
+        return self._queue("sadd", key, *values, default=0)
+
+    def srem(self, key: str, *values: str) -> Queued[int]:
+        return self._queue("srem", key, *values, default=0)
+
+    def smembers(self, key: str) -> Queued[Set]:
+        return self._queue("smembers", key, default=set())
+
+    def xrange(
+        self, name: str, start: str, end: str, count: int
+    ) -> Queued[list | None]:
+        return self._queue("xrange", name, start, end, count)
+
+    def xrevrange(
+        self, name: str, end: str, start: str, count: int
+    ) -> Queued[list | None]:
+        return self._queue("xrevrange", name, end, start, count)
+
+    def publish(self, channel: str, message: dict | str | bytes) -> Queued[int]:
+        if isinstance(message, dict):
+            message = self.codec.dumps(message)
+        return self._queue("publish", channel, message, default=0)
+
+
+def _positive(count: int) -> bool:
+    return count > 0
+
 
 class RedisClient:
     def __init__(
@@ -15,9 +286,23 @@ class RedisClient:
     ):
         self.redis: redis.Redis | None = None
         self.pubsub: PubSub | None = None
+        # SHA1 digests of the Lua scripts run so far {source: sha}
+        self.scripts: dict[str, str] = {}
+        # Per-script call statistics {name: stats}
+        self.script_stats: dict[str, ScriptStats] = {}
 
         self.settings = settings or get_settings()
         self.logger = logger or get_logger()
+        # Serializer of published messages and JSON values
+        self.codec = get_codec(self.settings.REDIS_CODEC, self.logger)
+        # Near cache of reads, None unless prefixes are configured
+        self.near_cache: NearCache | None = None
+        if self.settings.REDIS_NEAR_CACHE_PREFIXES:
+            self.near_cache = NearCache(
+                self.settings.REDIS_NEAR_CACHE_PREFIXES,
+                self.settings.REDIS_NEAR_CACHE_SIZE,
+            )
+        self.tracking_task: asyncio.Task | None = None
 
     async def connect(self):
         """Initialize Redis connection."""
@@ -28,6 +313,8 @@ class RedisClient:
                 db=self.settings.REDIS_DB,
                 password=self.settings.REDIS_PASSWORD,
                 decode_responses=self.settings.REDIS_DECODE_RESPONSES,
+                # Binary payloads decode to str losslessly, see app.core.codec
+                encoding_errors="surrogateescape",
                 max_connections=self.settings.REDIS_POOL_SIZE,
             )
 
@@ -37,32 +324,166 @@ class RedisClient:
             self.logger.error(f"Failed to connect to Redis: {e}")
             raise
 
+        await self.load_scripts()
+        if self.near_cache and not self.tracking_task:
+            self.tracking_task = asyncio.create_task(self.track_invalidations())
+
+    async def load_scripts(self):
+        """
+        Load every registered script into the server's script cache, so
+        the first EVALSHA of each already hits.
+        """
+        if not self.redis or not SCRIPTS:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for source in SCRIPTS:
+                    pipe.script_load(source)
+                await pipe.execute()
+            self.logger.info(f"Loaded {len(SCRIPTS)} Redis scripts")
+        except Exception as e:
+            self.logger.error(f"Redis SCRIPT LOAD error: {e}")
+
     async def disconnect(self):
         """Close Redis connection."""
+        if self.tracking_task:
+            self.tracking_task.cancel()
+            try:
+                await self.tracking_task
+            except asyncio.CancelledError:
+                pass
+            self.tracking_task = None
         if self.redis:
             await self.redis.close()
             self.logger.info("Redis connection closed.")
 
+    # ============ Near cache ==============
+
+    async def track_invalidations(self):
+        """
+        Keep the near cache coherent with server-assisted client tracking.
+
+        A dedicated RESP3 connection enables broadcast tracking for the
+        cached prefixes, so the server pushes an ``invalidate`` message
+        whenever a key under them is written, expires or is evicted, by
+        any client. Lookups are served only while the connection is up;
+        after an error the cache is cleared and the connection reopened.
+        The cache stays disabled if redis-py offers no invalidation hook.
+        """
+        cache = self.near_cache
+        prefixes = [
+            arg for prefix in cache.prefixes for arg in ("PREFIX", prefix)
+        ]
+        while True:
+            connection = redis.Connection(
+                host=self.settings.REDIS_HOST,
+                port=self.settings.REDIS_PORT,
+                db=self.settings.REDIS_DB,
+                password=self.settings.REDIS_PASSWORD,
+                decode_responses=self.settings.REDIS_DECODE_RESPONSES,
+                encoding_errors="surrogateescape",
+                protocol=3,
+            )
+            try:
+                await connection.connect()
+                # Private parser API, missing from some redis-py versions
+                # and parsers
+                set_handler = getattr(
+                    getattr(connection, "_parser", None),
+                    "set_invalidation_push_handler",
+                    None,
+                )
+                if set_handler is None:
+                    self.logger.error(
+                        f"redis-py {REDIS_PY_VERSION} does not support "
+                        "invalidation push handlers; near cache disabled"
+                    )
+                    return
+                set_handler(self._handle_invalidation)
+                await connection.send_command(
+                    "CLIENT", "TRACKING", "ON", "BCAST", *prefixes
+                )
+                await connection.read_response()
+                cache.active = True
+                self.logger.info("Redis near cache tracking enabled")
+
+                while True:
+                    await connection.read_response(push_request=True)
+
+            except Exception as e:
+                self.logger.error(f"Redis near cache tracking error: {e}")
+            finally:
+                cache.active = False
+                cache.clear()
+                await connection.disconnect()
+            await asyncio.sleep(1)
+
+    async def _handle_invalidation(self, message: list):
+        """Apply an ``invalidate`` push; no keys means the DB was flushed."""
+        cache = self.near_cache
+        if cache is None:
+            return
+        keys = message[1]
+        if keys is None:
+            cache.clear()
+            return
+        for key in keys:
+            cache.invalidate(key)
+
+    async def _read(self, command: str, key: str, *args: Any) -> Any:
+        """Run a read command, served by the near cache if it covers key."""
+        cache = self.near_cache
+        if cache is None or not cache.covers(key):
+            return await getattr(self.redis, command)(key, *args)
+
+        read = (command, *args)
+        reply = cache.lookup(key, read)
+        if reply is not MISSING:
+            return reply
+
+        token = cache.begin(key)
+        try:
+            reply = await getattr(self.redis, command)(key, *args)
+            return reply
+        finally:
+            cache.end(key, token, read, reply)
+
+    async def _write(self, command: str, key: str, *args: Any) -> Any:
+        """Run a write command, then drop key from the near cache."""
+        try:
+            return await getattr(self.redis, command)(key, *args)
+        finally:
+            self._invalidate(key)
+
+    def _invalidate(self, *keys: Any):
+        """Drop keys written by this client from the near cache."""
+        if self.near_cache:
+            for key in keys:
+                if isinstance(key, str):
+                    self.near_cache.invalidate(key)
+
     # ============ Cache operations ==============
 
     async def get(self, key: str) -> str | None:
         """Get value from Redis by key."""
         try:
             if self.redis:
-                return await self.redis.get(key)
+                return await self._read("get", key)
             else:
                 return None
         except Exception as e:
             self.logger.error(f"Redis GET error for key {key}: {e}")
             return None
 
-    async def set(self, key: str, value: str, ttl: int | None = None) -> bool:
+    async def set(
+        self, key: str, value: str | bytes, ttl: int | None = None
+    ) -> bool:
         """Set value in Redis with optional TTL (seconds)."""
         try:
             if self.redis:
                 if ttl:
-                    return await self.redis.setex(key, ttl, value)
-                return await self.redis.set(key, value)
+                    return await self._write("setex", key, ttl, value)
+                return await self._write("set", key, value)
             else:
                 return False
         except Exception as e:
@@ -73,7 +494,7 @@ class RedisClient:
         """Delete key from Redis."""
         try:
             if self.redis:
-                return await self.redis.delete(key) > 0
+                return await self._write("delete", key) > 0
             else:
                 return 0
         except Exception as e:
@@ -84,7 +505,7 @@ class RedisClient:
         """Check if key exists in Redis."""
         try:
             if self.redis:
-                return await self.redis.exists(key) > 0
+                return await self._read("exists", key) > 0
             else:
                 return False
         except Exception as e:
@@ -108,7 +529,7 @@ class RedisClient:
         """Get value from Redis hash."""
         try:
             if self.redis:
-                return await self.redis.hget(name, key)
+                return await self._read("hget", name, key)
             else:
                 return None
         except Exception as e:
@@ -119,7 +540,7 @@ class RedisClient:
         """Set value in Redis hash."""
         try:
             if self.redis:
-                return await self.redis.hset(name, key, value) > 0
+                return await self._write("hset", name, key, value) > 0
             else:
                 return False
         except Exception as e:
@@ -130,7 +551,7 @@ class RedisClient:
         """Get all key-value pairs from Redis hash."""
         try:
             if self.redis:
-                return await self.redis.hgetall(name)
+                return await self._read("hgetall", name)
             else:
                 return {}
         except Exception as e:
@@ -141,7 +562,7 @@ class RedisClient:
         """Delete key from Redis hash."""
         try:
             if self.redis:
-                return await self.redis.hdel(name, *keys) > 0
+                return await self._write("hdel", name, *keys) > 0
             else:
                 return 0
         except Exception as e:
@@ -154,7 +575,7 @@ class RedisClient:
         """Add values to Redis set."""
         try:
             if self.redis:
-                return await self.redis.sadd(key, *values)
+                return await self._write("sadd", key, *values)
             else:
                 return 0
         except Exception as e:
@@ -165,7 +586,7 @@ class RedisClient:
         """Remove values from Redis set."""
         try:
             if self.redis:
-                return await self.redis.srem(key, *values)
+                return await self._write("srem", key, *values)
             else:
                 return 0
         except Exception as e:
@@ -176,7 +597,7 @@ class RedisClient:
         """Get all members of Redis set."""
         try:
             if self.redis:
-                return await self.redis.smembers(key)
+                return await self._read("smembers", key)
             else:
                 return set()
         except Exception as e:
@@ -187,7 +608,7 @@ class RedisClient:
         """Check if value is a member of Redis set."""
         try:
             if self.redis:
-                return await self.redis.sismember(key, value)
+                return await self._read("sismember", key, value)
             else:
                 return False
         except Exception as e:
@@ -196,12 +617,12 @@ class RedisClient:
 
     # ============ Pub/Sub operations ==============
 
-    async def publish(self, channel: str, message: dict | str) -> int:
-        """Publish message to Redis channel."""
+    async def publish(self, channel: str, message: dict | str | bytes) -> int:
+        """Publish message to Redis channel; dicts are encoded by the codec."""
         try:
             if self.redis:
                 if isinstance(message, dict):
-                    message = json.dumps(message)
+                    message = self.codec.dumps(message)
                 return await self.redis.publish(channel, message)
             else:
                 return 0
@@ -237,19 +658,254 @@ class RedisClient:
             )
 
     async def get_message(
-        self, ignore_subscribe_messages: bool = True
+        self, ignore_subscribe_messages: bool = True, timeout: float = 0.0
     ) -> dict | None:
-        """Get message from subscribed channels."""
+        """
+        Get message from subscribed channels.
+
+        With a positive ``timeout`` the call blocks on the pub/sub socket
+        until a message arrives or the timeout elapses.
+        """
         try:
             if not self.pubsub:
+                # Nothing subscribed yet: wait instead of returning at once so
+                # blocking callers do not spin
+                if timeout:
+                    await asyncio.sleep(timeout)
                 return None
             return await self.pubsub.get_message(
-                ignore_subscribe_messages=ignore_subscribe_messages
+                ignore_subscribe_messages=ignore_subscribe_messages,
+                timeout=timeout,
             )
         except Exception as e:
             self.logger.error(f"Redis GET_MESSAGE error: {e}")
             return None
 
+    # ============ Stream operations ==============
+
+    async def xgroup_create(
+        self, name: str, group: str, id: str = "$", mkstream: bool = True
+    ) -> bool:
+        """
+        Create a consumer group on a stream (and the stream if missing).
+
+        :return: True if the group exists afterwards
+        """
+        try:
+            if self.redis:
+                return await self.redis.xgroup_create(
+                    name, group, id=id, mkstream=mkstream
+                )
+            else:
+                return False
+        except redis.ResponseError as e:
+            if str(e).startswith("BUSYGROUP"):
+                return True
+            self.logger.error(f"Redis XGROUP CREATE error for {name}: {e}")
+            return False
+        except Exception as e:
+            self.logger.error(f"Redis XGROUP CREATE error for {name}: {e}")
+            return False
+
+    async def xreadgroup(
+        self,
+        group: str,
+        consumer: str,
+        streams: dict[KeyT, StreamIdT],
+        count: int | None = None,
+        block: int | None = None,
+    ) -> list[list[Any]] | None:
+        """
+        Read stream entries as a member of a consumer group.
+
+        With ``block`` (milliseconds) the call waits for new entries.
+
+        :return: [[stream, [(entry_id, fields), ...]], ...], or None on
+        error (e.g. the group does not exist)
+        """
+        try:
+            if self.redis:
+                reply = await self.redis.xreadgroup(
+                    group, consumer, streams, count=count, block=block
+                )
+                # Clients without legacy responses answer with a mapping
+                if isinstance(reply, dict):
+                    return [
+                        [stream, entries] for stream, entries in reply.items()
+                    ]
+                return reply
+            else:
+                if block:
+                    await asyncio.sleep(block / 1000)
+                return None
+        except Exception as e:
+            self.logger.error(f"Redis XREADGROUP error for group {group}: {e}")
+            return None
+
+    async def xack(self, name: str, group: str, *ids: str) -> int:
+        """Acknowledge stream entries of a consumer group."""
+        try:
+            if self.redis:
+                return await self.redis.xack(name, group, *ids)
+            else:
+                return 0
+        except Exception as e:
+            self.logger.error(f"Redis XACK error for {name}: {e}")
+            return 0
+
+    async def xautoclaim(
+        self,
+        name: str,
+        group: str,
+        consumer: str,
+        min_idle_time: int,
+        start_id: str = "0-0",
+        count: int | None = None,
+    ) -> list | None:
+        """
+        Transfer entries pending for longer than ``min_idle_time``
+        milliseconds to ``consumer``.
+
+        :return: [next start ID, [(entry_id, fields), ...], ...], or None
+        on error
+        """
+        try:
+            if self.redis:
+                return await self.redis.xautoclaim(
+                    name,
+                    group,
+                    consumer,
+                    min_idle_time,
+                    start_id=start_id,
+                    count=count,
+                )
+            else:
+                return None
+        except Exception as e:
+            self.logger.error(f"Redis XAUTOCLAIM error for {name}: {e}")
+            return None
+
+    # ============ Pipeline and scripting operations ==============
+
+    @asynccontextmanager
+    async def batch(
+        self, transaction: bool = False
+    ) -> AsyncIterator[RedisBatch]:
+        """
+        Queue commands and send them in a single round trip on exit.
+
+        Usage::
+
+            async with redis_client.batch() as batch:
+                chunks = [batch.get(key) for key in keys]
+            values = [chunk.value for chunk in chunks]
+
+        With ``transaction`` the batch is wrapped in MULTI/EXEC. Errors are
+        logged like those of the single-command methods and leave the
+        affected handles at their defaults; ``batch.executed`` tells
+        whether the round trip itself succeeded. Nothing is sent if the
+        block raises. Outside of transactions, reads the near cache can
+        answer are served from it and left out of the round trip.
+        """
+        batch = RedisBatch(self.codec)
+        yield batch
+
+        if not batch.commands or not self.redis:
+            return
+
+        # Near cache misses fill it like single reads do
+        cache = None if transaction else self.near_cache
+        commands: list[
+            tuple[str, tuple[Any, ...], Queued, Callable[[Any], Any] | None]
+        ] = []
+        # Reads sent to fill the cache: (command index, key, token, read)
+        loads: list[tuple[int, str, int, tuple]] = []
+        for command, args, queued, convert in batch.commands:
+            if cache is not None and command in READ_COMMANDS:
+                key, read = args[0], (command, *args[1:])
+                if cache.covers(key):
+                    reply = cache.lookup(key, read)
+                    if reply is not MISSING:
+                        queued.value = convert(reply) if convert else reply
+                        continue
+                    loads.append((len(commands), key, cache.begin(key), read))
+            commands.append((command, args, queued, convert))
+
+        results: list[Any] = [MISSING] * len(commands)
+        try:
+            if commands:
+                async with self.redis.pipeline(transaction=transaction) as pipe:
+                    for command, args, _, _ in commands:
+                        getattr(pipe, command)(*args)
+                    results = await pipe.execute(raise_on_error=False)
+        except Exception as e:
+            self.logger.error(f"Redis PIPELINE error: {e}")
+            return
+        finally:
+            self._invalidate(
+                *(
+                    args[0]
+                    for command, args, _, _ in commands
+                    if command not in READ_COMMANDS
+                )
+            )
+            if cache is not None:
+                for index, key, token, read in loads:
+                    reply = results[index]
+                    if isinstance(reply, Exception):
+                        reply = MISSING
+                    cache.end(key, token, read, reply)
+
+        batch.executed = True
+        for (command, args, queued, convert), result in zip(commands, results):
+            if isinstance(result, Exception):
+                self.logger.error(
+                    f"Redis {command.upper()} error for key {args[0]}: {result}"
+                )
+            else:
+                queued.value = convert(result) if convert else result
+
+    async def run_script(
+        self, script: str, keys: list[str], args: list[Any]
+    ) -> Any:
+        """
+        Run a Lua script atomically in a single round trip.
+
+        The script is invoked via EVALSHA. If the server answers NOSCRIPT
+        (its script cache was flushed, e.g. by a restart) the call is sent
+        again with EVAL, which also caches the script for the next calls.
+        Latency is recorded in ``script_stats`` under the name given to
+        ``register_script``, or the SHA1 prefix for unregistered scripts.
+
+        :return: Script result, or None on error
+        """
+        if not self.redis:
+            return None
+
+        sha = self.scripts.get(script)
+        if sha is None:
+            sha = hashlib.sha1(script.encode()).hexdigest()
+            self.scripts[script] = sha
+        name = SCRIPTS.get(script) or sha[:12]
+        stats = self.script_stats.get(name)
+        if stats is None:
+            stats = self.script_stats[name] = ScriptStats()
+
+        start = time.perf_counter()
+        try:
+            try:
+                return await self.redis.evalsha(sha, len(keys), *keys, *args)
+            except NoScriptError:
+                stats.fallbacks += 1
+                return await self.redis.eval(script, len(keys), *keys, *args)
+        except Exception as e:
+            stats.errors += 1
+            self.logger.error(f"Redis EVALSHA error for script {name}: {e}")
+            return None
+        finally:
+            stats.record(time.perf_counter() - start)
+            self._invalidate(*keys)
+
     # ============ Token denylist operations ==============
 
     async def denylist_token(self, token: str, ttl: int) -> bool:
@@ -263,21 +919,21 @@ class RedisClient:
     # ============ JSON operations ==============
 
     async def get_json(self, key: str) -> Any:
-        """Get JSON value from Redis."""
+        """Get a value stored by ``set_json`` with any codec."""
         value = await self.get(key)
         if value:
             try:
-                return json.loads(value)
-            except json.JSONDecodeError:
+                return self.codec.loads(value)
+            except ValueError:
                 self.logger.error(f"Failed to decode JSON for key {key}")
         return None
 
     async def set_json(
         self, key: str, value: Any, ttl: int | None = None
     ) -> bool:
-        """Set JSON value in Redis."""
+        """Set a JSON-serializable value in Redis, encoded by the codec."""
         try:
-            json_value = json.dumps(value)
+            json_value = self.codec.dumps(value)
             return await self.set(key, json_value, ttl)
         except (TypeError, ValueError) as e:
             self.logger.error(f"Failed to encode JSON for key {key}: {e}")
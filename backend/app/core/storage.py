@@ -360,26 +360,25 @@ class MediaStorage(BaseMinioStorage):
         user_id: uuid.UUID,
         redis_client,
     ) -> dict | None:
-        await redis_client.set(
-            f"upload:{upload_id}:chunk:{chunk_index}",
-            base64.b64encode(chunk).decode(),
-            ex=3600,
-        )
-
-        received = []
-        for i in range(total_chunks):
-            val = await redis_client.get(f"upload:{upload_id}:chunk:{i}")
-            if val:
-                received.append((i, val))
+        keys = [f"upload:{upload_id}:chunk:{i}" for i in range(total_chunks)]
+
+        # Store this chunk and read back all of them in one round trip
+        async with redis_client.batch() as batch:
+            batch.set(
+                f"upload:{upload_id}:chunk:{chunk_index}",
+                base64.b64encode(chunk).decode(),
+                ttl=3600,
+            )
+            chunks = [batch.get(key) for key in keys]
 
+        received = [c.value for c in chunks if c.value]
         if len(received) < total_chunks:
             return None
 
-        received.sort(key=lambda x: x[0])
-        full_content = b"".join(base64.b64decode(v) for _, v in received)
+        full_content = b"".join(base64.b64decode(v) for v in received)
 
-        for i in range(total_chunks):
-            await redis_client.delete(f"upload:{upload_id}:chunk:{i}")
+        async with redis_client.batch() as batch:
+            batch.delete(*keys)
 
         self._validate_file(full_content, mime_type)
         self._virus_scan(full_content)
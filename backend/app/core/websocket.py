@@ -1,14 +1,497 @@
 import asyncio
+import heapq
 import json
+import math
+import random
+import time
 import uuid
+from collections import deque
 from datetime import datetime, timezone
 from logging import Logger
-from typing import Any
+from typing import Any, Callable, Iterable
 
 from fastapi import WebSocket
 
+from app.core.codec import get_codec, msgpack
+from app.core.config import Settings, get_settings
 from app.core.logger import get_logger
-from app.core.redis import RedisClient, get_redis
+from app.core.redis import RedisClient, get_redis, register_script
+
+# Wire encodings a client can negotiate, in server preference order. The
+# names double as Sec-WebSocket-Protocol values.
+WIRE_ENCODINGS = ("msgpack", "json") if msgpack else ("json",)
+
+# Presence transition shared by the scripts below.
+# KEYS[1] = presence hash, ARGV = status, last_seen, ttl, event payload.
+# The event is published only when the status actually changes.
+_PRESENCE_TRANSITION = """
+local previous = redis.call('HGET', KEYS[1], 'status')
+redis.call('HSET', KEYS[1], 'status', ARGV[1], 'last_seen', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+if previous == ARGV[1] then
+    return 0
+end
+redis.call('PUBLISH', 'presence', ARGV[4])
+return 1
+"""
+
+SET_PRESENCE_SCRIPT = register_script("set_presence", _PRESENCE_TRANSITION)
+
+# KEYS[2] = user's connection hash {connection_id: node_id},
+# ARGV[5] = connection ID, ARGV[6] = node ID, ARGV[7] = hash TTL,
+# ARGV[8] = node's connection index {connection_id: user_id}, ARGV[9] =
+# user ID. The index lets the reaper clean up after a crashed node.
+REGISTER_CONNECTION_SCRIPT = register_script(
+    "register_connection",
+    """
+redis.call('HSET', KEYS[2], ARGV[5], ARGV[6])
+redis.call('EXPIRE', KEYS[2], ARGV[7])
+redis.call('HSET', ARGV[8], ARGV[5], ARGV[9])
+"""
+    + _PRESENCE_TRANSITION,
+)
+
+# Goes offline only when the user's last connection is removed.
+# ARGV[6] = node's connection index.
+UNREGISTER_CONNECTION_SCRIPT = register_script(
+    "unregister_connection",
+    """
+redis.call('HDEL', KEYS[2], ARGV[5])
+redis.call('HDEL', ARGV[6], ARGV[5])
+if redis.call('HLEN', KEYS[2]) > 0 then
+    return 0
+end
+"""
+    + _PRESENCE_TRANSITION,
+)
+
+# Delivery of one payload to a node's inbox, prepended to the routing
+# scripts below. ARGV[1] = inbox prefix.
+# Pub/sub: fire-and-forget, lost while the node's listener is away.
+_PUBLISH_TO_NODE = """
+local function deliver(node, payload)
+    return redis.call('PUBLISH', ARGV[1] .. node, payload)
+end
+"""
+
+# Streams: appended to the node's inbox stream and kept until the node's
+# consumer group acknowledges it (at-least-once).
+_APPEND_TO_NODE = """
+local function deliver(node, payload)
+    local key = ARGV[1] .. node .. ':inbox'
+    redis.call('XADD', key, 'MAXLEN', '~', {maxlen}, '*', 'event', payload)
+    redis.call('EXPIRE', key, {ttl})
+    return 1
+end
+"""
+
+# Deliver ARGV[i + 1] to the inbox of every node hosting a connection of
+# the user whose connection hash is KEYS[i]
+_ROUTE_TO_USERS = """
+local delivered = 0
+for i, key in ipairs(KEYS) do
+    local seen = {}
+    for _, node in ipairs(redis.call('HVALS', key)) do
+        if not seen[node] then
+            seen[node] = true
+            delivered = delivered + deliver(node, ARGV[i + 1])
+        end
+    end
+end
+return delivered
+"""
+
+# Deliver ARGV[i + 1] to the inbox of every node hosting a member of the
+# conversation whose node set is KEYS[i]
+_ROUTE_TO_CONVERSATIONS = """
+local delivered = 0
+for i, key in ipairs(KEYS) do
+    for _, node in ipairs(redis.call('SMEMBERS', key)) do
+        delivered = delivered + deliver(node, ARGV[i + 1])
+    end
+end
+return delivered
+"""
+
+# Same as above for one sequenced event, which is also appended to the
+# conversation's replay stream under ID "{seq}-0". KEYS[1] = node set,
+# KEYS[2] = replay stream, ARGV[1] = inbox prefix, ARGV[2] = payload,
+# ARGV[3] = seq, ARGV[4] = event frame, ARGV[5] = MAXLEN, ARGV[6] = TTL.
+# An out-of-order seq is not recorded; resume then sees the gap.
+_RECORD_AND_ROUTE = """
+redis.pcall('XADD', KEYS[2], 'MAXLEN', '~', ARGV[5], ARGV[3] .. '-0',
+    'event', ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[6])
+local delivered = 0
+for _, node in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+    delivered = delivered + deliver(node, ARGV[2])
+end
+return delivered
+"""
+
+# Routing scripts of the default pub/sub transport
+ROUTE_TO_USERS_SCRIPT = register_script(
+    "route_to_users", _PUBLISH_TO_NODE + _ROUTE_TO_USERS
+)
+ROUTE_TO_CONVERSATIONS_SCRIPT = register_script(
+    "route_to_conversations", _PUBLISH_TO_NODE + _ROUTE_TO_CONVERSATIONS
+)
+RECORD_AND_ROUTE_SCRIPT = register_script(
+    "record_and_route", _PUBLISH_TO_NODE + _RECORD_AND_ROUTE
+)
+
+# Elect this node to flush the typing summaries of conversations for one
+# interval and report what changed. For conversation i: KEYS[3i-2] =
+# typing hash {user_id: started_at}, KEYS[3i-1] = flush slot, KEYS[3i] =
+# typers last announced. ARGV[1] = node ID, ARGV[2] = slot TTL in ms,
+# ARGV[3] = staleness cutoff (unix time), ARGV[4] = announced TTL.
+# Returns per conversation {0} if another node holds the slot, else
+# {1, typers} if the summary is unchanged or {2, typers} if it changed.
+FLUSH_TYPING_SCRIPT = register_script(
+    "flush_typing",
+    """
+local results = {}
+for i = 1, #KEYS, 3 do
+    if not redis.call('SET', KEYS[i + 1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+        table.insert(results, {0})
+    else
+        local typers = {}
+        local entries = redis.call('HGETALL', KEYS[i])
+        for j = 1, #entries, 2 do
+            local started_at = tonumber(entries[j + 1])
+            if started_at and started_at >= tonumber(ARGV[3]) then
+                table.insert(typers, entries[j])
+            end
+        end
+        table.sort(typers)
+        local summary = table.concat(typers, ',')
+        if summary == (redis.call('GET', KEYS[i + 2]) or '') then
+            if #typers > 0 then
+                redis.call('EXPIRE', KEYS[i + 2], ARGV[4])
+            end
+            table.insert(results, {1, typers})
+        else
+            if #typers > 0 then
+                redis.call('SET', KEYS[i + 2], summary, 'EX', ARGV[4])
+            else
+                redis.call('DEL', KEYS[i + 2])
+            end
+            table.insert(results, {2, typers})
+        end
+    end
+end
+return results
+""",
+)
+
+# Registry of node IDs that announced liveness
+NODES_KEY = "nodes"
+
+
+def node_key(node_id: str, name: str) -> str:
+    """
+    Redis key of per-node state: ``alive`` (liveness with a short TTL),
+    ``connections`` (hash of connection ID to user ID) or
+    ``conversations`` (set of conversations the node routes).
+    """
+    return f"node:{node_id}:{name}"
+
+
+def presence_event(
+    user_id: str,
+    status: str,
+    last_seen: str,
+    conversation_ids: Iterable[str] = (),
+) -> dict[str, Any]:
+    """
+    Payload of a presence transition on the ``presence`` channel, to be
+    encoded with the publisher's codec.
+
+    :param user_id: User ID
+    :param status: New status (online, away or offline)
+    :param last_seen: ISO timestamp of the transition
+    :param conversation_ids: Conversations whose members should see it
+    """
+    return {
+        "message": {
+            "type": "presence_update",
+            "user_id": user_id,
+            "status": status,
+            "last_seen": last_seen,
+        },
+        "conversation_ids": list(conversation_ids),
+    }
+
+
+def negotiate_encoding(
+    subprotocols: Iterable[str], requested: str | None = None
+) -> tuple[str, str | None]:
+    """
+    Pick the wire encoding of a new connection.
+
+    A supported encoding offered as WebSocket subprotocol wins and is
+    echoed back on accept; otherwise the ``encoding`` query parameter is
+    used. Unknown or unavailable encodings fall back to JSON.
+
+    :param subprotocols: Subprotocols offered by the client
+    :param requested: Encoding requested via query parameter
+
+    :return: (encoding, subprotocol to accept or None)
+    """
+    offered = set(subprotocols or ())
+    for encoding in WIRE_ENCODINGS:
+        if encoding in offered:
+            return encoding, encoding
+    if requested in WIRE_ENCODINGS:
+        return requested, None
+    return "json", None
+
+
+def decode_frame(data: str | bytes, encoding: str = "json") -> Any:
+    """
+    Decode an inbound frame.
+
+    :raises ValueError: If the frame is not valid in the encoding
+    """
+    if encoding == "msgpack":
+        if msgpack is None:
+            raise ValueError("MessagePack frame, msgpack is not installed")
+        try:
+            return msgpack.unpackb(data, raw=False)
+        except Exception as e:
+            raise ValueError(f"Invalid MessagePack frame: {e}") from e
+    return json.loads(data)
+
+
+# Consumer group reading each node's inbox stream
+INBOX_GROUP = "inbox"
+
+
+class RateCounter:
+    """Event counter that also reports the rate over the last full second."""
+
+    def __init__(self):
+        self.total = 0
+        self._second = 0
+        self._current = 0
+        self._previous = 0
+
+    def add(self, count: int = 1):
+        """Record ``count`` events at the current time."""
+        second = int(time.monotonic())
+        if second != self._second:
+            self._previous = self._current if second == self._second + 1 else 0
+            self._second = second
+            self._current = 0
+        self._current += count
+        self.total += count
+
+    @property
+    def per_second(self) -> int:
+        """Events recorded during the last full second."""
+        second = int(time.monotonic())
+        if second == self._second:
+            return self._previous
+        if second == self._second + 1:
+            return self._current
+        return 0
+
+
+class ConnectionWriter:
+    """
+    Bounded outbound queue drained by a dedicated writer task.
+
+    Fan-out code only enqueues pre-encoded frames; the network write
+    happens in the writer task, so one stalled client cannot delay delivery
+    to others. When the queue is full the overflow policy decides whether
+    droppable (ephemeral) frames are discarded or the connection is evicted.
+    """
+
+    __slots__ = (
+        "websocket",
+        "connection_id",
+        "logger",
+        "on_overflow",
+        "max_size",
+        "overflow_policy",
+        "queue",
+        "dropped",
+        "closed",
+        "_ready",
+        "_room",
+        "task",
+    )
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        connection_id: str,
+        logger: Logger,
+        on_overflow: Callable[[str], None],
+        max_size: int = 256,
+        overflow_policy: str = "drop_ephemeral",
+    ):
+        self.websocket = websocket
+        self.connection_id = connection_id
+        self.logger = logger
+        self.on_overflow = on_overflow
+        self.max_size = max_size
+        self.overflow_policy = overflow_policy
+
+        # Queued (frame, droppable) pairs; bytes are sent as binary frames
+        self.queue: deque[tuple[str | bytes, bool]] = deque()
+        self.dropped = 0
+        self.closed = False
+
+        self._ready = asyncio.Event()
+        # Set whenever a frame leaves the queue
+        self._room = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+    def start(self):
+        """Start the writer task."""
+        self.task = asyncio.create_task(self._run())
+
+    def close(self):
+        """Stop accepting frames and cancel the writer task."""
+        self.closed = True
+        self.queue.clear()
+        self._room.set()
+        if self.task:
+            self.task.cancel()
+
+    def _make_room(self, droppable: bool) -> bool:
+        """
+        Apply the overflow policy to a full queue.
+
+        :param droppable: Whether the incoming frame is ephemeral
+
+        :return: True if the incoming frame may be queued
+        """
+        if self.overflow_policy == "drop_ephemeral":
+            if droppable:
+                self.dropped += 1
+                return False
+
+            # Evict the oldest queued ephemeral frame to make room
+            for index, (_, queued_droppable) in enumerate(self.queue):
+                if queued_droppable:
+                    del self.queue[index]
+                    self.dropped += 1
+                    return True
+
+        # Nothing can be dropped - the client is too slow to keep up
+        self.closed = True
+        self.queue.clear()
+        self.on_overflow(self.connection_id)
+        return False
+
+    def enqueue(self, frame: str | bytes, droppable: bool = False) -> bool:
+        """
+        Queue a frame for delivery without waiting for the network.
+
+        :param frame: Encoded text (str) or binary (bytes) frame
+        :param droppable: True for ephemeral frames that may be dropped
+        when the client falls behind
+
+        :return: True if the frame was queued
+        """
+        if self.closed:
+            return False
+
+        if len(self.queue) >= self.max_size and not self._make_room(droppable):
+            return False
+
+        self.queue.append((frame, droppable))
+        self._ready.set()
+        return True
+
+    async def wait_for_room(self, count: int) -> bool:
+        """
+        Wait until ``count`` more frames fit in the queue.
+
+        :return: False if the writer was closed meanwhile
+        """
+        while not self.closed and len(self.queue) + count > self.max_size:
+            self._room.clear()
+            await self._room.wait()
+        return not self.closed
+
+    async def _run(self):
+        """Write queued frames to the socket in order."""
+        while True:
+            if not self.queue:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+
+            frame, _ = self.queue.popleft()
+            self._room.set()
+            try:
+                if isinstance(frame, bytes):
+                    await self.websocket.send_bytes(frame)
+                else:
+                    await self.websocket.send_text(frame)
+            except Exception as e:
+                self.logger.error(
+                    f"Error sending message to {self.connection_id}: {e}"
+                )
+
+
+class Connection:
+    """
+    State of one local WebSocket connection.
+
+    A slotted record keyed once by connection ID, instead of one entry per
+    attribute in several dicts. Heartbeats are kept as monotonic floats.
+    """
+
+    __slots__ = (
+        "websocket",
+        "user_id",
+        "writer",
+        "encoding",
+        "last_heartbeat",
+        "json_heartbeat",
+        "heartbeat_entry",
+        "away",
+        "conversations",
+        "focus",
+        "presence_subscriptions",
+    )
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_id: str,
+        writer: ConnectionWriter,
+        last_heartbeat: float,
+        encoding: str = "json",
+    ):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.writer = writer
+        # Wire encoding of outbound frames ("json" or "msgpack")
+        self.encoding = encoding
+        # Monotonic time of the last heartbeat
+        self.last_heartbeat = last_heartbeat
+        # Set by the first JSON ping; until then liveness is left to the
+        # server's WebSocket ping frames (see WS_PROTOCOL_PING)
+        self.json_heartbeat = False
+        # The connection's live entry in the heartbeat deadline heap;
+        # entries superseded by a later one are dropped when popped
+        self.heartbeat_entry: tuple[float, int, str, str] | None = None
+        # Marked away after WS_AWAY_THRESHOLD seconds without a heartbeat
+        self.away = False
+        # Conversations this connection receives events of
+        self.conversations: set[str] = set()
+        # Conversations the client declared in focus; WS_FOCUS_EVENT_TYPES
+        # events reach only these. None until the first subscribe, so
+        # clients that never declare interest receive everything.
+        self.focus: set[str] | None = None
+        # Users whose presence is explicitly watched; None until the first
+        # subscription since most connections never watch anyone
+        self.presence_subscriptions: set[str] | None = None
 
 
 class ConnectionManager:
@@ -23,27 +506,121 @@ class ConnectionManager:
     """
 
     def __init__(
-        self, logger: Logger | None = None, redis: RedisClient | None = None
+        self,
+        logger: Logger | None = None,
+        redis: RedisClient | None = None,
+        settings: Settings | None = None,
     ):
         self.logger = logger or get_logger()
         self.redis = redis or get_redis()
+        self.settings = settings or get_settings()
+        # Serializer of the events exchanged with other nodes through Redis
+        self.codec = get_codec(self.settings.REDIS_CODEC, self.logger)
 
-        # Local connections on this server instance
-        self.active_connections: dict[str, WebSocket] = {}
+        # Local connections on this server instance {connection_id: state}
+        self.connections: dict[str, Connection] = {}
 
-        # Heartbeat tracking {connection_id: last_heartbeat_time}
-        self.heartbeat: dict[str, datetime] = {}
+        # Fire-and-forget tasks (e.g. evictions) kept alive until done
+        self._background_tasks: set[asyncio.Task] = set()
+
+        # Number of frames serialized for delivery; stays O(1) per event
+        # regardless of how many sockets receive it
+        self.encode_count = 0
+
+        # The heartbeat supervisor's deadline min-heap of (deadline, seq,
+        # connection_id, kind) entries. Entries are validated lazily when
+        # they come due, so a heartbeat is O(1).
+        self._heartbeat_deadlines: list[tuple[float, int, str, str]] = []
+        self._heartbeat_seq = 0
+        self._heartbeat_wakeup = asyncio.Event()
+        self.heartbeat_task: asyncio.Task | None = None
 
         # Redis pub/sub for cross-server communication
         self.pubsub_task: asyncio.Task | None = None
 
+        # Node identity; events for local sockets arrive on its inbox channel
+        self.node_id = self.settings.WS_NODE_ID or uuid.uuid4().hex[:12]
+        self.inbox_channel = f"node:{self.node_id}"
+        self.node_connections_key = node_key(self.node_id, "connections")
+        self.node_conversations_key = node_key(self.node_id, "conversations")
+
+        # Inbox transport: fire-and-forget pub/sub, or a Redis stream read
+        # through this node's consumer group. Each process incarnation
+        # consumes under its own name and reclaims what an earlier one left
+        # unacknowledged.
+        self.use_streams = self.settings.WS_EVENT_TRANSPORT == "streams"
+        if self.use_streams:
+            deliver = _APPEND_TO_NODE.format(
+                maxlen=self.settings.WS_STREAM_MAXLEN,
+                ttl=self.settings.WS_STREAM_TTL,
+            )
+            self.route_to_users_script = register_script(
+                "route_to_users_streams", deliver + _ROUTE_TO_USERS
+            )
+            self.route_to_conversations_script = register_script(
+                "route_to_conversations_streams",
+                deliver + _ROUTE_TO_CONVERSATIONS,
+            )
+            self.record_and_route_script = register_script(
+                "record_and_route_streams", deliver + _RECORD_AND_ROUTE
+            )
+        else:
+            self.route_to_users_script = ROUTE_TO_USERS_SCRIPT
+            self.route_to_conversations_script = ROUTE_TO_CONVERSATIONS_SCRIPT
+            self.record_and_route_script = RECORD_AND_ROUTE_SCRIPT
+        self.inbox_stream = f"{self.inbox_channel}:inbox"
+        self.inbox_consumer = f"{self.node_id}-{uuid.uuid4().hex[:8]}"
+        self.stream_task: asyncio.Task | None = None
+        self._last_claim = 0.0
+
+        # Inbox stream entries handled and reclaimed, for monitoring
+        self.stream_events_handled = 0
+        self.stream_events_reclaimed = 0
+
+        # Drain mode: no new sockets are admitted and existing ones are
+        # closed gradually with a reconnect hint
+        self.draining = False
+        self.drain_task: asyncio.Task | None = None
+
+        # Sockets refused by admission control, for monitoring
+        self.connections_shed = 0
+
+        # Reference counts of conversations with local members
+        # ({conversation_id: number of local connections in it}); this node
+        # is listed in ``conversation:nodes:{id}`` while the count is > 0
+        self._conversation_refs: dict[str, int] = {}
+
         # Typing debounce: {(conv_id, user_id): last_typing_event_time}
-        # Prevents broadcasting "is_typing=True" more than once per 3 seconds.
-        self._typing_last_sent: dict[tuple[str, str], datetime] = {}
+        # Prevents recording "is_typing=True" more than once per
+        # WS_TYPING_DEBOUNCE seconds (monotonic clock).
+        self._typing_last_sent: dict[tuple[str, str], float] = {}
+
+        # Typing aggregation: conversations with unsent typing changes and
+        # those whose last summary listed typers, re-checked until they go
+        # stale. The node holding a conversation's flush slot publishes its
+        # typing_summary, at most once per interval across the cluster.
+        self._typing_dirty: set[str] = set()
+        self._typing_announced: set[str] = set()
+        self._typing_flush_task: asyncio.Task | None = None
+
+        # Reverse map user_id -> {connection_id} of this node's connections;
+        # user-targeted events are delivered from it without asking Redis
+        self.user_connections: dict[str, set[str]] = {}
+
+        # Last time each local user's Redis registration TTL was refreshed
+        self._registration_refreshed: dict[str, float] = {}
+
+        # Conversation fan-out index {conversation_id: {connection_id, ...}}
+        # (the reverse is Connection.conversations) so conversation events
+        # only reach sockets of participants connected to this node.
+        self.conversation_connections: dict[str, set[str]] = {}
+
+        # Explicit presence subscriptions: {watched_user_id: {connection_id}}
+        # (the reverse is Connection.presence_subscriptions)
+        self.presence_subscribers: dict[str, set[str]] = {}
 
-        # Map connection_id -> user_id
-        # (needed for away detection and pub/sub routing)
-        self.connection_user: dict[str, str] = {}
+        # presence_update frames delivered to local sockets
+        self.presence_frames_sent = RateCounter()
 
     # ================ Connection management ================
 
@@ -52,6 +629,9 @@ class ConnectionManager:
         websocket: WebSocket,
         user_id: str,
         connection_id: str | None = None,
+        conversation_ids: Iterable[str] | None = None,
+        encoding: str = "json",
+        subprotocol: str | None = None,
     ) -> str:
         """
         Accept websocket connection and register user
@@ -59,25 +639,61 @@ class ConnectionManager:
         :param websocket: Websocket connection
         :param user_id: User ID from JWT token
         :param connection_id: Optional connection ID (generated if not provided)
+        :param conversation_ids: Conversations the user participates in,
+        used to route conversation events to this connection
+        :param encoding: Negotiated wire encoding (see ``negotiate_encoding``)
+        :param subprotocol: Subprotocol to confirm to the client
 
         :return: Connection ID
         """
-        await websocket.accept()
+        if subprotocol:
+            await websocket.accept(subprotocol=subprotocol)
+        else:
+            await websocket.accept()
 
         # Generate unique connection_id
         if not connection_id:
             connection_id = str(uuid.uuid4())
 
         # Store connections locally
-        self.active_connections[connection_id] = websocket
-        self.heartbeat[connection_id] = datetime.now(timezone.utc)
-        self.connection_user[connection_id] = user_id
-
-        # Track connection in Redis
-        await self._add_user_connection(user_id, connection_id)
-
-        # Set user as online
-        await self.set_user_online(user_id)
+        writer = ConnectionWriter(
+            websocket,
+            connection_id,
+            logger=self.logger,
+            on_overflow=self._evict_slow_consumer,
+            max_size=self.settings.WS_SEND_QUEUE_SIZE,
+            overflow_policy=self.settings.WS_SEND_OVERFLOW_POLICY,
+        )
+        writer.start()
+        now = time.monotonic()
+        connection = Connection(websocket, user_id, writer, now, encoding)
+        self.connections[connection_id] = connection
+        self._schedule_heartbeat_check(
+            connection_id, now + self.settings.WS_AWAY_THRESHOLD, "away"
+        )
+        self.user_connections.setdefault(user_id, set()).add(connection_id)
+        self._registration_refreshed[user_id] = now
+        joined = [
+            conversation_id
+            for conversation_id in conversation_ids or ()
+            if self._index_add(conversation_id, connection_id)
+        ]
+
+        # Route events of the user's conversations to this node
+        await self._acquire_conversations(*joined)
+
+        # Track connection and its node in Redis and set user as online
+        await self._transition_presence(
+            REGISTER_CONNECTION_SCRIPT,
+            user_id,
+            "online",
+            connection_id,
+            self.node_id,
+            self.settings.WS_CONNECTION_TTL,
+            self.node_connections_key,
+            user_id,
+            conversation_ids=connection.conversations,
+        )
 
         self.logger.info(
             f"User {user_id} connected (connection_id: {connection_id})"
@@ -89,6 +705,7 @@ class ConnectionManager:
             {
                 "type": "connection_established",
                 "connection_id": connection_id,
+                "encoding": encoding,
                 "timestamp": datetime.now(timezone.utc).isoformat(),
             },
         )
@@ -103,95 +720,627 @@ class ConnectionManager:
         :param user_id: User ID from JWT token
         """
         # Remove from local connections
-        if connection_id in self.active_connections:
-            del self.active_connections[connection_id]
+        conversation_ids = self.get_connection_conversations(connection_id)
+        await self._drop_local_connection(connection_id)
+
+        # Remove from Redis; the user goes offline with their last connection
+        await self._transition_presence(
+            UNREGISTER_CONNECTION_SCRIPT,
+            user_id,
+            "offline",
+            connection_id,
+            self.node_connections_key,
+            conversation_ids=conversation_ids,
+        )
 
-        if connection_id in self.heartbeat:
-            del self.heartbeat[connection_id]
+        self.logger.info(
+            f"User {user_id} disconnected (connection_id: {connection_id})"
+        )
 
-        if connection_id in self.connection_user:
-            del self.connection_user[connection_id]
+    # ================ Admission and draining ================
 
-        # Remove from Redis
-        await self._remove_user_connection(user_id, connection_id)
+    def admission_refusal(self) -> tuple[int, str] | None:
+        """
+        Check whether this node takes another connection.
 
-        # Check if user has other active connections
-        connections = await self._get_user_connections(user_id)
-        if not connections:
-            # No more active connections - set user offline
-            await self.set_user_offline(user_id)
+        The WS_MAX_CONNECTIONS cap is soft: sockets admitted concurrently
+        may exceed it by the few still in their connect handshake.
+
+        :return: Close code and reason to shed the socket with, or None
+        """
+        if self.draining:
+            return self.settings.WS_DRAIN_CLOSE_CODE, "Node draining"
+
+        limit = self.settings.WS_MAX_CONNECTIONS
+        if limit and len(self.connections) >= limit:
+            return self.settings.WS_OVERLOAD_CLOSE_CODE, "Node at capacity"
+        return None
+
+    async def shed(
+        self,
+        websocket: WebSocket,
+        code: int,
+        reason: str,
+        subprotocol: str | None = None,
+    ):
+        """
+        Refuse a socket with a close code telling the client to retry
+        elsewhere.
+
+        The socket is accepted first: closing during the handshake rejects
+        it with HTTP 403, which clients cannot tell apart from an
+        authentication failure.
+
+        :param websocket: Websocket connection
+        :param code: Close code from ``admission_refusal``
+        :param reason: Close reason
+        :param subprotocol: Subprotocol to confirm to the client
+        """
+        self.connections_shed += 1
+        try:
+            if subprotocol:
+                await websocket.accept(subprotocol=subprotocol)
+            else:
+                await websocket.accept()
+            await websocket.close(code=code, reason=reason)
+        except Exception as e:
+            self.logger.error(f"Error shedding connection: {e}")
+
+    def start_drain(self, duration: float | None = None):
+        """
+        Enter drain mode: stop admitting sockets and migrate existing ones.
+
+        Local connections are closed in small batches spread over
+        ``duration`` seconds, each after a "reconnect" hint, so clients
+        move to other nodes gradually instead of all at once. Calling it
+        again while draining is a no-op.
+
+        :param duration: Seconds to spread closes over (WS_DRAIN_DURATION
+        when None)
+        """
+        if self.draining:
+            return
+        self.draining = True
+        if duration is None:
+            duration = self.settings.WS_DRAIN_DURATION
 
         self.logger.info(
-            f"User {user_id} disconnected (connection_id: {connection_id})"
+            f"Draining {len(self.connections)} connections over {duration}s"
+        )
+        self.drain_task = asyncio.create_task(self._drain(duration))
+
+    async def drain(self, duration: float | None = None):
+        """
+        Enter drain mode and wait until every local socket was migrated.
+
+        :param duration: Seconds to spread closes over (WS_DRAIN_DURATION
+        when None)
+        """
+        self.start_drain(duration)
+        if self.drain_task:
+            await self.drain_task
+
+    async def _drain(self, duration: float):
+        """Close all local connections in batches over ``duration``."""
+        tick = 0.1
+        connection_ids = list(self.connections)
+        if duration > 0:
+            batch = math.ceil(len(connection_ids) * tick / duration)
+        else:
+            batch = len(connection_ids)
+        batch = max(batch, 1)
+
+        for start in range(0, len(connection_ids), batch):
+            await asyncio.gather(
+                *(
+                    self._migrate_connection(connection_id)
+                    for connection_id in connection_ids[start : start + batch]
+                )
+            )
+            await asyncio.sleep(tick)
+
+        self.logger.info(f"Drained {len(connection_ids)} connections")
+
+    async def _migrate_connection(self, connection_id: str):
+        """
+        Send a reconnect hint to a local connection and close it.
+
+        Frames still queued are discarded; the client recovers them with
+        ``resume`` after reconnecting. Regular cleanup happens in
+        ``disconnect`` once the endpoint notices the closed socket.
+        """
+        connection = self.connections.get(connection_id)
+        if connection is None:
+            return
+        connection.writer.close()
+
+        # Jitter the retry so clients of a batch spread over other nodes
+        hint = {
+            "type": "reconnect",
+            "reason": "draining",
+            "retry_after": round(
+                random.uniform(0, self.settings.WS_DRAIN_RECONNECT_JITTER), 3
+            ),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+        frame = self.encode_frame(hint, connection.encoding)
+        try:
+            if isinstance(frame, bytes):
+                await connection.websocket.send_bytes(frame)
+            else:
+                await connection.websocket.send_text(frame)
+        except Exception as e:
+            self.logger.error(
+                f"Error sending reconnect hint to {connection_id}: {e}"
+            )
+
+        await self._close_websocket(
+            connection_id,
+            connection.websocket,
+            code=self.settings.WS_DRAIN_CLOSE_CODE,
+            reason="Node draining",
+        )
+
+    async def stop_drain(self):
+        """Cancel a running drain (called on shutdown)"""
+        if self.drain_task:
+            self.drain_task.cancel()
+            try:
+                await self.drain_task
+            except asyncio.CancelledError:
+                pass
+            self.drain_task = None
+
+    # ================ Conversation membership ================
+
+    def get_connection_conversations(self, connection_id: str) -> set[str]:
+        """
+        Conversations a local connection receives events of.
+
+        :param connection_id: Connection ID
+
+        :return: Conversation IDs (empty for unknown connections)
+        """
+        connection = self.connections.get(connection_id)
+        return connection.conversations if connection else set()
+
+    def _index_add(self, conversation_id: str, connection_id: str) -> bool:
+        """
+        Register a local connection as a member of a conversation.
+
+        :return: True if the connection was not indexed there before
+        """
+        connection = self.connections.get(connection_id)
+        if connection is None:
+            return False
+        conversations = connection.conversations
+        if conversation_id in conversations:
+            return False
+
+        conversations.add(conversation_id)
+        self.conversation_connections.setdefault(conversation_id, set()).add(
+            connection_id
+        )
+        return True
+
+    def _index_discard(self, conversation_id: str, connection_id: str) -> bool:
+        """
+        Remove a local connection from a conversation.
+
+        :return: True if the connection was indexed there
+        """
+        connection = self.connections.get(connection_id)
+        if connection is None or conversation_id not in connection.conversations:
+            return False
+
+        connection.conversations.discard(conversation_id)
+        if connection.focus:
+            connection.focus.discard(conversation_id)
+        members = self.conversation_connections.get(conversation_id)
+        if members is not None:
+            members.discard(connection_id)
+            if not members:
+                del self.conversation_connections[conversation_id]
+        return True
+
+    def _index_remove_connection(self, connection_id: str) -> set[str]:
+        """
+        Drop a connection from every conversation it was indexed in.
+
+        :return: Conversation IDs the connection was removed from
+        """
+        connection = self.connections.get(connection_id)
+        if connection is None:
+            return set()
+
+        conversation_ids, connection.conversations = (
+            connection.conversations,
+            set(),
+        )
+        for conversation_id in conversation_ids:
+            members = self.conversation_connections.get(conversation_id)
+            if members is not None:
+                members.discard(connection_id)
+                if not members:
+                    del self.conversation_connections[conversation_id]
+        return conversation_ids
+
+    def subscribe_conversations(
+        self, connection_id: str, conversation_ids: Iterable[str]
+    ) -> list[str]:
+        """
+        Declare conversations in focus on a local connection.
+
+        From the first call on, WS_FOCUS_EVENT_TYPES events (e.g. typing)
+        are delivered to the connection only for focused conversations;
+        durable events still arrive for every conversation it is in.
+        Conversations the connection is not a member of are ignored.
+
+        :param connection_id: Connection ID
+        :param conversation_ids: Conversations to focus
+
+        :return: All conversations now in focus
+        """
+        connection = self.connections.get(connection_id)
+        if connection is None:
+            return []
+
+        if connection.focus is None:
+            connection.focus = set()
+        connection.focus.update(
+            conversation_id
+            for conversation_id in conversation_ids
+            if conversation_id in connection.conversations
+        )
+        return sorted(connection.focus)
+
+    def unsubscribe_conversations(
+        self, connection_id: str, conversation_ids: Iterable[str] | None = None
+    ) -> list[str]:
+        """
+        Take conversations out of focus on a local connection.
+
+        :param connection_id: Connection ID
+        :param conversation_ids: Conversations to unfocus (all when None)
+
+        :return: Conversations still in focus
+        """
+        connection = self.connections.get(connection_id)
+        if connection is None:
+            return []
+
+        if conversation_ids is None:
+            connection.focus = set()
+        elif connection.focus:
+            connection.focus.difference_update(conversation_ids)
+        return sorted(connection.focus or ())
+
+    async def _apply_membership_change(
+        self, conversation_id: str, user_id: str, joined: bool
+    ):
+        """Update the local index for every connection of a user."""
+        acquired = 0
+        released = 0
+        for connection_id in self.user_connections.get(user_id, ()):
+            if joined:
+                acquired += self._index_add(conversation_id, connection_id)
+            else:
+                released += self._index_discard(conversation_id, connection_id)
+
+        await self._acquire_conversations(*[conversation_id] * acquired)
+        await self._release_conversations(*[conversation_id] * released)
+
+    async def join_conversation(self, conversation_id: str, user_id: str):
+        """
+        Start routing conversation events to a user's connections.
+
+        The local index is updated immediately; other server instances
+        learn about the change through the user's node-addressed events.
+
+        :param conversation_id: Conversation the user was added to
+        :param user_id: User ID
+        """
+        await self._apply_membership_change(
+            conversation_id, user_id, joined=True
+        )
+        await self.send_to_user(
+            user_id,
+            {
+                "type": "conversation_joined",
+                "conversation_id": conversation_id,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+            },
+        )
+
+    async def leave_conversation(self, conversation_id: str, user_id: str):
+        """
+        Stop routing conversation events to a user's connections.
+
+        Called when a user leaves or is removed from a conversation, or
+        when the conversation is deleted.
+
+        :param conversation_id: Conversation the user left
+        :param user_id: User ID
+        """
+        await self._apply_membership_change(
+            conversation_id, user_id, joined=False
+        )
+        await self.send_to_user(
+            user_id,
+            {
+                "type": "conversation_left",
+                "conversation_id": conversation_id,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+            },
         )
 
     # ================ Heartbeat management ================
 
     async def update_heartbeat(self, connection_id: str) -> bool:
         """
-        Update heartbeat timestamp
+        Update heartbeat timestamp from a JSON ping
+
+        A connection previously marked away is switched back to online.
+        From its first JSON ping on, a connection is supervised by its JSON
+        heartbeats (away and timeout) even when protocol pings are enabled.
 
         :param connection_id: Connection ID
 
         :return: True if connection is valid
         """
-        if connection_id in self.active_connections:
-            self.heartbeat[connection_id] = datetime.now(timezone.utc)
-            return True
-        return False
+        connection = self.connections.get(connection_id)
+        if connection is None:
+            return False
+
+        now = time.monotonic()
+        connection.last_heartbeat = now
+        if not connection.json_heartbeat:
+            connection.json_heartbeat = True
+            # Under protocol pings the entry may only come due with the next
+            # registration refresh; move it up to the away deadline
+            deadline = now + self.settings.WS_AWAY_THRESHOLD
+            entry = connection.heartbeat_entry
+            if entry is None or entry[0] > deadline:
+                self._schedule_heartbeat_check(connection_id, deadline, "away")
+
+        await self._refresh_registration(connection.user_id, now)
+
+        if connection.away:
+            connection.away = False
+            await self.set_user_online(
+                connection.user_id, connection.conversations
+            )
+        return True
 
-    async def check_stale_connections(
-        self, timeout_seconds: int = 60, away_threshold_seconds: int = 30
+    async def _refresh_registration(self, user_id: str, now: float):
+        """
+        Keep the user's Redis registration alive, at most once per half
+        WS_CONNECTION_TTL.
+        """
+        ttl = self.settings.WS_CONNECTION_TTL
+        if now - self._registration_refreshed.get(user_id, now) >= ttl / 2:
+            self._registration_refreshed[user_id] = now
+            async with self.redis.batch() as batch:
+                batch.expire(f"user:connections:{user_id}", ttl)
+                batch.expire(f"user:presence:{user_id}", 3600)
+
+    def _schedule_heartbeat_check(
+        self, connection_id: str, deadline: float, kind: str
     ):
         """
-        Check for connections that haven't sent a heartbeat and handle them:
+        Push a heartbeat deadline onto the min-heap. It replaces the
+        connection's previous entry, which is dropped when popped.
 
-        - After away_threshold_seconds without a heartbeat the user is
+        :param connection_id: Connection ID
+        :param deadline: Monotonic time at which to check the connection
+        :param kind: ``"away"`` or ``"timeout"``
+        """
+        if not self._heartbeat_deadlines or (
+            deadline < self._heartbeat_deadlines[0][0]
+        ):
+            # The supervisor sleeps until the earliest deadline; wake it
+            self._heartbeat_wakeup.set()
+
+        self._heartbeat_seq += 1
+        entry = (deadline, self._heartbeat_seq, connection_id, kind)
+        heapq.heappush(self._heartbeat_deadlines, entry)
+        connection = self.connections.get(connection_id)
+        if connection is not None:
+            connection.heartbeat_entry = entry
+
+    async def expire_heartbeats(self, now: float | None = None) -> int:
+        """
+        Handle heartbeat deadlines that are due.
+
+        Only connections whose deadline has passed are looked at:
+
+        - After WS_AWAY_THRESHOLD seconds without a heartbeat the user is
           marked as **away** and a presence_update event is broadcast.
-        - After timeout_seconds the WebSocket is closed and the user is
-          marked as **offline**.
-
-        :param timeout_seconds: Seconds without heartbeat before disconnect
-        :param away_threshold_seconds: Seconds without heartbeat
-        before marking away
-        """
-        now = datetime.now(timezone.utc)
-        stale_connections = []
-        away_connections = []
-
-        for connection_id, last_heartbeat in self.heartbeat.items():
-            elapsed = (now - last_heartbeat).total_seconds()
-            if elapsed > timeout_seconds:
-                stale_connections.append((connection_id, elapsed))
-            elif elapsed > away_threshold_seconds:
-                away_connections.append(connection_id)
-
-        # Mark away users
-        for connection_id in away_connections:
-            user_id = self.connection_user.get(connection_id)
-            if user_id:
-                await self.set_user_away(user_id)
-
-        # Close timed-out connections
-        for connection_id, elapsed in stale_connections:
-            if connection_id in self.active_connections:
+        - After WS_HEARTBEAT_TIMEOUT seconds the WebSocket is closed; the
+          endpoint then marks the user **offline** via ``disconnect``.
+
+        Heartbeats themselves only record a timestamp; a due entry whose
+        connection has been active since is simply rescheduled.
+
+        With WS_PROTOCOL_PING, connections that never sent a JSON ping are
+        kept alive by the server's ping frames: the server closes a peer
+        that stops answering them, so their entries only refresh the Redis
+        registration and come due again after half WS_CONNECTION_TTL.
+
+        :param now: Monotonic time to evaluate against (defaults to now)
+
+        :return: Number of deadlines processed
+        """
+        if now is None:
+            now = time.monotonic()
+
+        away_after = self.settings.WS_AWAY_THRESHOLD
+        timeout_after = self.settings.WS_HEARTBEAT_TIMEOUT
+        protocol_ping = self.settings.WS_PROTOCOL_PING
+        refresh_after = self.settings.WS_CONNECTION_TTL / 2
+        processed = 0
+
+        deadlines = self._heartbeat_deadlines
+        while deadlines and deadlines[0][0] <= now:
+            entry = heapq.heappop(deadlines)
+            _, _, connection_id, kind = entry
+            processed += 1
+
+            connection = self.connections.get(connection_id)
+            if connection is None or connection.heartbeat_entry is not entry:
+                # Connection is gone or was rescheduled; drop the stale entry
+                continue
+
+            if protocol_ping and not connection.json_heartbeat:
+                await self._refresh_registration(connection.user_id, now)
+                self._schedule_heartbeat_check(
+                    connection_id, now + refresh_after, "away"
+                )
+                continue
+
+            last_heartbeat = connection.last_heartbeat
+            elapsed = now - last_heartbeat
+            if elapsed < away_after:
+                self._schedule_heartbeat_check(
+                    connection_id, last_heartbeat + away_after, "away"
+                )
+            elif elapsed < timeout_after:
+                if kind == "away" and not connection.away:
+                    connection.away = True
+                    await self.set_user_away(
+                        connection.user_id, connection.conversations
+                    )
+                self._schedule_heartbeat_check(
+                    connection_id, last_heartbeat + timeout_after, "timeout"
+                )
+            else:
+                await self._close_stale_connection(connection_id, elapsed)
+
+        return processed
+
+    async def _close_stale_connection(self, connection_id: str, elapsed: float):
+        """Close a connection that stopped sending heartbeats."""
+        connection = self.connections.get(connection_id)
+        if connection is None:
+            return
+
+        # Clean up; this also broadcasts offline if it was the last connection
+        await self.disconnect(connection_id, connection.user_id)
+
+        try:
+            await connection.websocket.close(
+                code=1000, reason="Heartbeat timeout"
+            )
+        except Exception as e:
+            self.logger.error(
+                f"Error closing stale connection {connection_id}: {e}"
+            )
+
+        self.logger.warning(
+            f"Closed stale connection: {connection_id} "
+            f"(no heartbeat for {elapsed:.0f}s)"
+        )
+
+    async def start_heartbeat_supervisor(self):
+        """
+        Start the node-wide heartbeat supervisor.
+        This should be called once on application startup.
+        """
+        self.heartbeat_task = asyncio.create_task(
+            self._heartbeat_supervisor_loop()
+        )
+        self.logger.info("Started heartbeat supervisor")
+
+    async def _heartbeat_supervisor_loop(self):
+        """Sleep until the earliest heartbeat deadline, then process it."""
+        while True:
+            try:
+                await self.expire_heartbeats()
+
+                if self._heartbeat_deadlines:
+                    delay = self._heartbeat_deadlines[0][0] - time.monotonic()
+                else:
+                    delay = self.settings.WS_HEARTBEAT_INTERVAL
+
+                self._heartbeat_wakeup.clear()
                 try:
-                    websocket = self.active_connections[connection_id]
-                    await websocket.close(code=1000, reason="Heartbeat timeout")
-                except Exception as e:
-                    self.logger.error(
-                        f"Error closing stale connection {connection_id}: {e}"
+                    await asyncio.wait_for(
+                        self._heartbeat_wakeup.wait(), timeout=max(delay, 0)
                     )
+                except asyncio.TimeoutError:
+                    pass
 
-                # Clean up
-                del self.active_connections[connection_id]
-                del self.heartbeat[connection_id]
-                self.connection_user.pop(connection_id, None)
+            except Exception as e:
+                self.logger.error(f"Error in heartbeat supervisor: {e}")
+                await asyncio.sleep(1)  # Back off on error
+
+    async def stop_heartbeat_supervisor(self):
+        """Stop the heartbeat supervisor (called on shutdown)"""
+        if self.heartbeat_task:
+            self.heartbeat_task.cancel()
+            try:
+                await self.heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self.heartbeat_task = None
+        self.logger.info("Stopped heartbeat supervisor")
+
+    # ================ Node liveness ================
+
+    async def refresh_node_liveness(self):
+        """
+        Mark this node alive for WS_NODE_TTL seconds and keep its
+        connection index from expiring.
 
-                self.logger.warning(
-                    f"Closed stale connection: {connection_id} "
-                    f"(no heartbeat for {elapsed:.0f}s)"
+        A node missing from the registry was taken for dead and reaped,
+        e.g. after a long stall; its local connections are then registered
+        again.
+        """
+        index_ttl = self.settings.WS_CONNECTION_TTL
+        async with self.redis.batch() as batch:
+            batch.set(
+                node_key(self.node_id, "alive"), "1", self.settings.WS_NODE_TTL
+            )
+            registered = batch.sadd(NODES_KEY, self.node_id)
+            batch.expire(self.node_connections_key, index_ttl)
+            batch.expire(self.node_conversations_key, index_ttl)
+        if registered.value and self.connections:
+            self.logger.warning(
+                f"Node {self.node_id} was reaped while alive; "
+                f"registering {len(self.connections)} connections again"
+            )
+            await self._restore_registrations()
+
+    async def _restore_registrations(self):
+        """Register all local connections and conversations in Redis again."""
+        ttl = self.settings.WS_CONNECTION_TTL
+        async with self.redis.batch() as batch:
+            for connection_id, connection in self.connections.items():
+                user_key = f"user:connections:{connection.user_id}"
+                batch.hset(user_key, connection_id, self.node_id)
+                batch.expire(user_key, ttl)
+                batch.hset(
+                    self.node_connections_key, connection_id, connection.user_id
                 )
+            if self._conversation_refs:
+                for conversation_id in self._conversation_refs:
+                    batch.sadd(
+                        f"conversation:nodes:{conversation_id}", self.node_id
+                    )
+                batch.sadd(self.node_conversations_key, *self._conversation_refs)
+
+        # The reaper announced these users offline
+        for user_id, connection_ids in self.user_connections.items():
+            conversation_ids = set()
+            for connection_id in connection_ids:
+                conversation_ids |= self.connections[connection_id].conversations
+            await self.set_user_online(user_id, conversation_ids)
+
+    async def deregister_node(self):
+        """Leave the node registry (called on shutdown)"""
+        async with self.redis.batch() as batch:
+            batch.delete(node_key(self.node_id, "alive"))
+            batch.srem(NODES_KEY, self.node_id)
 
     # ================ Messaging ================
 
@@ -201,103 +1350,420 @@ class ConnectionManager:
         """
         Send message to specific connection.
 
+        The message is put on the connection's outbound queue and written
+        by its writer task; this never waits for the network.
+
         :param connection_id: Target connection ID
         :param message: Message dict to send
         """
-        if connection_id in self.active_connections:
-            try:
-                websocket = self.active_connections[connection_id]
-                await websocket.send_json(message)
-            except Exception as e:
-                self.logger.error(
-                    f"Error sending message to {connection_id}: {e}"
-                )
+        self.broadcast((connection_id,), message)
+
+    async def send_backlog(
+        self, connection_id: str, messages: list[dict[str, Any]]
+    ) -> int:
+        """
+        Send a long run of messages to one connection, e.g. a replay.
+
+        Messages go out in chunks of half the outbound queue, each queued
+        once the writer task made room for it. A backlog longer than the
+        queue is thereby paced by the client instead of overflowing the
+        queue and evicting it as a slow consumer.
+
+        :param connection_id: Target connection ID
+        :param messages: Message dicts in delivery order
+
+        :return: Number of messages queued
+        """
+        connection = self.connections.get(connection_id)
+        if connection is None:
+            return 0
+
+        writer = connection.writer
+        chunk = max(1, writer.max_size // 2)
+        queued = 0
+        for start in range(0, len(messages), chunk):
+            if not await writer.wait_for_room(chunk):
+                break
+            for message in messages[start : start + chunk]:
+                queued += self.broadcast((connection_id,), message)
+        return queued
+
+    def encode_frame(
+        self, message: dict[str, Any], encoding: str = "json"
+    ) -> str | bytes:
+        """
+        Serialize a message into a WebSocket frame.
+
+        JSON uses the same compact encoding as ``WebSocket.send_json`` and
+        yields a text frame; MessagePack yields a binary frame.
+        """
+        self.encode_count += 1
+        # Only negotiated when msgpack is installed
+        if encoding == "msgpack" and msgpack is not None:
+            return msgpack.packb(message)
+        return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+    def broadcast(
+        self, connection_ids: Iterable[str], message: dict[str, Any]
+    ) -> int:
+        """
+        Deliver one event to many local connections.
+
+        The event is serialized once per wire encoding in use among the
+        targets and the same frame is queued on every target connection of
+        that encoding.
+
+        :param connection_ids: Target connection IDs
+        :param message: Message dict
+
+        :return: Number of connections the frame was queued for
+        """
+        frames: dict[str, str | bytes] = {}
+        message_type = message.get("type")
+        droppable = message_type in self.settings.WS_SEND_DROPPABLE_TYPES
+        queued = 0
+        connections = self.connections
+        for connection_id in connection_ids:
+            connection = connections.get(connection_id)
+            if connection is None:
+                continue
+
+            frame = frames.get(connection.encoding)
+            if frame is None:
+                try:
+                    frame = self.encode_frame(message, connection.encoding)
+                except (TypeError, ValueError) as e:
+                    self.logger.error(
+                        f"Failed to encode {message_type} event: {e}"
+                    )
+                    return queued
+                frames[connection.encoding] = frame
+
+            if connection.writer.enqueue(frame, droppable):
+                queued += 1
+        return queued
+
+    def _evict_slow_consumer(self, connection_id: str):
+        """
+        Close a connection whose outbound queue overflowed.
+
+        The close runs in its own task so the fan-out that hit the full
+        queue is not blocked. Regular cleanup happens in ``disconnect`` once
+        the endpoint notices the closed socket.
+        """
+        connection = self.connections.get(connection_id)
+        if connection is None:
+            return
+        connection.writer.close()
+
+        self.logger.warning(
+            f"Evicting slow consumer {connection_id}: outbound queue full"
+        )
+        task = asyncio.create_task(
+            self._close_websocket(
+                connection_id,
+                connection.websocket,
+                code=self.settings.WS_SLOW_CONSUMER_CLOSE_CODE,
+                reason="Slow consumer",
+            )
+        )
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _close_websocket(
+        self, connection_id: str, websocket: WebSocket, code: int, reason: str
+    ):
+        """Close a websocket, logging instead of raising on failure."""
+        try:
+            await websocket.close(code=code, reason=reason)
+        except Exception as e:
+            self.logger.error(f"Error closing connection {connection_id}: {e}")
 
     async def send_to_user(self, user_id: str, message: dict[str, Any]):
         """
         Send message to all connections of a user (across all servers).
 
+        The event is published only to the inboxes of nodes that host a
+        connection of the user.
+
         :param user_id: Target user ID
         :param message: Message dict to send
         """
-        channel = f"user:{user_id}"
-        await self.redis.publish(channel, message)
+        payload = {"kind": "user", "user_id": user_id, "message": message}
+        await self.redis.run_script(
+            self.route_to_users_script,
+            keys=[f"user:connections:{user_id}"],
+            args=["node:", self.codec.dumps(payload)],
+        )
 
     async def broadcast_to_conversation(
         self,
         conversation_id: str,
         message: dict[str, Any],
         exclude_user_id: str | None = None,
+        seq: int | None = None,
     ):
         """
         Broadcast message to all users in a conversation.
 
+        A sequenced event carries its ``seq`` and is kept in the
+        conversation's replay stream so reconnecting clients can resume.
+
         :param conversation_id: Target conversation ID
         :param message: Message dict to send
         :param exclude_user_id: Optional user ID to exclude from broadcast
+        :param seq: Conversation sequence number of the event
+        """
+        if seq is None:
+            await self._publish_to_conversations(
+                [(conversation_id, message, exclude_user_id)]
+            )
+            return
+
+        message = {**message, "seq": seq}
+        payload = {
+            "kind": "conversation",
+            "conversation_id": conversation_id,
+            "message": message,
+            "exclude_user_id": exclude_user_id,
+        }
+        await self.redis.run_script(
+            self.record_and_route_script,
+            keys=[
+                f"conversation:nodes:{conversation_id}",
+                f"conversation:stream:{conversation_id}",
+            ],
+            args=[
+                "node:",
+                self.codec.dumps(payload),
+                seq,
+                self.codec.dumps(message),
+                self.settings.WS_REPLAY_BUFFER_SIZE,
+                self.settings.WS_REPLAY_TTL,
+            ],
+        )
+
+    async def get_replay(
+        self, positions: dict[str, int], limit: int
+    ) -> dict[str, list[dict[str, Any]] | None]:
         """
-        channel = f"conversation:{conversation_id}"
-        payload = {"message": message, "exclude_user_id": exclude_user_id}
-        await self.redis.publish(channel, payload)
+        Read the sequenced events clients missed from the replay streams.
 
-    # ================ User presence ================
+        All streams are read with one pipelined round trip. A conversation
+        maps to None when its stream cannot prove a gap-free delta (it was
+        trimmed, expired or missed an event); the caller then has to fall
+        back to the database.
+
+        :param positions: {conversation_id: last seq seen by the client}
+        :param limit: Max events returned per conversation
+
+        :return: {conversation_id: events after the given seq, or None}
+        """
+        conversation_ids = list(positions)
+        async with self.redis.batch() as batch:
+            # A failed read leaves None, which reads as an unknown position
+            reads = []
+            for conversation_id in conversation_ids:
+                key = f"conversation:stream:{conversation_id}"
+                after = positions[conversation_id]
+                reads.append(
+                    (
+                        batch.xrevrange(key, "+", "-", 1),
+                        batch.xrange(key, f"{after + 1}-0", "+", limit),
+                    )
+                )
 
-    async def _broadcast_presence_update(
-        self, user_id: str, status: str, last_seen: str
+        replay: dict[str, list[dict[str, Any]] | None] = {}
+        for conversation_id, (latest_read, entries_read) in zip(
+            conversation_ids, reads
+        ):
+            latest, entries = latest_read.value, entries_read.value
+            after = positions[conversation_id]
+            if not latest:
+                replay[conversation_id] = None
+                continue
+            if int(latest[0][0].split("-")[0]) <= after:
+                replay[conversation_id] = []
+                continue
+
+            events: list[dict[str, Any]] = []
+            expected = after + 1
+            for entry_id, fields in entries or ():
+                if int(entry_id.split("-")[0]) != expected:
+                    events = []
+                    break
+                events.append(self.codec.loads(fields["event"]))
+                expected += 1
+            replay[conversation_id] = events or None
+        return replay
+
+    async def _publish_to_conversations(
+        self, events: list[tuple[str, dict[str, Any], str | None]]
     ):
         """
-        Publish a standardised ``presence_update`` event to the ``presence``
-        Redis channel so every server instance can forward it to their local
-        WebSocket clients.
+        Publish events to the nodes hosting conversation members.
+
+        All events go out in one script call, each only to the inboxes of
+        nodes that have a local member of its conversation.
+
+        :param events: (conversation_id, message, exclude_user_id) tuples
         """
-        await self.redis.publish(
-            "presence",
-            {
-                "type": "presence_update",
-                "user_id": user_id,
-                "status": status,
-                "last_seen": last_seen,
-            },
+        keys = []
+        args: list[str | bytes] = ["node:"]
+        for conversation_id, message, exclude_user_id in events:
+            keys.append(f"conversation:nodes:{conversation_id}")
+            args.append(
+                self.codec.dumps(
+                    {
+                        "kind": "conversation",
+                        "conversation_id": conversation_id,
+                        "message": message,
+                        "exclude_user_id": exclude_user_id,
+                    }
+                )
+            )
+        await self.redis.run_script(
+            self.route_to_conversations_script, keys=keys, args=args
         )
 
-    async def set_user_online(self, user_id: str):
-        """Mark user as online in Redis and broadcast presence_update."""
-        now = datetime.now(timezone.utc).isoformat()
-        key = f"user:presence:{user_id}"
+    # ================ User presence ================
 
-        await self.redis.hset(key, "status", "online")
-        await self.redis.hset(key, "last_seen", now)
-        await self.redis.expire(key, 3600)  # 1 hour TTL
+    async def _transition_presence(
+        self,
+        script: str,
+        user_id: str,
+        status: str,
+        *extra_args: Any,
+        conversation_ids: Iterable[str] = (),
+    ) -> bool:
+        """
+        Apply a presence transition in a single Redis round trip.
 
-        await self._broadcast_presence_update(user_id, "online", now)
+        The script updates the ``user:presence`` hash and publishes a
+        ``presence_update`` event to the ``presence`` channel, so every
+        server instance can forward it to the local connections interested
+        in this user. No event is published when the status did not change.
 
-    async def set_user_offline(self, user_id: str):
-        """Mark user as offline in Redis and broadcast presence_update."""
-        now = datetime.now(timezone.utc).isoformat()
-        key = f"user:presence:{user_id}"
+        :param script: Lua script to run
+        :param user_id: User ID
+        :param status: New status (online, away or offline)
+        :param extra_args: Additional script arguments
+        :param conversation_ids: Conversations whose members should see it
 
-        await self.redis.hset(key, "status", "offline")
-        await self.redis.hset(key, "last_seen", now)
+        :return: True if the status changed and was broadcast
+        """
+        now = datetime.now(timezone.utc).isoformat()
         # Keep offline presence for 24 h so clients can see last_seen
-        await self.redis.expire(key, 86400)
+        ttl = 86400 if status == "offline" else 3600
+        payload = self.codec.dumps(
+            presence_event(user_id, status, now, conversation_ids)
+        )
 
-        await self._broadcast_presence_update(user_id, "offline", now)
+        changed = await self.redis.run_script(
+            script,
+            keys=[f"user:presence:{user_id}", f"user:connections:{user_id}"],
+            args=[status, now, ttl, payload, *extra_args],
+        )
+        return bool(changed)
+
+    async def set_user_online(
+        self, user_id: str, conversation_ids: Iterable[str] = ()
+    ) -> bool:
+        """Mark user as online in Redis and broadcast presence_update."""
+        return await self._transition_presence(
+            SET_PRESENCE_SCRIPT,
+            user_id,
+            "online",
+            conversation_ids=conversation_ids,
+        )
+
+    async def set_user_offline(
+        self, user_id: str, conversation_ids: Iterable[str] = ()
+    ) -> bool:
+        """Mark user as offline in Redis and broadcast presence_update."""
+        return await self._transition_presence(
+            SET_PRESENCE_SCRIPT,
+            user_id,
+            "offline",
+            conversation_ids=conversation_ids,
+        )
 
-    async def set_user_away(self, user_id: str):
+    async def set_user_away(
+        self, user_id: str, conversation_ids: Iterable[str] = ()
+    ) -> bool:
         """
         Mark user as away in Redis and broadcast presence_update.
 
         Called automatically when the client has not sent a heartbeat for an
         extended period but the connection is still technically open.
         """
-        now = datetime.now(timezone.utc).isoformat()
-        key = f"user:presence:{user_id}"
+        return await self._transition_presence(
+            SET_PRESENCE_SCRIPT,
+            user_id,
+            "away",
+            conversation_ids=conversation_ids,
+        )
+
+    def subscribe_presence(
+        self, connection_id: str, user_ids: Iterable[str]
+    ) -> list[str]:
+        """
+        Subscribe a local connection to presence updates of other users.
 
-        await self.redis.hset(key, "status", "away")
-        await self.redis.hset(key, "last_seen", now)
-        await self.redis.expire(key, 3600)
+        Subscriptions per connection are capped at
+        WS_PRESENCE_MAX_SUBSCRIPTIONS; users beyond the cap are ignored.
 
-        await self._broadcast_presence_update(user_id, "away", now)
+        :param connection_id: Subscribing connection ID
+        :param user_ids: Users to watch
+
+        :return: User IDs the connection is now subscribed to
+        """
+        connection = self.connections.get(connection_id)
+        if connection is None:
+            return []
+
+        watched = connection.presence_subscriptions
+        if watched is None:
+            watched = connection.presence_subscriptions = set()
+        limit = self.settings.WS_PRESENCE_MAX_SUBSCRIPTIONS
+        accepted = []
+        for user_id in user_ids:
+            if user_id not in watched:
+                if len(watched) >= limit:
+                    break
+                watched.add(user_id)
+                self.presence_subscribers.setdefault(user_id, set()).add(
+                    connection_id
+                )
+            accepted.append(user_id)
+        return accepted
+
+    def unsubscribe_presence(
+        self, connection_id: str, user_ids: Iterable[str] | None = None
+    ):
+        """
+        Drop presence subscriptions of a local connection.
+
+        :param connection_id: Connection ID
+        :param user_ids: Users to stop watching (all when None)
+        """
+        connection = self.connections.get(connection_id)
+        watched = connection.presence_subscriptions if connection else None
+        if not watched:
+            return
+
+        for user_id in list(watched if user_ids is None else user_ids):
+            if user_id not in watched:
+                continue
+            watched.discard(user_id)
+            subscribers = self.presence_subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(connection_id)
+                if not subscribers:
+                    del self.presence_subscribers[user_id]
+
+        if not watched:
+            connection.presence_subscriptions = None
 
     async def get_user_presence(self, user_id: str) -> dict[str, Any]:
         """Get user presence status from Redis."""
@@ -312,12 +1778,21 @@ class ConnectionManager:
         """
         Return presence data for multiple users at once.
 
+        The presence hashes are fetched with one pipelined round trip;
+        with ``user:presence:`` among REDIS_NEAR_CACHE_PREFIXES, those in
+        the near cache are served locally.
+
         :param user_ids: List of user ID strings
         :return: List of presence dicts, one per user_id
         """
+        unique = list(dict.fromkeys(user_ids))
+        async with self.redis.batch() as batch:
+            replies = [batch.hgetall(f"user:presence:{uid}") for uid in unique]
+        found = dict(zip(unique, (reply.value for reply in replies)))
+
         results = []
         for user_id in user_ids:
-            presence = await self.get_user_presence(user_id)
+            presence = found.get(user_id) or {}
             results.append(
                 {
                     "user_id": user_id,
@@ -327,6 +1802,8 @@ class ConnectionManager:
             )
         return results
 
+    # ================ Typing indicators ================
+
     async def set_typing_status(
         self, conversation_id: str, user_id: str, is_typing: bool
     ):
@@ -334,67 +1811,233 @@ class ConnectionManager:
         Update typing status for user in conversation.
 
         When ``is_typing`` is ``True``:
-          - Records the timestamp in Redis hash with a 5-second TTL.
-          - Broadcasts a ``typing`` event to all conversation participants
-            except the sender.
+          - Repeats within WS_TYPING_DEBOUNCE seconds are ignored.
+          - Otherwise records the time in the Redis typing hash, which
+            expires after WS_TYPING_TIMEOUT seconds of inactivity.
 
         When ``is_typing`` is ``False``:
           - Removes the user's entry from the typing hash.
-          - Broadcasts the stop-typing event.
+
+        Participants are not notified per event; the conversation is marked
+        for the next ``typing_summary`` flush instead.
 
         :param conversation_id: Conversation ID
         :param user_id: User ID
         :param is_typing: True if user is currently typing
         """
         key = f"conversation:typing:{conversation_id}"
-        now = datetime.now(timezone.utc).isoformat()
+        debounce_key = (conversation_id, user_id)
+        now = time.monotonic()
 
         if is_typing:
-            # Store timestamp; Redis TTL auto-expires after 5 s of inactivity
-            await self.redis.hset(key, user_id, now)
-            await self.redis.expire(key, 5)
+            last_sent = self._typing_last_sent.get(debounce_key)
+            if (
+                last_sent is not None
+                and now - last_sent < self.settings.WS_TYPING_DEBOUNCE
+            ):
+                return
+            self._typing_last_sent[debounce_key] = now
+
+            # Wall-clock time so every server can judge staleness
+            async with self.redis.batch(transaction=True) as batch:
+                batch.hset(key, user_id, str(time.time()))
+                batch.expire(key, self.settings.WS_TYPING_TIMEOUT)
         else:
+            self._typing_last_sent.pop(debounce_key, None)
             await self.redis.hdel(key, user_id)
 
-        # Broadcast typing event to conversation participants
-        await self.broadcast_to_conversation(
-            conversation_id,
-            {
-                "type": "typing",
-                "conversation_id": conversation_id,
-                "user_id": user_id,
-                "is_typing": is_typing,
-                "timestamp": now,
-            },
-            exclude_user_id=user_id,
+        self._typing_dirty.add(conversation_id)
+        if self._typing_flush_task is None:
+            self._typing_flush_task = asyncio.create_task(
+                self._typing_flush_loop()
+            )
+
+    async def _typing_flush_loop(self):
+        """Flush typing summaries every interval while typing is active."""
+        try:
+            while self._typing_dirty or self._typing_announced:
+                await asyncio.sleep(self.settings.WS_TYPING_INTERVAL)
+                await self.flush_typing()
+        except Exception as e:
+            self.logger.error(f"Error flushing typing summaries: {e}")
+        finally:
+            self._typing_flush_task = None
+
+    async def flush_typing(self) -> int:
+        """
+        Publish one ``typing_summary`` per conversation whose set of typing
+        users changed since the last flush.
+
+        Every node hosting a typer flushes its conversations, but only the
+        node that takes a conversation's flush slot (held for one
+        WS_TYPING_INTERVAL) compares its typers with the ones last
+        announced; the others keep it dirty and retry next interval.
+        Conversations with announced typers are re-checked as well, so
+        users who stopped without a ``typing: false`` drop out once their
+        entry is older than WS_TYPING_TIMEOUT. One script call elects and
+        diffs, another publishes: two Redis round trips per flush.
+
+        :return: Number of summaries published
+        """
+        dirty = self._typing_dirty
+        conversation_ids = list(dirty | self._typing_announced)
+        self._typing_dirty = set()
+
+        now = time.monotonic()
+        debounce = self.settings.WS_TYPING_DEBOUNCE
+        for debounce_key, last_sent in list(self._typing_last_sent.items()):
+            if now - last_sent >= debounce:
+                del self._typing_last_sent[debounce_key]
+
+        if not conversation_ids:
+            return 0
+
+        keys = []
+        for conversation_id in conversation_ids:
+            keys.append(f"conversation:typing:{conversation_id}")
+            keys.append(f"conversation:typing_flush:{conversation_id}")
+            keys.append(f"conversation:typing_announced:{conversation_id}")
+        interval = self.settings.WS_TYPING_INTERVAL
+        results = await self.redis.run_script(
+            FLUSH_TYPING_SCRIPT,
+            keys=keys,
+            args=[
+                self.node_id,
+                max(1, int(interval * 1000)),
+                time.time() - self.settings.WS_TYPING_TIMEOUT,
+                math.ceil(self.settings.WS_TYPING_TIMEOUT + interval),
+            ],
         )
+        if not results:
+            self._typing_dirty |= dirty
+            return 0
+
+        timestamp = datetime.now(timezone.utc).isoformat()
+        events: list[tuple[str, dict[str, Any], str | None]] = []
+        for conversation_id, result in zip(conversation_ids, results):
+            if result[0] == 0:
+                # Another node flushes it this interval
+                if conversation_id in dirty:
+                    self._typing_dirty.add(conversation_id)
+                continue
+
+            typers: list[str] = result[1]
+            if typers:
+                self._typing_announced.add(conversation_id)
+            else:
+                self._typing_announced.discard(conversation_id)
+            if result[0] == 1:
+                continue
+
+            events.append(
+                (
+                    conversation_id,
+                    {
+                        "type": "typing_summary",
+                        "conversation_id": conversation_id,
+                        "user_ids": typers,
+                        "timestamp": timestamp,
+                    },
+                    None,
+                )
+            )
 
-    # ================ Redis helper methods ================
+        if events:
+            await self._publish_to_conversations(events)
+        return len(events)
 
-    async def _add_user_connection(self, user_id: str, connection_id: str):
-        """Add connection to user's connection set in Redis"""
-        await self.redis.sadd(f"user:connections:{user_id}", connection_id)
-        await self.redis.expire(f"user:connections:{user_id}", 3600)
+    # ================ Pub/Sub listener ================
 
-    async def _remove_user_connection(self, user_id: str, connection_id: str):
-        """Remove connection from user's connection set in Redis"""
-        await self.redis.srem(f"user:connections:{user_id}", connection_id)
+    async def _acquire_conversations(self, *conversation_ids: str):
+        """
+        Take a reference on conversations, registering this node in
+        ``conversation:nodes`` for the ones that had no local member.
+        """
+        new_conversations = []
+        for conversation_id in conversation_ids:
+            count = self._conversation_refs.get(conversation_id, 0)
+            if count == 0:
+                new_conversations.append(conversation_id)
+            self._conversation_refs[conversation_id] = count + 1
+
+        if new_conversations:
+            async with self.redis.batch() as batch:
+                for conversation_id in new_conversations:
+                    batch.sadd(
+                        f"conversation:nodes:{conversation_id}", self.node_id
+                    )
+                batch.sadd(self.node_conversations_key, *new_conversations)
 
-    async def _get_user_connections(self, user_id: str) -> set:
-        """Get all connection IDs for a user from Redis"""
-        return await self.redis.smembers(f"user:connections:{user_id}")
+    async def _release_conversations(self, *conversation_ids: str):
+        """
+        Drop a reference on conversations, removing this node from
+        ``conversation:nodes`` for the ones without local members.
+        """
+        unused_conversations = []
+        for conversation_id in conversation_ids:
+            count = self._conversation_refs.get(conversation_id, 0)
+            if count <= 1:
+                if count == 1:
+                    unused_conversations.append(conversation_id)
+                self._conversation_refs.pop(conversation_id, None)
+            else:
+                self._conversation_refs[conversation_id] = count - 1
+
+        if unused_conversations:
+            async with self.redis.batch() as batch:
+                for conversation_id in unused_conversations:
+                    batch.srem(
+                        f"conversation:nodes:{conversation_id}", self.node_id
+                    )
+                batch.srem(self.node_conversations_key, *unused_conversations)
 
-    # ================ Pub/Sub listener ================
+    async def _drop_local_connection(self, connection_id: str) -> str | None:
+        """
+        Forget a connection on this server instance and release the
+        conversations it held. Safe to call more than once.
+
+        :return: Owner user ID, or None if the connection was already dropped
+        """
+        connection = self.connections.get(connection_id)
+        if connection is None:
+            return None
+
+        connection.writer.close()
+        user_id = connection.user_id
+        connections = self.user_connections.get(user_id)
+        if connections is not None:
+            connections.discard(connection_id)
+            if not connections:
+                del self.user_connections[user_id]
+                self._registration_refreshed.pop(user_id, None)
+        conversation_ids = self._index_remove_connection(connection_id)
+        self.unsubscribe_presence(connection_id)
+        del self.connections[connection_id]
+
+        await self._release_conversations(*conversation_ids)
+        return user_id
 
     async def start_pubsub_listener(self):
         """
         Start Redis pub/sub listener for cross-server communication.
         This should be called once on application startup.
+
+        User and conversation events are routed to this node's inbox
+        channel (``node:{node_id}``) by the sender, or to its inbox stream
+        (``node:{node_id}:inbox``) with the streams transport.
         """
         try:
             # Subscribe to relevant channels
-            # We'll subscribe to pattern channels for users and conversations
-            await self.redis.subscribe("presence")
+            if self.use_streams:
+                await self.redis.subscribe("presence")
+                await self.redis.xgroup_create(
+                    self.inbox_stream, INBOX_GROUP, id="0"
+                )
+                self.stream_task = asyncio.create_task(
+                    self._stream_listener_loop()
+                )
+            else:
+                await self.redis.subscribe("presence", self.inbox_channel)
 
             self.logger.info("Started Redis pub/sub listener")
 
@@ -406,71 +2049,266 @@ class ConnectionManager:
             raise
 
     async def _pubsub_listener_loop(self):
-        """Main loop for processing pub/sub messages"""
+        """
+        Main loop for processing pub/sub messages.
+
+        Blocks on the pub/sub socket until a message arrives, so events are
+        dispatched as soon as they are read and the loop is idle otherwise.
+        """
         while True:
             try:
                 message = await self.redis.get_message(
-                    ignore_subscribe_messages=True
+                    ignore_subscribe_messages=True,
+                    timeout=self.settings.WS_PUBSUB_BLOCK_TIMEOUT,
                 )
 
                 if message and message["type"] == "message":
                     channel = message["channel"]
-                    data = json.loads(message["data"])
+                    payload = message["data"]
 
                     # Handle presence updates
                     if channel == "presence":
-                        await self._handle_presence_message(data)
+                        await self._handle_presence_message(
+                            self.codec.loads(payload)
+                        )
+
+                    # Handle user and conversation events for this node
+                    elif channel == self.inbox_channel:
+                        await self._handle_node_message(
+                            self.codec.loads(payload)
+                        )
 
-                    # Handle user-specific messages
-                    elif channel.startswith("user:"):
-                        user_id = channel.split(":", 1)[1]
-                        await self._handle_user_message(user_id, data)
+            except Exception as e:
+                self.logger.error(f"Error in pub/sub listener loop: {e}")
+                await asyncio.sleep(1)  # Back off on error
+
+    async def _stream_listener_loop(self):
+        """
+        Main loop for processing this node's inbox stream.
 
-                    # Handle conversation messages
-                    elif channel.startswith("conversation:"):
-                        await self._handle_conversation_message(data)
+        Entries are acknowledged only after they were handled, so events
+        read by a process that died before handling them are reclaimed by
+        the next one (at-least-once delivery).
+        """
+        block = int(self.settings.WS_PUBSUB_BLOCK_TIMEOUT * 1000)
+        claim_interval = self.settings.WS_STREAM_CLAIM_INTERVAL
+        while True:
+            try:
+                now = time.monotonic()
+                if now - self._last_claim >= claim_interval:
+                    self._last_claim = now
+                    await self._reclaim_stream_events()
+
+                reply = await self.redis.xreadgroup(
+                    INBOX_GROUP,
+                    self.inbox_consumer,
+                    {self.inbox_stream: ">"},
+                    count=self.settings.WS_STREAM_READ_COUNT,
+                    block=block,
+                )
+                if reply is None:
+                    # The stream expired with the group or Redis went away:
+                    # recreate the group, reading from the start of the stream
+                    await self.redis.xgroup_create(
+                        self.inbox_stream, INBOX_GROUP, id="0"
+                    )
+                    await asyncio.sleep(1)  # Back off on error
+                    continue
 
-                # Small delay to prevent busy loop
-                await asyncio.sleep(0.01)
+                for _, entries in reply:
+                    await self._handle_stream_entries(entries)
 
             except Exception as e:
-                self.logger.error(f"Error in pub/sub listener loop: {e}")
+                self.logger.error(f"Error in stream listener loop: {e}")
                 await asyncio.sleep(1)  # Back off on error
 
+    async def _reclaim_stream_events(self):
+        """
+        Take over inbox entries left unacknowledged for longer than
+        WS_STREAM_CLAIM_IDLE by an earlier consumer and handle them.
+        """
+        start = "0-0"
+        while True:
+            reply = await self.redis.xautoclaim(
+                self.inbox_stream,
+                INBOX_GROUP,
+                self.inbox_consumer,
+                min_idle_time=self.settings.WS_STREAM_CLAIM_IDLE,
+                start_id=start,
+                count=self.settings.WS_STREAM_READ_COUNT,
+            )
+            if not reply:
+                return
+            start, entries = reply[0], reply[1]
+            entries = [entry for entry in entries if entry and entry[1]]
+            if entries:
+                self.stream_events_reclaimed += len(entries)
+                await self._handle_stream_entries(entries)
+            if start == "0-0":
+                return
+
+    async def _handle_stream_entries(
+        self, entries: list[tuple[str, dict[str, str]]]
+    ):
+        """Handle inbox stream entries, then acknowledge them in one call."""
+        entry_ids = []
+        for entry_id, fields in entries:
+            try:
+                await self._handle_node_message(
+                    self.codec.loads(fields["event"])
+                )
+            except Exception as e:
+                # A malformed entry would otherwise be redelivered forever
+                self.logger.error(
+                    f"Failed to handle inbox entry {entry_id}: {e}"
+                )
+            entry_ids.append(entry_id)
+
+        if entry_ids:
+            await self.redis.xack(self.inbox_stream, INBOX_GROUP, *entry_ids)
+            self.stream_events_handled += len(entry_ids)
+
     async def _handle_presence_message(self, data: dict[str, Any]):
-        """Handle presence update messages"""
-        # Broadcast to all local connections
-        for connection_id in self.active_connections:
-            await self.send_personal_message(connection_id, data)
+        """
+        Handle presence update messages
+
+        The update reaches only local connections that share one of the
+        listed conversations with the user or explicitly subscribed to them.
+        """
+        message = data.get("message", {})
+        user_id = message.get("user_id")
+
+        targets = set(self.presence_subscribers.get(user_id, ()))
+        for conversation_id in data.get("conversation_ids", ()):
+            targets.update(
+                self.conversation_connections.get(conversation_id, ())
+            )
+        if not targets:
+            return
+
+        sent = self.broadcast(targets, message)
+        self.presence_frames_sent.add(sent)
+
+    async def _handle_node_message(self, data: dict[str, Any]):
+        """Dispatch an event delivered to this node's inbox"""
+        kind = data.get("kind")
+        if kind == "user":
+            await self._handle_user_message(
+                data["user_id"], data.get("message", {})
+            )
+        elif kind == "conversation":
+            await self._handle_conversation_message(
+                data["conversation_id"], data
+            )
 
     async def _handle_user_message(self, user_id: str, message: dict[str, Any]):
-        """Handle messages targeted at specific user"""
-        # Find local connections for this user
-        connections = await self._get_user_connections(user_id)
-        for connection_id in connections:
-            if connection_id in self.active_connections:
-                await self.send_personal_message(connection_id, message)
-
-    async def _handle_conversation_message(self, data: dict):
+        """
+        Handle messages targeted at specific user
+
+        :param user_id: Target user ID
+        :param message: Decoded message
+        """
+        # Keep the conversation index in sync with membership changes
+        # made on other server instances
+        message_type = message.get("type")
+        if message_type in ("conversation_joined", "conversation_left"):
+            conversation_id = message.get("conversation_id")
+            if conversation_id:
+                await self._apply_membership_change(
+                    conversation_id,
+                    user_id,
+                    joined=message_type == "conversation_joined",
+                )
+
+        # Deliver to this node's connections of the user
+        connections = self.user_connections.get(user_id)
+        if not connections:
+            return
+        self.broadcast(connections, message)
+
+    async def _handle_conversation_message(
+        self, conversation_id: str, data: dict
+    ):
         """Handle messages for conversation"""
         message = data.get("message", {})
-        _ = data.get("exclude_user_id")
+        exclude_user_id = data.get("exclude_user_id")
+
+        # Only local connections of conversation participants are targeted
+        members = self.conversation_connections.get(conversation_id)
+        if not members:
+            return
+
+        # Ephemeral high-frequency events skip connections that declared
+        # other conversations in focus
+        focus_only = message.get("type") in self.settings.WS_FOCUS_EVENT_TYPES
+        if exclude_user_id or focus_only:
+            connections = self.connections
+            targets = []
+            for connection_id in members:
+                connection = connections[connection_id]
+                if connection.user_id == exclude_user_id:
+                    continue
+                if (
+                    focus_only
+                    and connection.focus is not None
+                    and conversation_id not in connection.focus
+                ):
+                    continue
+                targets.append(connection_id)
+        else:
+            targets = list(members)
 
-        # Broadcast to all local connections except excluded user
-        for connection_id, websocket in self.active_connections.items():
-            # TODO: Check if connection belongs to conversation participant
-            # For now, we'll need to track user_id with connection_id
-            await self.send_personal_message(connection_id, message)
+        if message.get("type") == "typing_summary":
+            self._broadcast_typing_summary(targets, message)
+        else:
+            self.broadcast(targets, message)
+
+    def _broadcast_typing_summary(
+        self, targets: list[str], message: dict[str, Any]
+    ):
+        """
+        Deliver a typing summary, leaving each typer out of the copy sent to
+        their own connections so nobody is shown typing to themselves.
+        """
+        typers = message.get("user_ids") or []
+        others = []
+        by_typer: dict[str, list[str]] = {}
+        for connection_id in targets:
+            user_id = self.connections[connection_id].user_id
+            if user_id in typers:
+                by_typer.setdefault(user_id, []).append(connection_id)
+            else:
+                others.append(connection_id)
+
+        if others:
+            self.broadcast(others, message)
+        for user_id, connection_ids in by_typer.items():
+            self.broadcast(
+                connection_ids,
+                {**message, "user_ids": [u for u in typers if u != user_id]},
+            )
 
     async def stop_pubsub_listener(self):
         """Stop pub/sub listener (called on shutdown)"""
-        if self.pubsub_task:
-            self.pubsub_task.cancel()
-            try:
-                await self.pubsub_task
-            except asyncio.CancelledError:
-                pass
-        await self.redis.unsubscribe("presence")
+        for task in (self.pubsub_task, self.stream_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self.stream_task = None
+        await self.redis.unsubscribe("presence", self.inbox_channel)
+
+        # Stop routing conversation events to this node
+        if self._conversation_refs:
+            async with self.redis.batch() as batch:
+                for conversation_id in self._conversation_refs:
+                    batch.srem(
+                        f"conversation:nodes:{conversation_id}", self.node_id
+                    )
+                batch.delete(self.node_conversations_key)
+            self._conversation_refs.clear()
         self.logger.info("Stopped Redis pub/sub listener")
 
 
@@ -1,6 +1,7 @@
 import uuid
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     DateTime,
     ForeignKey,
@@ -38,6 +39,10 @@ class Conversation(Base, TimestampMixin):
     last_message_at: Mapped[DateTime | None] = mapped_column(
         DateTime(timezone=True), nullable=True
     )
+    # Sequence number of the latest message
+    last_seq: Mapped[int] = mapped_column(
+        BigInteger, default=0, server_default="0", nullable=False
+    )
 
     # Group chat fields
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
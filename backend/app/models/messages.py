@@ -1,6 +1,15 @@
 import uuid
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Index, String, Text, text
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    DateTime,
+    ForeignKey,
+    Index,
+    String,
+    Text,
+    text,
+)
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -13,6 +22,12 @@ class Message(Base, TimestampMixin, IsDeletedMixin):
         Index("idx_messages_conversation", "conversation_id", "created_at"),
         Index("idx_messages_sender", "sender_id"),
         Index("idx_messages_created", "created_at"),
+        Index(
+            "idx_messages_conversation_seq",
+            "conversation_id",
+            "seq",
+            unique=True,
+        ),
     )
 
     id: Mapped[uuid.UUID] = mapped_column(
@@ -32,6 +47,9 @@ class Message(Base, TimestampMixin, IsDeletedMixin):
         nullable=False,
     )
 
+    # Position in the conversation, allocated from Conversation.last_seq
+    seq: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+
     content: Mapped[str | None] = mapped_column(Text, nullable=True)
     message_type: Mapped[str] = mapped_column(
         String(50), default="text", nullable=False
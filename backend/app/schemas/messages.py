@@ -82,6 +82,9 @@ class MessageResponse(BaseModel):
         ..., description="Conversation this message belongs to"
     )
     sender_id: UUID = Field(..., description="User ID of the message sender")
+    seq: int | None = Field(
+        None, description="Position of the message in its conversation"
+    )
     content: str | None = Field(None, description="Text content of the message")
     message_type: str = Field(..., description="Type of message content")
     metadata: dict[str, Any] | None = Field(
@@ -124,6 +127,7 @@ class MessageResponse(BaseModel):
                 "id": "523e4567-e89b-12d3-a456-426614174004",
                 "conversation_id": "223e4567-e89b-12d3-a456-426614174001",
                 "sender_id": "123e4567-e89b-12d3-a456-426614174000",
+                "seq": 42,
                 "content": "Hello there!",
                 "message_type": "text",
                 "metadata": None,
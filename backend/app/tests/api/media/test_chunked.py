@@ -5,6 +5,7 @@ import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.redis import RedisClient
 from app.core.security import create_access_token
 from app.models.conversations import Conversation
 from app.models.messages import Message
@@ -43,14 +44,7 @@ async def test_send_chunk_incomplete(
             new_callable=AsyncMock,
             return_value=None,
         ),
-        patch(
-            "app.api.media.chunked.get_redis",
-            return_value=AsyncMock(
-                get=AsyncMock(return_value="data"),
-                set=AsyncMock(),
-                delete=AsyncMock(),
-            ),
-        ),
+        patch("app.api.media.chunked.get_redis", return_value=RedisClient()),
     ):
         resp = await async_client.post(
             "/api/v1/media/chunked/chunk",
@@ -25,6 +25,7 @@ async def test_send_message(
     assert data["message_type"] == "text"
     assert data["is_edited"] is False
     assert data["is_deleted"] is False
+    assert data["seq"] == 1
 
 
 @pytest.mark.asyncio
@@ -145,6 +145,10 @@ async def test_outer_except_logs_connection_error():
             "app.api.websockets.endpoint.get_user_from_token_ws",
             new=AsyncMock(return_value="user-1"),
         ),
+        patch(
+            "app.api.websockets.endpoint.load_conversation_ids",
+            new=AsyncMock(return_value=set()),
+        ),
         patch(
             "app.api.websockets.endpoint.connection_manager.connect",
             new=AsyncMock(side_effect=error),
@@ -166,16 +170,9 @@ async def test_outer_except_logs_connection_error():
 
 
 @pytest.mark.asyncio
-async def test_finally_cancels_heartbeat_task_and_swallows_cancelled_error():
+async def test_finally_disconnects_without_per_connection_heartbeat_task():
     ws = make_mock_websocket()
-
-    async def endless_heartbeat(_user_id: str):
-        """Simulates the real heartbeat_checker: loops until cancelled."""
-        try:
-            while True:
-                await asyncio.sleep(3600)
-        except asyncio.CancelledError:
-            raise  # let the Task machinery handle it
+    disconnect = AsyncMock()
 
     with (
         patch(
@@ -192,12 +189,13 @@ async def test_finally_cancels_heartbeat_task_and_swallows_cancelled_error():
         ),
         patch(
             "app.api.websockets.endpoint.connection_manager.disconnect",
-            new=AsyncMock(),
-        ),
-        patch(
-            "app.api.websockets.endpoint.heartbeat_checker",
-            new=endless_heartbeat,
+            new=disconnect,
         ),
         patch("app.api.websockets.endpoint.logger"),
     ):
+        tasks_before = len(asyncio.all_tasks())
         await websocket_endpoint(ws)
+
+    # Heartbeats are supervised node-wide; no task is left behind
+    assert len(asyncio.all_tasks()) == tasks_before
+    disconnect.assert_awaited_once_with("conn-1", "user-1")
@@ -1,15 +1,30 @@
-import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.websockets.messages import (
     handle_chat_message,
+    handle_presence_subscribe,
+    handle_presence_unsubscribe,
     handle_read_receipt,
+    handle_resume,
+    handle_subscribe,
     handle_typing,
+    handle_unsubscribe,
     handle_websocket_message,
-    heartbeat_checker,
 )
+from app.core.message_writer import MessageRejected, MessageWriter
+from app.core.receipt_writer import ReceiptWriter
+from app.models.conversation_participants import ConversationParticipant
+from app.models.conversations import Conversation
+from app.models.messages import Message
+from app.models.users import User
+from app.tests.core.conftest import FakeSession
 
 
 @pytest.mark.asyncio
@@ -30,18 +45,170 @@ async def test_handle_websocket_message_dispatches_to_chat_message():
         )
 
         mock_handler.assert_awaited_once_with(
-            "user-1", {"type": "message", "content": "hello"}
+            "user-1", "conn-1", {"type": "message", "content": "hello"}
         )
 
 
 @pytest.mark.asyncio
-async def test_handle_chat_message_logs_info():
-    with patch("app.api.websockets.messages.logger") as mock_logger:
+async def test_handle_chat_message_rejects_invalid_payload():
+    with (
+        patch("app.api.websockets.messages.connection_manager") as mock_manager,
+        patch("app.api.websockets.messages.message_writer") as mock_writer,
+    ):
+        mock_manager.send_personal_message = AsyncMock()
+        mock_writer.submit = AsyncMock()
+
+        await handle_chat_message(
+            str(uuid.uuid4()),
+            "conn-1",
+            {
+                "type": "message",
+                "conversation_id": str(uuid.uuid4()),
+                "client_message_id": "c-1",
+                "message_type": "text",
+            },
+        )
+
+    mock_writer.submit.assert_not_called()
+    connection_id, reply = mock_manager.send_personal_message.call_args.args
+    assert connection_id == "conn-1"
+    assert reply["type"] == "error"
+    assert reply["client_message_id"] == "c-1"
+
+
+@pytest.mark.asyncio
+async def test_handle_chat_message_rejects_invalid_conversation_id():
+    with (
+        patch("app.api.websockets.messages.connection_manager") as mock_manager,
+        patch("app.api.websockets.messages.message_writer") as mock_writer,
+    ):
+        mock_manager.send_personal_message = AsyncMock()
+        mock_writer.submit = AsyncMock()
+
+        await handle_chat_message(
+            str(uuid.uuid4()),
+            "conn-1",
+            {"type": "message", "conversation_id": "nope", "content": "hi"},
+        )
+
+    mock_writer.submit.assert_not_called()
+    reply = mock_manager.send_personal_message.call_args.args[1]
+    assert reply == {
+        "type": "error",
+        "error": "Invalid conversation_id",
+        "timestamp": reply["timestamp"],
+    }
+
+
+@pytest.mark.asyncio
+async def test_handle_chat_message_reports_rejection():
+    with (
+        patch("app.api.websockets.messages.connection_manager") as mock_manager,
+        patch("app.api.websockets.messages.message_writer") as mock_writer,
+    ):
+        mock_manager.send_personal_message = AsyncMock()
+        mock_manager.broadcast_to_conversation = AsyncMock()
+        mock_writer.submit = AsyncMock(
+            side_effect=MessageRejected("Reply target message not found.")
+        )
+
         await handle_chat_message(
-            user_id="user-42", message={"type": "message", "content": "hi"}
+            str(uuid.uuid4()),
+            "conn-1",
+            {
+                "type": "message",
+                "conversation_id": str(uuid.uuid4()),
+                "content": "hi",
+            },
         )
 
-    mock_logger.info.assert_called_once()
+    reply = mock_manager.send_personal_message.call_args.args[1]
+    assert reply["error"] == "Reply target message not found."
+    mock_manager.broadcast_to_conversation.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_handle_chat_message_persists_acks_and_broadcasts(
+    async_session: AsyncSession,
+    seed_direct_conversation: Conversation,
+    seed_activated_user: User,
+):
+    @asynccontextmanager
+    async def session_factory():
+        yield async_session
+
+    writer = MessageWriter(session_factory=session_factory)
+
+    with (
+        patch("app.api.websockets.messages.connection_manager") as mock_manager,
+        patch("app.api.websockets.messages.message_writer", writer),
+    ):
+        mock_manager.send_personal_message = AsyncMock()
+        mock_manager.broadcast_to_conversation = AsyncMock()
+
+        await handle_chat_message(
+            str(seed_activated_user.id),
+            "conn-1",
+            {
+                "type": "message",
+                "conversation_id": str(seed_direct_conversation.id),
+                "client_message_id": "c-1",
+                "content": "Hello over the socket!",
+            },
+        )
+
+    ack = mock_manager.send_personal_message.call_args.args[1]
+    assert ack["type"] == "message_ack"
+    assert ack["client_message_id"] == "c-1"
+
+    saved = await async_session.get(Message, uuid.UUID(ack["message_id"]))
+    assert saved.content == "Hello over the socket!"
+    assert saved.sender_id == seed_activated_user.id
+    assert saved.seq == ack["seq"] == 1
+
+    conversation_id, event = (
+        mock_manager.broadcast_to_conversation.call_args.args
+    )
+    assert conversation_id == str(seed_direct_conversation.id)
+    assert event["type"] == "new_message"
+    assert event["message"]["id"] == ack["message_id"]
+    assert mock_manager.broadcast_to_conversation.call_args.kwargs["seq"] == 1
+
+
+@pytest.mark.asyncio
+async def test_handle_chat_message_rejects_non_participant(
+    async_session: AsyncSession,
+    seed_direct_conversation: Conversation,
+    seed_activated_users: list[User],
+):
+    @asynccontextmanager
+    async def session_factory():
+        yield async_session
+
+    writer = MessageWriter(session_factory=session_factory)
+    outsider = seed_activated_users[2]
+
+    with (
+        patch("app.api.websockets.messages.connection_manager") as mock_manager,
+        patch("app.api.websockets.messages.message_writer", writer),
+    ):
+        mock_manager.send_personal_message = AsyncMock()
+        mock_manager.broadcast_to_conversation = AsyncMock()
+
+        await handle_chat_message(
+            str(outsider.id),
+            "conn-1",
+            {
+                "type": "message",
+                "conversation_id": str(seed_direct_conversation.id),
+                "content": "Let me in",
+            },
+        )
+
+    reply = mock_manager.send_personal_message.call_args.args[1]
+    assert reply["type"] == "error"
+    assert "participant" in reply["error"]
+    mock_manager.broadcast_to_conversation.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -61,19 +228,192 @@ async def test_handle_websocket_message_dispatches_to_read_receipt():
         )
 
         mock_handler.assert_awaited_once_with(
-            "user-1", {"type": "read_receipt", "message_id": "msg-99"}
+            "user-1",
+            "conn-1",
+            {"type": "read_receipt", "message_id": "msg-99"},
         )
 
 
 @pytest.mark.asyncio
-async def test_handle_read_receipt_logs_info():
-    with patch("app.api.websockets.messages.logger") as mock_logger:
+async def test_handle_read_receipt_buffers_receipt():
+    user_id = str(uuid.uuid4())
+    conversation_id = str(uuid.uuid4())
+    message_id = str(uuid.uuid4())
+
+    with (
+        patch("app.api.websockets.messages.connection_manager") as mock_manager,
+        patch("app.api.websockets.messages.receipt_writer") as mock_writer,
+    ):
+        mock_manager.get_connection_conversations.return_value = {
+            conversation_id
+        }
+        mock_manager.broadcast_to_conversation = AsyncMock()
+
+        await handle_read_receipt(
+            user_id,
+            "conn-1",
+            {
+                "type": "read_receipt",
+                "conversation_id": conversation_id,
+                "message_id": message_id,
+            },
+        )
+
+    args = mock_writer.record.call_args.args
+    assert args[:3] == (
+        uuid.UUID(conversation_id),
+        uuid.UUID(user_id),
+        uuid.UUID(message_id),
+    )
+    assert mock_writer.record.call_args.kwargs["connection_id"] == "conn-1"
+    # Broadcast by the writer once the receipt is checked and written
+    mock_manager.broadcast_to_conversation.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_handle_read_receipt_requires_membership():
+    with (
+        patch("app.api.websockets.messages.connection_manager") as mock_manager,
+        patch("app.api.websockets.messages.receipt_writer") as mock_writer,
+    ):
+        mock_manager.get_connection_conversations.return_value = set()
+        mock_manager.send_personal_message = AsyncMock()
+        mock_manager.broadcast_to_conversation = AsyncMock()
+
+        await handle_read_receipt(
+            str(uuid.uuid4()),
+            "conn-1",
+            {
+                "type": "read_receipt",
+                "conversation_id": str(uuid.uuid4()),
+                "message_id": str(uuid.uuid4()),
+            },
+        )
+
+    mock_writer.record.assert_not_called()
+    mock_manager.broadcast_to_conversation.assert_not_called()
+    reply = mock_manager.send_personal_message.call_args.args[1]
+    assert reply["type"] == "error"
+
+
+@pytest.mark.asyncio
+async def test_receipt_writer_broadcasts_only_checked_receipts():
+    conversation_id = uuid.uuid4()
+    user_id = uuid.uuid4()
+    other_user_id = uuid.uuid4()
+    message_id = uuid.uuid4()
+    foreign_message_id = uuid.uuid4()
+    now = datetime.now(timezone.utc)
+
+    found = MagicMock()
+    # Only the first message belongs to the conversation
+    found.all.return_value = [(message_id, conversation_id)]
+    db = FakeSession(found)
+
+    manager = AsyncMock()
+    writer = ReceiptWriter(
+        manager=manager, session_factory=lambda: db, logger=MagicMock()
+    )
+    writer.record(conversation_id, user_id, message_id, now, "conn-1")
+    writer.record(
+        conversation_id, other_user_id, foreign_message_id, now, "conn-2"
+    )
+
+    assert await writer.flush() == 1
+
+    # One lookup for the whole flush, then the two updates
+    assert db.execute.await_count == 3
+    params = db.execute.call_args.args[1]
+    assert [p["p_message_id"] for p in params] == [message_id]
+    target, event = manager.broadcast_to_conversation.call_args.args
+    assert target == str(conversation_id)
+    assert event["type"] == "message_read"
+    assert event["message_id"] == str(message_id)
+    assert event["user_id"] == str(user_id)
+    assert manager.broadcast_to_conversation.call_args.kwargs[
+        "exclude_user_id"
+    ] == str(user_id)
+    manager.broadcast_to_conversation.assert_awaited_once()
+    connection_id, reply = manager.send_personal_message.call_args.args
+    assert connection_id == "conn-2"
+    assert reply["error"] == "Message not found."
+
+
+@pytest.mark.asyncio
+async def test_handle_read_receipt_rejects_invalid_ids():
+    with (
+        patch("app.api.websockets.messages.connection_manager") as mock_manager,
+        patch("app.api.websockets.messages.receipt_writer") as mock_writer,
+    ):
+        mock_manager.send_personal_message = AsyncMock()
+
         await handle_read_receipt(
-            user_id="user-7",
-            message={"type": "read_receipt", "message_id": "m1"},
+            str(uuid.uuid4()),
+            "conn-1",
+            {"type": "read_receipt", "message_id": "m1"},
+        )
+
+    mock_writer.record.assert_not_called()
+    reply = mock_manager.send_personal_message.call_args.args[1]
+    assert reply["error"] == "Invalid conversation_id or message_id"
+
+
+@pytest.mark.asyncio
+async def test_receipt_writer_keeps_latest_receipt(
+    async_session: AsyncSession,
+    seed_direct_conversation: Conversation,
+    seed_activated_user: User,
+    seed_activated_users: list[User],
+):
+    sender = seed_activated_users[0]
+    now = datetime.now(timezone.utc)
+    older, newer = [
+        Message(
+            conversation_id=seed_direct_conversation.id,
+            sender_id=sender.id,
+            content=f"message {i}",
+            created_at=now + timedelta(seconds=i),
+        )
+        for i in range(2)
+    ]
+    async_session.add_all([older, newer])
+    await async_session.commit()
+
+    @asynccontextmanager
+    async def session_factory():
+        yield async_session
+
+    manager = AsyncMock()
+    writer = ReceiptWriter(manager=manager, session_factory=session_factory)
+    reader_id = seed_activated_user.id
+
+    for message in (older, newer, older):
+        writer.record(seed_direct_conversation.id, reader_id, message.id, now)
+    # Only the last receipt per (conversation, user) is written
+    assert await writer.flush() == 1
+
+    participant = await async_session.scalar(
+        select(ConversationParticipant).where(
+            ConversationParticipant.conversation_id
+            == seed_direct_conversation.id,
+            ConversationParticipant.user_id == reader_id,
         )
+    )
+    await async_session.refresh(participant)
+    assert participant.last_read_message_id == older.id
+    manager.broadcast_to_conversation.assert_awaited_once()
+
+    writer.record(seed_direct_conversation.id, reader_id, newer.id, now)
+    assert await writer.flush() == 1
+    await async_session.refresh(participant)
+    assert participant.last_read_message_id == newer.id
 
-    mock_logger.info.assert_called_once()
+    # An older message does not move the read pointer back
+    writer.record(seed_direct_conversation.id, reader_id, older.id, now)
+    await writer.flush()
+    await async_session.refresh(participant)
+    assert participant.last_read_message_id == newer.id
+    assert writer.receipts_received == 5
 
 
 @pytest.mark.asyncio
@@ -93,41 +433,180 @@ async def test_handle_typing_returns_early_without_conversation_id():
 
 
 @pytest.mark.asyncio
-async def test_heartbeat_checker_calls_check_stale_connections():
-    call_count = 0
+async def test_handle_presence_subscribe_replies_with_snapshot():
+    snapshot = [{"user_id": "user-2", "status": "online", "last_seen": None}]
+    with patch("app.api.websockets.messages.connection_manager") as mock_manager:
+        mock_manager.subscribe_presence = MagicMock(return_value=["user-2"])
+        mock_manager.get_bulk_presence = AsyncMock(return_value=snapshot)
+        mock_manager.send_personal_message = AsyncMock()
+
+        await handle_presence_subscribe(
+            "conn-1", {"type": "presence_subscribe", "user_ids": ["user-2"]}
+        )
 
-    async def fake_check(timeout_seconds):
-        nonlocal call_count
-        call_count += 1
-        # Cancel after first real call so the test exits
-        raise asyncio.CancelledError()
+    mock_manager.subscribe_presence.assert_called_once_with("conn-1", ["user-2"])
+    connection_id, reply = mock_manager.send_personal_message.call_args.args
+    assert connection_id == "conn-1"
+    assert reply["type"] == "presence_subscribed"
+    assert reply["presences"] == snapshot
 
+
+@pytest.mark.asyncio
+async def test_handle_presence_subscribe_without_user_ids():
     with (
-        patch("app.api.websockets.messages.asyncio.sleep", return_value=None),
-        patch(
-            "app.api.websockets.messages.connection_manager.check_stale_connections",
-            side_effect=fake_check,
-        ),
+        patch("app.api.websockets.messages.logger") as mock_logger,
+        patch("app.api.websockets.messages.connection_manager") as mock_manager,
     ):
-        # CancelledError is swallowed by inner except
-        await heartbeat_checker("user-1")
+        await handle_presence_subscribe("conn-1", {"type": "presence_subscribe"})
 
-    assert call_count == 1
+    mock_logger.warning.assert_called_once()
+    mock_manager.subscribe_presence.assert_not_called()
 
 
 @pytest.mark.asyncio
-async def test_heartbeat_checker_outer_except_logs_error():
+async def test_handle_presence_unsubscribe_all():
+    with patch("app.api.websockets.messages.connection_manager") as mock_manager:
+        await handle_presence_unsubscribe(
+            "conn-1", {"type": "presence_unsubscribe"}
+        )
+
+    mock_manager.unsubscribe_presence.assert_called_once_with("conn-1", None)
+
+
+@pytest.mark.asyncio
+async def test_handle_subscribe_replies_with_focus():
+    with patch("app.api.websockets.messages.connection_manager") as mock_manager:
+        mock_manager.subscribe_conversations = MagicMock(return_value=["conv-1"])
+        mock_manager.send_personal_message = AsyncMock()
+
+        await handle_websocket_message(
+            {"type": "subscribe", "conversation_ids": ["conv-1", "conv-9"]},
+            user_id="user-1",
+            connection_id="conn-1",
+            websocket=MagicMock(),
+        )
+
+    mock_manager.subscribe_conversations.assert_called_once_with(
+        "conn-1", ["conv-1", "conv-9"]
+    )
+    reply = mock_manager.send_personal_message.call_args.args[1]
+    assert reply["type"] == "subscribed"
+    assert reply["conversation_ids"] == ["conv-1"]
+
+
+@pytest.mark.asyncio
+async def test_handle_subscribe_without_conversation_ids():
     with (
-        patch("app.api.websockets.messages.asyncio.sleep", return_value=None),
-        patch(
-            "app.api.websockets.messages.connection_manager.check_stale_connections",
-            side_effect=Exception("stale check exploded"),
-        ),
         patch("app.api.websockets.messages.logger") as mock_logger,
+        patch("app.api.websockets.messages.connection_manager") as mock_manager,
     ):
-        await heartbeat_checker("user-99")
+        await handle_subscribe("conn-1", {"type": "subscribe"})
+
+    mock_logger.warning.assert_called_once()
+    mock_manager.subscribe_conversations.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_handle_unsubscribe_all():
+    with patch("app.api.websockets.messages.connection_manager") as mock_manager:
+        mock_manager.unsubscribe_conversations = MagicMock(return_value=[])
+        mock_manager.send_personal_message = AsyncMock()
+
+        await handle_unsubscribe("conn-1", {"type": "unsubscribe"})
+
+    mock_manager.unsubscribe_conversations.assert_called_once_with(
+        "conn-1", None
+    )
+    reply = mock_manager.send_personal_message.call_args.args[1]
+    assert reply["conversation_ids"] == []
+
+
+@pytest.mark.asyncio
+async def test_handle_resume_replays_buffered_events():
+    events = [
+        {"type": "new_message", "seq": 4},
+        {"type": "new_message", "seq": 5},
+    ]
+    with patch("app.api.websockets.messages.connection_manager") as mock_manager:
+        mock_manager.get_connection_conversations.return_value = {"conv-1"}
+        mock_manager.get_replay = AsyncMock(return_value={"conv-1": events})
+        mock_manager.send_backlog = AsyncMock()
+
+        await handle_resume(
+            "conn-1",
+            {"type": "resume", "conversations": {"conv-1": 3, "conv-9": 0}},
+        )
+
+    # Conversations the connection is not a member of are ignored
+    assert mock_manager.get_replay.call_args.args[0] == {"conv-1": 3}
+    connection_id, frames = mock_manager.send_backlog.call_args.args
+    assert connection_id == "conn-1"
+    assert frames[:2] == events
+    assert frames[2]["type"] == "resume_complete"
+    assert frames[2]["conversations"]["conv-1"] == {
+        "source": "buffer",
+        "count": 2,
+        "last_seq": 5,
+        "truncated": False,
+    }
+
+
+@pytest.mark.asyncio
+async def test_handle_resume_falls_back_to_database(
+    async_session: AsyncSession,
+    seed_direct_conversation: Conversation,
+    seed_activated_user: User,
+):
+    conversation_id = str(seed_direct_conversation.id)
+    now = datetime.now(timezone.utc)
+    async_session.add_all(
+        [
+            Message(
+                conversation_id=seed_direct_conversation.id,
+                sender_id=seed_activated_user.id,
+                content=f"message {seq}",
+                seq=seq,
+                created_at=now,
+            )
+            for seq in (1, 2, 3)
+        ]
+    )
+    await async_session.commit()
+
+    @asynccontextmanager
+    async def session_factory():
+        yield async_session
+
+    with (
+        patch("app.api.websockets.messages.connection_manager") as mock_manager,
+        patch("app.api.websockets.messages.AsyncSessionLocal", session_factory),
+    ):
+        mock_manager.get_connection_conversations.return_value = {
+            conversation_id
+        }
+        mock_manager.get_replay = AsyncMock(return_value={conversation_id: None})
+        mock_manager.send_backlog = AsyncMock()
+
+        await handle_resume(
+            "conn-1", {"type": "resume", "conversations": {conversation_id: 1}}
+        )
+
+    _, frames = mock_manager.send_backlog.call_args.args
+    assert [frame.get("seq") for frame in frames[:-1]] == [2, 3]
+    assert frames[0]["message"]["content"] == "message 2"
+    summary = frames[-1]["conversations"][conversation_id]
+    assert summary["source"] == "database"
+    assert summary["last_seq"] == 3
+
+
+@pytest.mark.asyncio
+async def test_handle_resume_rejects_invalid_payload():
+    with patch("app.api.websockets.messages.connection_manager") as mock_manager:
+        mock_manager.send_personal_message = AsyncMock()
+        mock_manager.get_replay = AsyncMock()
+
+        await handle_resume("conn-1", {"type": "resume", "conversations": []})
 
-    mock_logger.error.assert_called_once()
-    logged = str(mock_logger.error.call_args)
-    assert "user-99" in logged
-    assert "stale check exploded" in logged
+    mock_manager.get_replay.assert_not_called()
+    reply = mock_manager.send_personal_message.call_args.args[1]
+    assert reply["error"] == "Invalid conversations"
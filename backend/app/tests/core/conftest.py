@@ -0,0 +1,69 @@
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.core.codec import get_codec
+from app.core.redis import RedisBatch
+
+
+class FakeBatch:
+    """
+    Stand-in for ``RedisClient.batch``.
+
+    Every batch sent is recorded in ``calls`` as a list of
+    ``(command, *args)`` tuples. Its handles take the results of the next
+    entry of ``replies`` (None fails the round trip), or keep their
+    defaults once ``replies`` is exhausted.
+    """
+
+    def __init__(self):
+        self.calls: list[list[tuple[Any, ...]]] = []
+        self.transactions: list[bool] = []
+        self.replies: list[list[Any] | None] = []
+
+    @asynccontextmanager
+    async def __call__(
+        self, transaction: bool = False
+    ) -> AsyncIterator[RedisBatch]:
+        batch = RedisBatch(get_codec("json"))
+        yield batch
+
+        if not batch.commands:
+            return
+        self.calls.append(
+            [(command, *args) for command, args, _, _ in batch.commands]
+        )
+        self.transactions.append(transaction)
+        results = self.replies.pop(0) if self.replies else ()
+        if results is None:
+            return
+
+        batch.executed = True
+        for (_, _, queued, convert), result in zip(batch.commands, results):
+            queued.value = convert(result) if convert else result
+
+
+class FakeSession:
+    """
+    Stand-in for the ``AsyncSession`` a session factory opens with
+    ``async with``. ``execute`` is an AsyncMock returning ``result``.
+    """
+
+    def __init__(self, result: Any = None):
+        self.execute = AsyncMock(
+            return_value=MagicMock() if result is None else result
+        )
+        self.commit = AsyncMock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def fake_batch() -> FakeBatch:
+    return FakeBatch()
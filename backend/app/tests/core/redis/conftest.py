@@ -8,6 +8,14 @@ from redis.asyncio.client import PubSub
 from app.core.redis import RedisClient
 
 
+def make_pipeline(results: list) -> MagicMock:
+    pipe = MagicMock()
+    pipe.__aenter__ = AsyncMock(return_value=pipe)
+    pipe.__aexit__ = AsyncMock(return_value=None)
+    pipe.execute = AsyncMock(return_value=results)
+    return pipe
+
+
 @pytest.fixture
 def mock_logger() -> AsyncMock:
     mock = AsyncMock(spec=Logger)
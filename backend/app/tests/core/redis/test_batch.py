@@ -0,0 +1,99 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.core.redis import RedisClient
+from app.tests.core.redis.conftest import make_pipeline
+
+
+@pytest.mark.asyncio
+async def test_batch_sends_queued_commands_in_one_round_trip(
+    redis_client_instance: RedisClient, mock_redis_conn: AsyncMock
+):
+    pipe = make_pipeline(["v1", None, 2, 1])
+    mock_redis_conn.pipeline = MagicMock(return_value=pipe)
+
+    async with redis_client_instance.batch() as batch:
+        first = batch.get("k1")
+        second = batch.get("k2")
+        deleted = batch.delete("k1", "k2")
+        exists = batch.exists("k3")
+        # Nothing is sent before the block exits
+        pipe.execute.assert_not_called()
+
+    assert batch.executed
+    assert first.value == "v1"
+    assert second.value is None
+    assert deleted.value == 2
+    assert exists.value is True
+    mock_redis_conn.pipeline.assert_called_once_with(transaction=False)
+    pipe.delete.assert_called_once_with("k1", "k2")
+    pipe.execute.assert_awaited_once_with(raise_on_error=False)
+
+
+@pytest.mark.asyncio
+async def test_batch_with_transaction_and_ttl(
+    redis_client_instance: RedisClient, mock_redis_conn: AsyncMock
+):
+    pipe = make_pipeline([True, 1])
+    mock_redis_conn.pipeline = MagicMock(return_value=pipe)
+
+    async with redis_client_instance.batch(transaction=True) as batch:
+        stored = batch.set("key", "value", ttl=60)
+        added = batch.hset("hash", "field", "value")
+
+    assert stored.value is True
+    assert added.value is True
+    mock_redis_conn.pipeline.assert_called_once_with(transaction=True)
+    pipe.setex.assert_called_once_with("key", 60, "value")
+
+
+@pytest.mark.asyncio
+async def test_batch_logs_failed_command(
+    redis_client_instance: RedisClient,
+    mock_redis_conn: AsyncMock,
+    mock_logger: AsyncMock,
+):
+    pipe = make_pipeline([Exception("WRONGTYPE"), {"a": "1"}])
+    mock_redis_conn.pipeline = MagicMock(return_value=pipe)
+
+    async with redis_client_instance.batch() as batch:
+        members = batch.smembers("hash")
+        fields = batch.hgetall("hash")
+
+    # The failed command keeps its default, the others still get results
+    assert batch.executed
+    assert members.value == set()
+    assert fields.value == {"a": "1"}
+    assert "SMEMBERS" in str(mock_logger.error.call_args)
+
+
+@pytest.mark.asyncio
+async def test_batch_error_keeps_defaults(
+    redis_client_instance: RedisClient,
+    mock_redis_conn: AsyncMock,
+    mock_logger: AsyncMock,
+):
+    pipe = make_pipeline([])
+    pipe.execute = AsyncMock(side_effect=Exception("Connection lost"))
+    mock_redis_conn.pipeline = MagicMock(return_value=pipe)
+
+    async with redis_client_instance.batch() as batch:
+        value = batch.get("key")
+        count = batch.sadd("set", "a")
+
+    assert not batch.executed
+    assert value.value is None
+    assert count.value == 0
+    assert mock_logger.error.called
+
+
+@pytest.mark.asyncio
+async def test_batch_when_not_connected():
+    client = RedisClient()
+
+    async with client.batch() as batch:
+        value = batch.exists("key")
+
+    assert not batch.executed
+    assert value.value is False
@@ -3,6 +3,7 @@ from unittest.mock import AsyncMock
 
 import pytest
 
+from app.core.codec import get_codec
 from app.core.redis import RedisClient
 
 
@@ -70,3 +71,21 @@ async def test_set_json_non_serializable(
     result = await redis_client_instance.set_json("test_key", obj)
 
     assert result is False
+
+
+@pytest.mark.asyncio
+async def test_json_values_are_read_whatever_codec_wrote_them(
+    redis_client_instance: RedisClient, mock_redis_conn: AsyncMock
+):
+    pytest.importorskip("msgpack")
+    test_data = {"key": "value", "list": [1, 2, 3]}
+    redis_client_instance.codec = get_codec("msgpack")
+
+    await redis_client_instance.set_json("test_key", test_data)
+    stored_value = mock_redis_conn.set.call_args[0][1]
+    redis_client_instance.codec = get_codec("json")
+    mock_redis_conn.get = AsyncMock(
+        return_value=stored_value.decode("utf-8", "surrogateescape")
+    )
+
+    assert await redis_client_instance.get_json("test_key") == test_data
@@ -0,0 +1,168 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.core.redis import MISSING, NearCache, RedisClient
+from app.tests.core.redis.conftest import make_pipeline
+
+
+@pytest.fixture
+def near_cache() -> NearCache:
+    cache = NearCache(["denylist:", "user:presence:"], max_size=2)
+    cache.active = True
+    return cache
+
+
+@pytest.fixture
+def cached_client(
+    redis_client_instance: RedisClient, near_cache: NearCache
+) -> RedisClient:
+    redis_client_instance.near_cache = near_cache
+    return redis_client_instance
+
+
+def fill(cache: NearCache, key: str, read: tuple, reply):
+    cache.end(key, cache.begin(key), read, reply)
+
+
+def test_covers_prefixes_only_while_active(near_cache: NearCache):
+    assert near_cache.covers("denylist:abc")
+    assert not near_cache.covers("user:connections:1")
+
+    near_cache.active = False
+    assert not near_cache.covers("denylist:abc")
+
+
+def test_lookup_hit_miss_and_copy(near_cache: NearCache):
+    read = ("hgetall",)
+    assert near_cache.lookup("user:presence:1", read) is MISSING
+
+    fill(near_cache, "user:presence:1", read, {"status": "online"})
+    presence = near_cache.lookup("user:presence:1", read)
+    presence["status"] = "away"
+
+    assert near_cache.lookup("user:presence:1", read) == {"status": "online"}
+    assert (near_cache.hits, near_cache.misses) == (2, 1)
+    assert near_cache.hit_rate == pytest.approx(2 / 3)
+
+
+def test_least_recently_used_key_is_evicted(near_cache: NearCache):
+    fill(near_cache, "denylist:a", ("exists",), 1)
+    fill(near_cache, "denylist:b", ("exists",), 0)
+    near_cache.lookup("denylist:a", ("exists",))
+    fill(near_cache, "denylist:c", ("exists",), 1)
+
+    assert list(near_cache.entries) == ["denylist:a", "denylist:c"]
+    assert near_cache.evictions == 1
+
+
+def test_read_invalidated_in_flight_is_not_stored(near_cache: NearCache):
+    token = near_cache.begin("denylist:a")
+    near_cache.invalidate("denylist:a")
+    near_cache.end("denylist:a", token, ("exists",), 0)
+
+    assert "denylist:a" not in near_cache.entries
+    assert not near_cache.loading
+
+
+@pytest.mark.asyncio
+async def test_repeated_read_costs_one_round_trip(
+    cached_client: RedisClient, mock_redis_conn: AsyncMock
+):
+    mock_redis_conn.exists = AsyncMock(return_value=0)
+
+    assert await cached_client.is_token_denied("abc") is False
+    assert await cached_client.is_token_denied("abc") is False
+
+    mock_redis_conn.exists.assert_awaited_once_with("denylist:abc")
+
+
+@pytest.mark.asyncio
+async def test_uncovered_keys_are_not_cached(
+    cached_client: RedisClient, mock_redis_conn: AsyncMock
+):
+    await cached_client.get("session:1")
+    await cached_client.get("session:1")
+
+    assert mock_redis_conn.get.await_count == 2
+    assert not cached_client.near_cache.entries
+
+
+@pytest.mark.asyncio
+async def test_own_writes_invalidate(
+    cached_client: RedisClient, mock_redis_conn: AsyncMock
+):
+    mock_redis_conn.exists = AsyncMock(return_value=0)
+    await cached_client.is_token_denied("abc")
+
+    await cached_client.denylist_token("abc", 60)
+    mock_redis_conn.exists = AsyncMock(return_value=1)
+
+    assert await cached_client.is_token_denied("abc") is True
+
+
+@pytest.mark.asyncio
+async def test_scripts_invalidate_their_keys(
+    cached_client: RedisClient, mock_redis_conn: AsyncMock
+):
+    mock_redis_conn.hgetall = AsyncMock(return_value={"status": "online"})
+    await cached_client.hgetall("user:presence:1")
+
+    await cached_client.run_script("return 1", ["user:presence:1"], [])
+
+    assert "user:presence:1" not in cached_client.near_cache.entries
+
+
+@pytest.mark.asyncio
+async def test_batch_serves_cached_reads(
+    cached_client: RedisClient, mock_redis_conn: AsyncMock
+):
+    pipe = make_pipeline([{"status": "online"}, {}])
+    mock_redis_conn.pipeline = MagicMock(return_value=pipe)
+    async with cached_client.batch() as batch:
+        batch.hgetall("user:presence:1")
+        batch.hgetall("session:1")
+
+    # The covered miss filled the cache; the uncovered key is sent again
+    pipe.execute = AsyncMock(return_value=[{}])
+    async with cached_client.batch() as batch:
+        presence = batch.hgetall("user:presence:1")
+        batch.hgetall("session:1")
+
+    assert batch.executed
+    assert presence.value == {"status": "online"}
+    assert pipe.hgetall.call_args_list[-1].args == ("session:1",)
+    assert pipe.hgetall.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_invalidation_push(cached_client: RedisClient):
+    cache = cached_client.near_cache
+    fill(cache, "denylist:a", ("exists",), 0)
+    fill(cache, "denylist:b", ("exists",), 0)
+
+    await cached_client._handle_invalidation(["invalidate", ["denylist:a"]])
+    assert list(cache.entries) == ["denylist:b"]
+
+    # A flushed database is reported without keys
+    await cached_client._handle_invalidation(["invalidate", None])
+    assert not cache.entries
+
+
+@pytest.mark.asyncio
+async def test_tracking_disabled_without_invalidation_hook(
+    cached_client: RedisClient, mock_logger: AsyncMock
+):
+    connection = MagicMock()
+    connection.connect = AsyncMock()
+    connection.disconnect = AsyncMock()
+    # A parser without set_invalidation_push_handler
+    connection._parser = object()
+
+    with patch("app.core.redis.redis.Connection", return_value=connection):
+        await cached_client.track_invalidations()
+
+    assert cached_client.near_cache.active is False
+    connection.send_command.assert_not_called()
+    connection.disconnect.assert_awaited_once()
+    assert "near cache disabled" in str(mock_logger.error.call_args)
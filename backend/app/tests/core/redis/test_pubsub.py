@@ -3,6 +3,7 @@ from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from redis.asyncio.client import PubSub
+from redis.exceptions import ResponseError
 
 from app.core.redis import RedisClient
 
@@ -148,3 +149,105 @@ async def test_get_message_error(
 
     assert result is None
     assert mock_logger.error.called
+
+
+@pytest.mark.asyncio
+async def test_get_message_passes_timeout(
+    redis_client_instance: RedisClient, mock_redis_conn: AsyncMock
+):
+    mock_pubsub = AsyncMock(spec=PubSub)
+    mock_pubsub.get_message = AsyncMock(return_value=None)
+    redis_client_instance.pubsub = mock_pubsub
+
+    await redis_client_instance.get_message(timeout=1.0)
+
+    mock_pubsub.get_message.assert_called_once_with(
+        ignore_subscribe_messages=True, timeout=1.0
+    )
+
+
+@pytest.mark.asyncio
+async def test_xgroup_create_existing_group(
+    redis_client_instance: RedisClient,
+    mock_redis_conn: AsyncMock,
+    mock_logger: AsyncMock,
+):
+    mock_redis_conn.xgroup_create = AsyncMock(
+        side_effect=ResponseError("BUSYGROUP Consumer Group name already exists")
+    )
+
+    result = await redis_client_instance.xgroup_create("stream", "group")
+
+    assert result is True
+    mock_redis_conn.xgroup_create.assert_called_once_with(
+        "stream", "group", id="$", mkstream=True
+    )
+    mock_logger.error.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_xreadgroup_success(
+    redis_client_instance: RedisClient, mock_redis_conn: AsyncMock
+):
+    entries = [("stream", [("1-0", {"event": "{}"})])]
+    mock_redis_conn.xreadgroup = AsyncMock(return_value=entries)
+
+    result = await redis_client_instance.xreadgroup(
+        "group", "consumer", {"stream": ">"}, count=10, block=1000
+    )
+
+    assert result == entries
+    mock_redis_conn.xreadgroup.assert_called_once_with(
+        "group", "consumer", {"stream": ">"}, count=10, block=1000
+    )
+
+
+@pytest.mark.asyncio
+async def test_xreadgroup_mapping_reply(
+    redis_client_instance: RedisClient, mock_redis_conn: AsyncMock
+):
+    entries = [("1-0", {"event": "{}"})]
+    mock_redis_conn.xreadgroup = AsyncMock(return_value={"stream": entries})
+
+    result = await redis_client_instance.xreadgroup(
+        "group", "consumer", {"stream": ">"}
+    )
+
+    assert result == [["stream", entries]]
+
+
+@pytest.mark.asyncio
+async def test_xreadgroup_error(
+    redis_client_instance: RedisClient,
+    mock_redis_conn: AsyncMock,
+    mock_logger: AsyncMock,
+):
+    mock_redis_conn.xreadgroup = AsyncMock(
+        side_effect=ResponseError("NOGROUP No such consumer group")
+    )
+
+    result = await redis_client_instance.xreadgroup(
+        "group", "consumer", {"stream": ">"}
+    )
+
+    assert result is None
+    assert mock_logger.error.called
+
+
+@pytest.mark.asyncio
+async def test_xack_and_xautoclaim(
+    redis_client_instance: RedisClient, mock_redis_conn: AsyncMock
+):
+    mock_redis_conn.xack = AsyncMock(return_value=2)
+    mock_redis_conn.xautoclaim = AsyncMock(return_value=["0-0", [], []])
+
+    acked = await redis_client_instance.xack("stream", "group", "1-0", "2-0")
+    claimed = await redis_client_instance.xautoclaim(
+        "stream", "group", "consumer", 30000, count=100
+    )
+
+    assert acked == 2
+    assert claimed == ["0-0", [], []]
+    mock_redis_conn.xautoclaim.assert_called_once_with(
+        "stream", "group", "consumer", 30000, start_id="0-0", count=100
+    )
@@ -0,0 +1,87 @@
+import hashlib
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from redis.exceptions import NoScriptError
+
+from app.core.redis import RedisClient, register_script
+from app.tests.core.redis.conftest import make_pipeline
+
+
+@pytest.mark.asyncio
+async def test_run_script_uses_evalsha(
+    redis_client_instance: RedisClient, mock_redis_conn: AsyncMock
+):
+    sha = hashlib.sha1(b"return 1").hexdigest()
+    mock_redis_conn.evalsha = AsyncMock(return_value=1)
+
+    for _ in range(2):
+        result = await redis_client_instance.run_script(
+            "return 1", keys=["k"], args=["a"]
+        )
+        assert result == 1
+
+    mock_redis_conn.evalsha.assert_awaited_with(sha, 1, "k", "a")
+    mock_redis_conn.eval.assert_not_called()
+    stats = redis_client_instance.script_stats[sha[:12]]
+    assert stats.calls == 2
+    assert stats.errors == 0
+    assert stats.max_time >= stats.mean_time > 0
+
+
+@pytest.mark.asyncio
+async def test_run_script_falls_back_to_eval_on_noscript(
+    redis_client_instance: RedisClient, mock_redis_conn: AsyncMock
+):
+    source = register_script("test_fallback", "return 2")
+    mock_redis_conn.evalsha = AsyncMock(side_effect=NoScriptError("NOSCRIPT"))
+    mock_redis_conn.eval = AsyncMock(return_value=2)
+
+    result = await redis_client_instance.run_script(source, keys=[], args=[7])
+
+    assert result == 2
+    mock_redis_conn.eval.assert_awaited_once_with(source, 0, 7)
+    stats = redis_client_instance.script_stats["test_fallback"]
+    assert stats.fallbacks == 1
+    assert stats.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_run_script_error(
+    redis_client_instance: RedisClient,
+    mock_redis_conn: AsyncMock,
+    mock_logger: AsyncMock,
+):
+    mock_redis_conn.evalsha = AsyncMock(side_effect=Exception("BUSY"))
+
+    result = await redis_client_instance.run_script("return 1", keys=[], args=[])
+
+    assert result is None
+    assert mock_logger.error.called
+    stats = redis_client_instance.script_stats[
+        hashlib.sha1(b"return 1").hexdigest()[:12]
+    ]
+    assert stats.errors == 1
+
+
+@pytest.mark.asyncio
+async def test_load_scripts_preloads_registered_scripts(
+    redis_client_instance: RedisClient, mock_redis_conn: AsyncMock
+):
+    source = register_script("test_preload", "return 3")
+    pipe = make_pipeline([])
+    mock_redis_conn.pipeline = MagicMock(return_value=pipe)
+
+    await redis_client_instance.load_scripts()
+
+    pipe.script_load.assert_any_call(source)
+    pipe.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_run_script_when_not_connected():
+    client = RedisClient()
+
+    result = await client.run_script("return 1", keys=[], args=[])
+
+    assert result is None
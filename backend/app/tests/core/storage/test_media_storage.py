@@ -1,11 +1,12 @@
 import io
 import uuid
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import MagicMock, patch
 
 import pytest
 from fastapi import HTTPException, UploadFile
 from PIL import Image
 
+from app.core.redis import RedisClient
 from app.core.storage import (
     THUMBNAIL_SIZE,
     MediaStorage,
@@ -14,6 +15,41 @@ from app.core.storage import (
 )
 
 
+class _DictPipeline:
+    """Redis pipeline stand-in applying queued commands to a dict."""
+
+    def __init__(self, stored: dict[str, str]):
+        self.stored = stored
+        self.ops = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def setex(self, key, ttl, value):
+        self.ops.append(lambda: self.stored.__setitem__(key, value) or True)
+
+    def get(self, key):
+        self.ops.append(lambda: self.stored.get(key))
+
+    def delete(self, *keys):
+        self.ops.append(
+            lambda: sum(self.stored.pop(k, None) is not None for k in keys)
+        )
+
+    async def execute(self, raise_on_error=True):
+        return [op() for op in self.ops]
+
+
+def _make_redis(stored: dict[str, str]) -> RedisClient:
+    client = RedisClient()
+    client.redis = MagicMock()
+    client.redis.pipeline = lambda transaction: _DictPipeline(stored)
+    return client
+
+
 def _make_jpg_bytes(width: int = 100, height: int = 100) -> bytes:
     img = Image.new("RGB", (width, height), color=(255, 0, 0))
     buf = io.BytesIO()
@@ -383,13 +419,9 @@ async def test_chunked_upload_returns_none_while_waiting():
         MediaStorage.upload_attachment_chunked.__get__(storage, MediaStorage)
     )
 
-    redis = AsyncMock()
-    redis.set = AsyncMock()
     # Only chunk 0 present, chunk 1 missing
-    redis.get = AsyncMock(
-        side_effect=lambda k: "data" if "chunk:0" in k else None
-    )
-    redis.delete = AsyncMock()
+    stored: dict[str, str] = {}
+    redis = _make_redis(stored)
 
     result = await storage.upload_attachment_chunked(
         chunk=b"hello",
@@ -403,6 +435,7 @@ async def test_chunked_upload_returns_none_while_waiting():
         redis_client=redis,
     )
     assert result is None
+    assert list(stored) == ["upload:uid-1:chunk:0"]
 
 
 @pytest.mark.asyncio
@@ -431,20 +464,7 @@ async def test_chunked_upload_reassembles_all_chunks():
     )
 
     stored: dict[str, str] = {}
-
-    async def mock_set(key, value, ex=None):
-        stored[key] = value
-
-    async def mock_get(key):
-        return stored.get(key)
-
-    async def mock_delete(key):
-        stored.pop(key, None)
-
-    redis = AsyncMock()
-    redis.set = mock_set
-    redis.get = mock_get
-    redis.delete = mock_delete
+    redis = _make_redis(stored)
 
     # Send chunk 0
     await storage.upload_attachment_chunked(
@@ -524,20 +544,7 @@ async def test_chunked_upload_calls_image_pipeline_for_image_mime():
     )
 
     stored: dict[str, str] = {}
-
-    async def mock_set(key, value, ex=None):
-        stored[key] = value
-
-    async def mock_get(key):
-        return stored.get(key)
-
-    async def mock_delete(key):
-        stored.pop(key, None)
-
-    redis = AsyncMock()
-    redis.set = mock_set
-    redis.get = mock_get
-    redis.delete = mock_delete
+    redis = _make_redis(stored)
 
     msg_id = uuid.uuid4()
     user_id = uuid.uuid4()
@@ -0,0 +1,57 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.core.codec import CODECS, MSGPACK_TAG, decode_payload, get_codec
+
+event = {
+    "kind": "conversation",
+    "conversation_id": "conv-1",
+    "message": {"type": "new_message", "seq": 7, "content": "héllo"},
+    "exclude_user_id": None,
+}
+
+
+def test_json_codec_writes_untagged_json():
+    payload = CODECS["json"].dumps(event)
+
+    assert payload == json.dumps(event)
+    assert CODECS["json"].loads(payload) == event
+
+
+def test_decode_legacy_and_malformed_payloads():
+    assert decode_payload(json.dumps(event)) == event
+    assert decode_payload(json.dumps(event).encode()) == event
+    with pytest.raises(ValueError):
+        decode_payload("not json")
+    with pytest.raises(ValueError):
+        decode_payload("~z9\x00")
+
+
+def test_get_codec_falls_back_to_json():
+    logger = MagicMock()
+
+    assert get_codec("cbor", logger) is CODECS["json"]
+    logger.warning.assert_called_once()
+    assert get_codec("json", logger) is CODECS["json"]
+
+
+def test_orjson_codec_is_readable_as_json():
+    pytest.importorskip("orjson")
+    payload = get_codec("orjson").dumps(event)
+
+    assert json.loads(payload) == event
+    assert decode_payload(payload) == event
+
+
+def test_msgpack_codec_is_tagged():
+    pytest.importorskip("msgpack")
+    payload = get_codec("msgpack").dumps(event)
+
+    assert payload.startswith(MSGPACK_TAG)
+    assert decode_payload(payload) == event
+    # As read back by a client with decode_responses and surrogateescape
+    assert decode_payload(payload.decode("utf-8", "surrogateescape")) == event
+    with pytest.raises(ValueError):
+        decode_payload(MSGPACK_TAG + b"\xc1")
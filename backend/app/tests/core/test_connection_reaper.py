@@ -0,0 +1,143 @@
+import json
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.core.connection_reaper import (
+    LEAD_SCRIPT,
+    REAP_NODE_SCRIPT,
+    ConnectionReaper,
+)
+from app.core.websocket import NODES_KEY
+from app.tests.core.conftest import FakeBatch, FakeSession
+
+USER_ID = str(uuid.uuid4())
+CONVERSATION_ID = str(uuid.uuid4())
+
+
+def make_reaper(redis: AsyncMock) -> ConnectionReaper:
+    manager = MagicMock()
+    manager.node_id = "node-self"
+    manager.refresh_node_liveness = AsyncMock()
+    manager.deregister_node = AsyncMock()
+    settings = MagicMock()
+    settings.WS_NODE_TTL = 15
+    settings.WS_REAPER_INTERVAL = 5.0
+    settings.REDIS_CODEC = "json"
+    # Participants of the users being reaped
+    participants = MagicMock()
+    participants.fetchall.return_value = [
+        (uuid.UUID(USER_ID), uuid.UUID(CONVERSATION_ID))
+    ]
+    return ConnectionReaper(
+        manager=manager,
+        redis=redis,
+        session_factory=lambda: FakeSession(participants),
+        logger=MagicMock(),
+        settings=settings,
+    )
+
+
+@pytest.mark.asyncio
+async def test_reap_removes_only_dead_nodes(fake_batch: FakeBatch):
+    redis = AsyncMock()
+    redis.smembers.return_value = {"node-self", "node-dead", "node-live"}
+    redis.batch = fake_batch
+    redis.run_script.return_value = [3, []]
+    reaper = make_reaper(redis)
+    # Set iteration order is arbitrary; answer in the order probed
+    nodes = [n for n in redis.smembers.return_value if n != "node-self"]
+    fake_batch.replies.append([int(n == "node-live") for n in nodes])
+
+    assert await reaper.reap() == 3
+
+    # The own node is never probed; only the dead one is reaped
+    probed = {c[1] for c in fake_batch.calls[0]}
+    assert probed == {"node:node-dead:alive", "node:node-live:alive"}
+    redis.run_script.assert_awaited_once()
+    script = redis.run_script.call_args.args[0]
+    keys = redis.run_script.call_args.kwargs["keys"]
+    assert script == REAP_NODE_SCRIPT
+    assert keys == [
+        "node:node-dead:connections",
+        "node:node-dead:conversations",
+        NODES_KEY,
+        "node:node-dead:alive",
+    ]
+    assert reaper.nodes_reaped == 1
+    assert reaper.entries_reclaimed == 3
+
+
+@pytest.mark.asyncio
+async def test_reap_skips_round_when_probe_fails(fake_batch: FakeBatch):
+    redis = AsyncMock()
+    redis.smembers.return_value = {"node-self", "node-dead"}
+    redis.batch = fake_batch
+    fake_batch.replies.append(None)
+    reaper = make_reaper(redis)
+
+    # Unknown liveness must not be taken for dead
+    assert await reaper.reap() == 0
+    redis.run_script.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_reap_node_publishes_offline_transitions(fake_batch: FakeBatch):
+    redis = AsyncMock()
+    redis.batch = fake_batch
+    redis.run_script.return_value = [2, [USER_ID]]
+    reaper = make_reaper(redis)
+
+    assert await reaper.reap_node("node-dead") == 2
+
+    ((command,),) = fake_batch.calls
+    name, channel, payload = command
+    assert (name, channel) == ("publish", "presence")
+    event = json.loads(payload)
+    assert event["message"]["user_id"] == USER_ID
+    assert event["message"]["status"] == "offline"
+    assert event["conversation_ids"] == [CONVERSATION_ID]
+
+
+@pytest.mark.asyncio
+async def test_reap_node_skips_live_node(fake_batch: FakeBatch):
+    redis = AsyncMock()
+    redis.batch = fake_batch
+    redis.run_script.return_value = [0, []]
+    reaper = make_reaper(redis)
+
+    assert await reaper.reap_node("node-busy") == 0
+
+    assert redis.run_script.call_args.kwargs["args"][3] == "0"
+    assert fake_batch.calls == []
+    assert reaper.nodes_reaped == 0
+
+
+@pytest.mark.asyncio
+async def test_lead_fails_while_another_node_holds_the_lease():
+    redis = AsyncMock()
+    redis.run_script.return_value = 0
+    reaper = make_reaper(redis)
+
+    assert await reaper._lead() is False
+
+    assert redis.run_script.call_args.args[0] == LEAD_SCRIPT
+    assert redis.run_script.call_args.kwargs["args"] == ["node-self", 15]
+
+
+@pytest.mark.asyncio
+async def test_start_clears_own_stale_index_then_stop_deregisters():
+    redis = AsyncMock()
+    redis.run_script.return_value = [0, []]
+    reaper = make_reaper(redis)
+
+    await reaper.start()
+    await reaper.stop()
+
+    keys = redis.run_script.call_args_list[0].kwargs["keys"]
+    args = redis.run_script.call_args_list[0].kwargs["args"]
+    assert keys[0] == "node:node-self:connections"
+    assert args[3] == "1"
+    reaper.manager.refresh_node_liveness.assert_awaited_once()
+    reaper.manager.deregister_node.assert_awaited_once()
@@ -1,5 +1,5 @@
 from contextlib import asynccontextmanager
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from fastapi import FastAPI
@@ -31,6 +31,8 @@ def make_lifespan_mocks(
     ws_manager = AsyncMock()
     ws_manager.start_pubsub_listener = AsyncMock(side_effect=pubsub_raises)
     ws_manager.stop_pubsub_listener = AsyncMock(side_effect=shutdown_raises)
+    # Installed as a signal handler, which must not be a coroutine
+    ws_manager.start_drain = MagicMock()
 
     return redis, rabbitmq, ws_manager
 
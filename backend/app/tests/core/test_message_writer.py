@@ -0,0 +1,139 @@
+import asyncio
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.core.message_writer import (
+    MessageRejected,
+    MessageWriter,
+    PendingMessage,
+)
+from app.schemas.messages import MessageCreate
+from app.tests.core.conftest import FakeSession
+
+
+def make_writer(**settings) -> MessageWriter:
+    mock_settings = MagicMock()
+    mock_settings.WS_MESSAGE_BATCH_INTERVAL = settings.get("interval", 0.01)
+    mock_settings.WS_MESSAGE_BATCH_SIZE = settings.get("size", 100)
+    return MessageWriter(
+        session_factory=FakeSession, logger=MagicMock(), settings=mock_settings
+    )
+
+
+def accept_all(writer: MessageWriter) -> AsyncMock:
+    async def write_batch(db, batch):
+        return [(pending, f"saved-{i}") for i, pending in enumerate(batch)]
+
+    writer._write_batch = AsyncMock(side_effect=write_batch)
+    return writer._write_batch
+
+
+@pytest.mark.asyncio
+async def test_concurrent_submits_share_one_commit():
+    writer = make_writer()
+    write_batch = accept_all(writer)
+    await writer.start()
+
+    data = MessageCreate(content="hi")
+    results = await asyncio.gather(
+        *[writer.submit(uuid.uuid4(), uuid.uuid4(), data) for _ in range(20)]
+    )
+    await writer.stop()
+
+    write_batch.assert_awaited_once()
+    assert len(write_batch.call_args.args[1]) == 20
+    assert results == [f"saved-{i}" for i in range(20)]
+    assert writer.batches_committed == 1
+    assert writer.messages_committed == 20
+
+
+@pytest.mark.asyncio
+async def test_batch_size_caps_one_commit():
+    writer = make_writer(size=5)
+    write_batch = accept_all(writer)
+    await writer.start()
+
+    data = MessageCreate(content="hi")
+    await asyncio.gather(
+        *[writer.submit(uuid.uuid4(), uuid.uuid4(), data) for _ in range(12)]
+    )
+    await writer.stop()
+
+    sizes = [len(call.args[1]) for call in write_batch.call_args_list]
+    assert sizes == [5, 5, 2]
+
+
+@pytest.mark.asyncio
+async def test_submit_without_task_commits_immediately():
+    writer = make_writer()
+    write_batch = accept_all(writer)
+
+    saved = await writer.submit(
+        uuid.uuid4(), uuid.uuid4(), MessageCreate(content="hi")
+    )
+
+    assert saved == "saved-0"
+    write_batch.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_rejected_message_raises():
+    writer = make_writer()
+
+    async def write_batch(db, batch):
+        batch[0].future.set_exception(MessageRejected("nope"))
+        return []
+
+    writer._write_batch = AsyncMock(side_effect=write_batch)
+
+    with pytest.raises(MessageRejected, match="nope"):
+        await writer.submit(
+            uuid.uuid4(), uuid.uuid4(), MessageCreate(content="hi")
+        )
+
+
+@pytest.mark.asyncio
+async def test_failed_commit_fails_whole_batch():
+    writer = make_writer()
+    writer._write_batch = AsyncMock(side_effect=RuntimeError("db down"))
+
+    with pytest.raises(RuntimeError, match="db down"):
+        await writer.submit(
+            uuid.uuid4(), uuid.uuid4(), MessageCreate(content="hi")
+        )
+    writer.logger.error.assert_called_once()
+    assert writer.messages_committed == 0
+
+
+@pytest.mark.asyncio
+async def test_sequences_are_locked_in_conversation_order():
+    writer = make_writer()
+    sender = uuid.uuid4()
+    conversations = sorted(uuid.uuid4() for _ in range(3))
+    loop = asyncio.get_running_loop()
+    batch = [
+        PendingMessage(
+            conversation_id,
+            sender,
+            MessageCreate(content="hi"),
+            loop.create_future(),
+        )
+        for conversation_id in reversed(conversations)
+    ]
+    result = MagicMock()
+    result.tuples.return_value.all.return_value = [
+        (conversation_id, sender) for conversation_id in conversations
+    ]
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=result)
+    db.commit = AsyncMock()
+    allocate_seq = AsyncMock(return_value=1)
+
+    with patch("app.core.message_writer.allocate_seq", allocate_seq):
+        accepted = await writer._write_batch(db, batch)
+
+    assert len(accepted) == 3
+    locked = [call.args[1] for call in allocate_seq.call_args_list]
+    assert locked == conversations
@@ -5,6 +5,7 @@ import pytest
 
 from app.core.redis import RedisClient
 from app.core.websocket import ConnectionManager
+from app.tests.core.conftest import FakeBatch
 
 
 @pytest.fixture
@@ -17,7 +18,7 @@ def mock_logger() -> AsyncMock:
 
 
 @pytest.fixture
-def mock_redis() -> AsyncMock:
+def mock_redis(fake_batch: FakeBatch) -> AsyncMock:
     mock = AsyncMock(spec=RedisClient)
 
     mock.sadd = AsyncMock(return_value=1)
@@ -32,6 +33,8 @@ def mock_redis() -> AsyncMock:
     mock.get = AsyncMock(return_value=None)
     mock.set = AsyncMock(return_value=True)
     mock.delete = AsyncMock(return_value=True)
+    mock.batch = fake_batch
+    mock.run_script = AsyncMock(return_value=1)
 
     return mock
 
@@ -47,7 +50,7 @@ def connection_manager(
 def mock_websocket() -> AsyncMock:
     ws = AsyncMock()
     ws.accept = AsyncMock()
-    ws.send_json = AsyncMock()
+    ws.send_text = AsyncMock()
     ws.close = AsyncMock()
     return ws
 
@@ -0,0 +1,91 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.core.config import get_settings
+from app.core.websocket import ConnectionManager
+
+
+@pytest.fixture
+def capped_manager(
+    mock_logger: AsyncMock, mock_redis: AsyncMock
+) -> ConnectionManager:
+    settings = get_settings().model_copy(
+        update={"WS_MAX_CONNECTIONS": 2, "WS_DRAIN_RECONNECT_JITTER": 0}
+    )
+    return ConnectionManager(
+        logger=mock_logger, redis=mock_redis, settings=settings
+    )
+
+
+@pytest.mark.asyncio
+async def test_admission_refused_at_capacity(
+    capped_manager: ConnectionManager,
+):
+    assert capped_manager.admission_refusal() is None
+
+    for i in range(2):
+        await capped_manager.connect(AsyncMock(), f"user-{i}")
+
+    code, _ = capped_manager.admission_refusal()
+    assert code == capped_manager.settings.WS_OVERLOAD_CLOSE_CODE
+
+
+@pytest.mark.asyncio
+async def test_shed_accepts_before_closing(
+    capped_manager: ConnectionManager, mock_websocket: AsyncMock
+):
+    await capped_manager.shed(
+        mock_websocket, 1013, "Node at capacity", subprotocol="msgpack"
+    )
+
+    # Closing during the handshake would hide the close code from clients
+    mock_websocket.accept.assert_awaited_once_with(subprotocol="msgpack")
+    mock_websocket.close.assert_awaited_once_with(
+        code=1013, reason="Node at capacity"
+    )
+    assert capped_manager.connections_shed == 1
+
+
+@pytest.mark.asyncio
+async def test_drain_sends_reconnect_hint_and_closes(
+    capped_manager: ConnectionManager,
+):
+    sockets = [AsyncMock(), AsyncMock()]
+    for i, ws in enumerate(sockets):
+        await capped_manager.connect(ws, f"user-{i}")
+    await asyncio.sleep(0)
+
+    await capped_manager.drain(duration=0)
+
+    assert capped_manager.draining
+    code, _ = capped_manager.admission_refusal()
+    assert code == capped_manager.settings.WS_DRAIN_CLOSE_CODE
+    for ws in sockets:
+        hint = json.loads(ws.send_text.call_args.args[0])
+        assert hint["type"] == "reconnect"
+        assert hint["retry_after"] == 0
+        ws.close.assert_awaited_once_with(
+            code=capped_manager.settings.WS_DRAIN_CLOSE_CODE,
+            reason="Node draining",
+        )
+
+
+@pytest.mark.asyncio
+async def test_drain_spreads_closes_over_duration(
+    connection_manager: ConnectionManager,
+):
+    sockets = [AsyncMock() for _ in range(4)]
+    for i, ws in enumerate(sockets):
+        await connection_manager.connect(ws, f"user-{i}")
+
+    # One socket per 0.1s tick
+    connection_manager.start_drain(duration=0.4)
+    await asyncio.sleep(0.05)
+
+    closed = sum(ws.close.await_count for ws in sockets)
+    assert closed == 1
+
+    await connection_manager.stop_drain()
@@ -2,7 +2,11 @@ from unittest.mock import AsyncMock
 
 import pytest
 
-from app.core.websocket import ConnectionManager
+from app.core.websocket import (
+    REGISTER_CONNECTION_SCRIPT,
+    UNREGISTER_CONNECTION_SCRIPT,
+    ConnectionManager,
+)
 
 
 @pytest.mark.asyncio
@@ -13,22 +17,91 @@ async def test_connect_and_disconnect(
 ):
     websocket = AsyncMock()
     websocket.accept = AsyncMock()
-    websocket.send_json = AsyncMock()
+    websocket.send_text = AsyncMock()
 
     connection_id = await connection_manager.connect(websocket, test_user_id)
 
-    assert connection_id in connection_manager.active_connections
-    assert connection_id in connection_manager.heartbeat
+    assert connection_id in connection_manager.connections
+    connection = connection_manager.connections[connection_id]
+    assert connection.user_id == test_user_id
     websocket.accept.assert_called_once()
 
-    mock_redis.sadd.assert_called()
-    mock_redis.hset.assert_called()
-    mock_redis.expire.assert_called()
-    mock_redis.publish.assert_called()
+    # Registration and presence happen in a single script call
+    mock_redis.run_script.assert_called_once()
+    script = mock_redis.run_script.call_args.args[0]
+    args = mock_redis.run_script.call_args.kwargs["args"]
+    assert script == REGISTER_CONNECTION_SCRIPT
+    assert args[0] == "online"
+    assert args[4] == connection_id
+    assert args[5] == connection_manager.node_id
+    assert args[7:] == [connection_manager.node_connections_key, test_user_id]
+    mock_redis.run_script.reset_mock()
 
     await connection_manager.disconnect(connection_id, test_user_id)
 
-    assert connection_id not in connection_manager.active_connections
-    assert connection_id not in connection_manager.heartbeat
+    assert connection_id not in connection_manager.connections
 
-    mock_redis.srem.assert_called()
+    mock_redis.run_script.assert_called_once()
+    script = mock_redis.run_script.call_args.args[0]
+    args = mock_redis.run_script.call_args.kwargs["args"]
+    assert script == UNREGISTER_CONNECTION_SCRIPT
+    assert args[0] == "offline"
+    assert args[4] == connection_id
+    assert args[5] == connection_manager.node_connections_key
+
+
+@pytest.mark.asyncio
+async def test_user_connections_index(
+    connection_manager: ConnectionManager,
+    mock_redis: AsyncMock,
+    test_user_id: str,
+):
+    first = await connection_manager.connect(AsyncMock(), test_user_id)
+    second = await connection_manager.connect(AsyncMock(), test_user_id)
+
+    assert connection_manager.user_connections[test_user_id] == {first, second}
+
+    await connection_manager.disconnect(first, test_user_id)
+    assert connection_manager.user_connections[test_user_id] == {second}
+
+    await connection_manager.disconnect(second, test_user_id)
+    assert test_user_id not in connection_manager.user_connections
+
+
+@pytest.mark.asyncio
+async def test_node_liveness_restores_registrations_after_reaping(
+    connection_manager: ConnectionManager,
+    mock_redis: AsyncMock,
+    test_user_id: str,
+):
+    connection_id = await connection_manager.connect(
+        AsyncMock(), test_user_id, conversation_ids=["conv-1"]
+    )
+    mock_redis.run_script.reset_mock()
+
+    # Still registered: only the liveness key and index TTLs are refreshed
+    mock_redis.batch.replies.append([True, 0, 1, 1])
+    await connection_manager.refresh_node_liveness()
+    assert mock_redis.batch.calls[-1][0] == (
+        "setex",
+        f"node:{connection_manager.node_id}:alive",
+        connection_manager.settings.WS_NODE_TTL,
+        "1",
+    )
+    mock_redis.run_script.assert_not_called()
+
+    # Re-added to the registry: the reaper took this node for dead
+    mock_redis.batch.replies.append([True, 1, 0, 0])
+    await connection_manager.refresh_node_liveness()
+
+    commands = mock_redis.batch.calls[-1]
+    assert (
+        "hset",
+        f"user:connections:{test_user_id}",
+        connection_id,
+        connection_manager.node_id,
+    ) in commands
+    assert ("sadd", "conversation:nodes:conv-1", connection_manager.node_id) in (
+        commands
+    )
+    assert mock_redis.run_script.call_args.kwargs["args"][0] == "online"
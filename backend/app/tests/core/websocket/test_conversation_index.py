@@ -0,0 +1,117 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.core.websocket import ConnectionManager
+
+
+@pytest.mark.asyncio
+async def test_connect_indexes_conversations(
+    connection_manager: ConnectionManager,
+    mock_websocket: AsyncMock,
+    test_user_id: str,
+):
+    connection_id = await connection_manager.connect(
+        mock_websocket, test_user_id, conversation_ids={"conv-1", "conv-2"}
+    )
+
+    assert connection_manager.conversation_connections == {
+        "conv-1": {connection_id},
+        "conv-2": {connection_id},
+    }
+    assert connection_manager.get_connection_conversations(connection_id) == {
+        "conv-1",
+        "conv-2",
+    }
+
+    await connection_manager.disconnect(connection_id, test_user_id)
+
+    assert connection_manager.conversation_connections == {}
+    assert connection_id not in connection_manager.connections
+
+
+@pytest.mark.asyncio
+async def test_conversation_message_reaches_only_members(
+    connection_manager: ConnectionManager,
+):
+    member_ws = AsyncMock()
+    sender_ws = AsyncMock()
+    outsider_ws = AsyncMock()
+
+    await connection_manager.connect(
+        member_ws, "user-member", conversation_ids=["conv-1"]
+    )
+    await connection_manager.connect(
+        sender_ws, "user-sender", conversation_ids=["conv-1"]
+    )
+    await connection_manager.connect(
+        outsider_ws, "user-outsider", conversation_ids=["conv-2"]
+    )
+    await asyncio.sleep(0)
+    for ws in (member_ws, sender_ws, outsider_ws):
+        ws.send_text.reset_mock()
+
+    message = {"type": "typing", "conversation_id": "conv-1"}
+    await connection_manager._handle_conversation_message(
+        "conv-1", {"message": message, "exclude_user_id": "user-sender"}
+    )
+    await asyncio.sleep(0)
+
+    member_ws.send_text.assert_called_once()
+    assert json.loads(member_ws.send_text.call_args.args[0]) == message
+    sender_ws.send_text.assert_not_called()
+    outsider_ws.send_text.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_join_and_leave_conversation_update_index(
+    connection_manager: ConnectionManager,
+    mock_redis: AsyncMock,
+    mock_websocket: AsyncMock,
+    test_user_id: str,
+):
+    connection_id = await connection_manager.connect(
+        mock_websocket, test_user_id
+    )
+    mock_redis.run_script.reset_mock()
+
+    await connection_manager.join_conversation("conv-9", test_user_id)
+
+    assert connection_manager.conversation_connections["conv-9"] == {
+        connection_id
+    }
+    keys = mock_redis.run_script.call_args.kwargs["keys"]
+    payload = json.loads(mock_redis.run_script.call_args.kwargs["args"][1])
+    assert keys == [f"user:connections:{test_user_id}"]
+    assert payload["message"]["type"] == "conversation_joined"
+
+    await connection_manager.leave_conversation("conv-9", test_user_id)
+
+    assert "conv-9" not in connection_manager.conversation_connections
+    connection = connection_manager.connections[connection_id]
+    assert connection.conversations == set()
+
+
+@pytest.mark.asyncio
+async def test_remote_membership_event_updates_index(
+    connection_manager: ConnectionManager,
+    mock_redis: AsyncMock,
+    mock_websocket: AsyncMock,
+    test_user_id: str,
+):
+    ws = mock_websocket
+    connection_id = await connection_manager.connect(ws, test_user_id)
+    await asyncio.sleep(0)
+    ws.send_text.reset_mock()
+
+    event = {"type": "conversation_joined", "conversation_id": "conv-5"}
+    await connection_manager._handle_user_message(test_user_id, event)
+    await asyncio.sleep(0)
+
+    assert connection_manager.conversation_connections["conv-5"] == {
+        connection_id
+    }
+    ws.send_text.assert_called_once()
+    assert json.loads(ws.send_text.call_args.args[0]) == event
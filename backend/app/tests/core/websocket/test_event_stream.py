@@ -0,0 +1,182 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.core.config import get_settings
+from app.core.websocket import (
+    INBOX_GROUP,
+    ROUTE_TO_USERS_SCRIPT,
+    ConnectionManager,
+)
+
+
+def blocking_read(reply) -> AsyncMock:
+    """
+    Stand-in for a blocking Redis read that times out empty, so listener
+    loops yield to the event loop instead of spinning.
+    """
+
+    async def read(*args, **kwargs):
+        await asyncio.sleep(0.01)
+        return reply
+
+    return AsyncMock(side_effect=read)
+
+
+@pytest.fixture
+def stream_manager(
+    mock_logger: AsyncMock, mock_redis: AsyncMock
+) -> ConnectionManager:
+    settings = get_settings().model_copy(
+        update={
+            "WS_EVENT_TRANSPORT": "streams",
+            "WS_STREAM_CLAIM_INTERVAL": 3600,
+        }
+    )
+    mock_redis.xgroup_create = AsyncMock(return_value=True)
+    mock_redis.xreadgroup = blocking_read([])
+    mock_redis.get_message = blocking_read(None)
+    mock_redis.xautoclaim = AsyncMock(return_value=["0-0", [], []])
+    mock_redis.xack = AsyncMock(return_value=1)
+    return ConnectionManager(
+        logger=mock_logger, redis=mock_redis, settings=settings
+    )
+
+
+def inbox_entry(entry_id: str, payload: dict) -> tuple[str, dict]:
+    return entry_id, {"event": json.dumps(payload)}
+
+
+@pytest.mark.asyncio
+async def test_streams_transport_appends_to_inbox_streams(
+    stream_manager: ConnectionManager, mock_redis: AsyncMock
+):
+    await stream_manager.send_to_user("user-1", {"type": "test"})
+
+    script = mock_redis.run_script.call_args.args[0]
+    assert script != ROUTE_TO_USERS_SCRIPT
+    assert "XADD" in script and "PUBLISH" not in script
+    assert f"'MAXLEN', '~', {stream_manager.settings.WS_STREAM_MAXLEN}" in (
+        script
+    )
+
+
+@pytest.mark.asyncio
+async def test_start_creates_consumer_group(
+    stream_manager: ConnectionManager, mock_redis: AsyncMock
+):
+    await stream_manager.start_pubsub_listener()
+    await stream_manager.stop_pubsub_listener()
+
+    # Inbox events no longer come through pub/sub
+    mock_redis.subscribe.assert_called_once_with("presence")
+    mock_redis.xgroup_create.assert_any_call(
+        stream_manager.inbox_stream, INBOX_GROUP, id="0"
+    )
+
+
+@pytest.mark.asyncio
+async def test_stream_entries_are_handled_then_acknowledged(
+    stream_manager: ConnectionManager,
+    mock_redis: AsyncMock,
+    mock_websocket: AsyncMock,
+):
+    await stream_manager.connect(mock_websocket, "user-1")
+    await asyncio.sleep(0)
+    mock_websocket.send_text.reset_mock()
+
+    event = {"type": "notification", "content": "hi"}
+    await stream_manager._handle_stream_entries(
+        [
+            inbox_entry(
+                "1-0", {"kind": "user", "user_id": "user-1", "message": event}
+            ),
+            ("2-0", {"event": "not json"}),
+        ]
+    )
+    await asyncio.sleep(0)
+
+    mock_websocket.send_text.assert_called_once()
+    assert json.loads(mock_websocket.send_text.call_args.args[0]) == event
+    # A malformed entry is acknowledged too instead of being redelivered
+    mock_redis.xack.assert_called_once_with(
+        stream_manager.inbox_stream, INBOX_GROUP, "1-0", "2-0"
+    )
+    assert stream_manager.stream_events_handled == 2
+
+
+@pytest.mark.asyncio
+async def test_listener_reads_as_group_consumer(
+    stream_manager: ConnectionManager, mock_redis: AsyncMock
+):
+    entry = inbox_entry("5-0", {"kind": "user", "user_id": "u", "message": {}})
+    calls = 0
+
+    async def mock_xreadgroup(*args, **kwargs):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            return [(stream_manager.inbox_stream, [entry])]
+        await asyncio.sleep(0.1)
+        return []
+
+    mock_redis.xreadgroup = AsyncMock(side_effect=mock_xreadgroup)
+
+    await stream_manager.start_pubsub_listener()
+    await asyncio.sleep(0.05)
+    await stream_manager.stop_pubsub_listener()
+
+    args = mock_redis.xreadgroup.call_args_list[0]
+    assert args.args == (
+        INBOX_GROUP,
+        stream_manager.inbox_consumer,
+        {stream_manager.inbox_stream: ">"},
+    )
+    mock_redis.xack.assert_called_once_with(
+        stream_manager.inbox_stream, INBOX_GROUP, "5-0"
+    )
+
+
+@pytest.mark.asyncio
+async def test_listener_recreates_missing_group(
+    stream_manager: ConnectionManager, mock_redis: AsyncMock
+):
+    # The inbox stream expired together with its group
+    mock_redis.xreadgroup = AsyncMock(return_value=None)
+
+    await stream_manager.start_pubsub_listener()
+    await asyncio.sleep(0.05)
+    await stream_manager.stop_pubsub_listener()
+
+    assert mock_redis.xgroup_create.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_reclaim_handles_entries_of_earlier_consumers(
+    stream_manager: ConnectionManager, mock_redis: AsyncMock
+):
+    entry = inbox_entry("3-0", {"kind": "user", "user_id": "u", "message": {}})
+    mock_redis.xautoclaim = AsyncMock(
+        side_effect=[
+            ["4-0", [entry, (None, None)], []],
+            ["0-0", [], []],
+        ]
+    )
+
+    await stream_manager._reclaim_stream_events()
+
+    assert mock_redis.xautoclaim.await_count == 2
+    first, second = mock_redis.xautoclaim.call_args_list
+    assert first.args == (
+        stream_manager.inbox_stream,
+        INBOX_GROUP,
+        stream_manager.inbox_consumer,
+    )
+    assert first.kwargs["start_id"] == "0-0"
+    assert second.kwargs["start_id"] == "4-0"
+    mock_redis.xack.assert_called_once_with(
+        stream_manager.inbox_stream, INBOX_GROUP, "3-0"
+    )
+    assert stream_manager.stream_events_reclaimed == 1
@@ -0,0 +1,91 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.core.websocket import ConnectionManager
+
+
+async def connect_member(
+    manager: ConnectionManager, user_id: str, conversation_ids: list[str]
+) -> tuple[str, AsyncMock]:
+    ws = AsyncMock()
+    connection_id = await manager.connect(
+        ws, user_id, conversation_ids=conversation_ids
+    )
+    await asyncio.sleep(0)
+    ws.send_text.reset_mock()
+    return connection_id, ws
+
+
+@pytest.mark.asyncio
+async def test_subscribe_accepts_only_member_conversations(
+    connection_manager: ConnectionManager,
+):
+    connection_id, _ = await connect_member(
+        connection_manager, "user-1", ["conv-1", "conv-2"]
+    )
+
+    focused = connection_manager.subscribe_conversations(
+        connection_id, ["conv-2", "conv-9"]
+    )
+
+    assert focused == ["conv-2"]
+    assert (
+        connection_manager.unsubscribe_conversations(connection_id, ["conv-2"])
+        == []
+    )
+    assert connection_manager.subscribe_conversations("missing", ["c"]) == []
+
+
+@pytest.mark.asyncio
+async def test_typing_reaches_only_focused_connections(
+    connection_manager: ConnectionManager,
+):
+    legacy_id, legacy_ws = await connect_member(
+        connection_manager, "user-1", ["conv-1", "conv-2"]
+    )
+    focused_id, focused_ws = await connect_member(
+        connection_manager, "user-2", ["conv-1", "conv-2"]
+    )
+    connection_manager.subscribe_conversations(focused_id, ["conv-2"])
+
+    typing = {"type": "typing", "conversation_id": "conv-1"}
+    await connection_manager._handle_conversation_message(
+        "conv-1", {"message": typing}
+    )
+    await asyncio.sleep(0)
+
+    # Connections that never declared focus keep receiving everything
+    legacy_ws.send_text.assert_called_once()
+    focused_ws.send_text.assert_not_called()
+
+    # Durable events still reach every member connection
+    message = {"type": "new_message", "conversation_id": "conv-1"}
+    await connection_manager._handle_conversation_message(
+        "conv-1", {"message": message}
+    )
+    await asyncio.sleep(0)
+
+    assert json.loads(focused_ws.send_text.call_args.args[0]) == message
+    assert legacy_ws.send_text.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_unsubscribe_all_mutes_typing(
+    connection_manager: ConnectionManager,
+):
+    connection_id, ws = await connect_member(
+        connection_manager, "user-1", ["conv-1"]
+    )
+    connection_manager.subscribe_conversations(connection_id, ["conv-1"])
+    connection_manager.unsubscribe_conversations(connection_id)
+
+    await connection_manager._handle_conversation_message(
+        "conv-1", {"message": {"type": "typing", "conversation_id": "conv-1"}}
+    )
+    await asyncio.sleep(0)
+
+    ws.send_text.assert_not_called()
+    assert connection_manager.connections[connection_id].focus == set()
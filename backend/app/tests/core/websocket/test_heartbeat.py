@@ -1,132 +1,296 @@
 import asyncio
-from datetime import datetime, timedelta, timezone
 from unittest.mock import AsyncMock
 
 import pytest
 
+from app.core.config import get_settings
 from app.core.websocket import ConnectionManager
 
 
+@pytest.fixture
+def json_manager(
+    mock_logger: AsyncMock, mock_redis: AsyncMock
+) -> ConnectionManager:
+    # Supervision by JSON heartbeats only, as for clients without
+    # protocol-level pings
+    settings = get_settings().model_copy(update={"WS_PROTOCOL_PING": False})
+    return ConnectionManager(
+        logger=mock_logger, redis=mock_redis, settings=settings
+    )
+
+
+@pytest.fixture
+def protocol_manager(
+    mock_logger: AsyncMock, mock_redis: AsyncMock
+) -> ConnectionManager:
+    settings = get_settings().model_copy(update={"WS_PROTOCOL_PING": True})
+    return ConnectionManager(
+        logger=mock_logger, redis=mock_redis, settings=settings
+    )
+
+
 @pytest.mark.asyncio
 async def test_heartbeat_update(
-    connection_manager: ConnectionManager,
+    json_manager: ConnectionManager,
     mock_redis: AsyncMock,
     test_user_id: str,
 ):
     websocket = AsyncMock()
     websocket.accept = AsyncMock()
-    websocket.send_json = AsyncMock()
+    websocket.send_text = AsyncMock()
 
-    connection_id = await connection_manager.connect(websocket, test_user_id)
+    connection_id = await json_manager.connect(websocket, test_user_id)
 
-    initial_time = connection_manager.heartbeat[connection_id]
+    connection = json_manager.connections[connection_id]
+    initial_time = connection.last_heartbeat
 
     await asyncio.sleep(0.1)
 
-    result = await connection_manager.update_heartbeat(connection_id)
+    result = await json_manager.update_heartbeat(connection_id)
 
     assert result is True
-    assert connection_manager.heartbeat[connection_id] > initial_time
+    assert connection.last_heartbeat > initial_time
 
 
 @pytest.mark.asyncio
 async def test_heartbeat_update_false(
-    connection_manager: ConnectionManager,
+    json_manager: ConnectionManager,
     mock_redis: AsyncMock,
     test_user_id: str,
 ):
     websocket = AsyncMock()
     websocket.accept = AsyncMock()
-    websocket.send_json = AsyncMock()
+    websocket.send_text = AsyncMock()
 
-    _ = await connection_manager.connect(websocket, test_user_id)
+    _ = await json_manager.connect(websocket, test_user_id)
 
-    result = await connection_manager.update_heartbeat(
-        "non_existent_connection_id"
-    )
+    result = await json_manager.update_heartbeat("non_existent_connection_id")
 
     assert result is False
 
 
 @pytest.mark.asyncio
-async def test_check_stale_connections(
-    connection_manager: ConnectionManager,
+async def test_expire_heartbeats_closes_stale_connection(
+    json_manager: ConnectionManager,
     mock_redis: AsyncMock,
     test_user_id: str,
 ):
     websocket = AsyncMock()
     websocket.accept = AsyncMock()
-    websocket.send_json = AsyncMock()
+    websocket.send_text = AsyncMock()
     websocket.close = AsyncMock()
 
-    connection_id = await connection_manager.connect(websocket, test_user_id)
-
-    old_time = datetime.now(timezone.utc) - timedelta(seconds=120)
-    connection_manager.heartbeat[connection_id] = old_time
+    connection_id = await json_manager.connect(websocket, test_user_id)
 
-    await connection_manager.check_stale_connections(timeout_seconds=60)
+    start = json_manager.connections[connection_id].last_heartbeat
+    # First deadline marks away, the rescheduled one times out
+    await json_manager.expire_heartbeats(now=start + 40)
+    await json_manager.expire_heartbeats(now=start + 120)
 
     websocket.close.assert_called_once()
 
-    assert connection_id not in connection_manager.active_connections
-    assert connection_id not in connection_manager.heartbeat
+    assert connection_id not in json_manager.connections
 
 
 @pytest.mark.asyncio
-async def test_check_stale_connections_error(
-    connection_manager: ConnectionManager,
+async def test_expire_heartbeats_close_error(
+    json_manager: ConnectionManager,
     mock_logger: AsyncMock,
     mock_redis: AsyncMock,
     test_user_id: str,
 ):
     websocket = AsyncMock()
     websocket.accept = AsyncMock()
-    websocket.send_json = AsyncMock()
+    websocket.send_text = AsyncMock()
     websocket.close = AsyncMock(side_effect=Exception("Close failed!"))
 
-    connection_id = await connection_manager.connect(websocket, test_user_id)
+    connection_id = await json_manager.connect(websocket, test_user_id)
 
-    old_time = datetime.now(timezone.utc) - timedelta(seconds=120)
-    connection_manager.heartbeat[connection_id] = old_time
+    start = json_manager.connections[connection_id].last_heartbeat
+    await json_manager.expire_heartbeats(now=start + 40)
+    await json_manager.expire_heartbeats(now=start + 120)
 
-    await connection_manager.check_stale_connections(timeout_seconds=60)
-
-    assert connection_id not in connection_manager.active_connections
-    assert connection_id not in connection_manager.heartbeat
+    assert connection_id not in json_manager.connections
 
     assert mock_logger.error.called
 
 
 @pytest.mark.asyncio
-async def test_check_stale_marks_user_away(
-    connection_manager: ConnectionManager,
+async def test_expire_heartbeats_marks_user_away_once(
+    json_manager: ConnectionManager,
     mock_redis: AsyncMock,
     mock_websocket: AsyncMock,
 ):
     user_id = "user-away"
-    connection_id = "conn-away"
 
-    connection_manager.active_connections[connection_id] = mock_websocket
-    connection_manager.connection_user[connection_id] = user_id
-    # Last heartbeat was 40 seconds ago (past 30-s away threshold)
-    connection_manager.heartbeat[connection_id] = datetime.now(
-        timezone.utc
-    ) - timedelta(seconds=40)
+    connection_id = await json_manager.connect(mock_websocket, user_id)
+    mock_redis.run_script.reset_mock()
 
-    await connection_manager.check_stale_connections(
-        timeout_seconds=60, away_threshold_seconds=30
-    )
+    start = json_manager.connections[connection_id].last_heartbeat
+    # Last heartbeat was 40 seconds ago (past 30-s away threshold)
+    await json_manager.expire_heartbeats(now=start + 40)
+    await json_manager.expire_heartbeats(now=start + 45)
 
     # User should NOT be disconnected
     mock_websocket.close.assert_not_called()
-    assert connection_id in connection_manager.active_connections
-
-    # But must have received an "away" presence_update broadcast
-    mock_redis.publish.assert_called()
-    calls_payloads = [c.args[1] for c in mock_redis.publish.call_args_list]
-    away_events = [
-        p
-        for p in calls_payloads
-        if isinstance(p, dict) and p.get("status") == "away"
+    assert connection_id in json_manager.connections
+
+    # But must have received exactly one "away" presence transition
+    statuses = [
+        c.kwargs["args"][0] for c in mock_redis.run_script.call_args_list
     ]
-    assert len(away_events) == 1
+    assert statuses == ["away"]
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_after_away_restores_online(
+    json_manager: ConnectionManager,
+    mock_redis: AsyncMock,
+    mock_websocket: AsyncMock,
+):
+    user_id = "user-back"
+
+    connection_id = await json_manager.connect(mock_websocket, user_id)
+    start = json_manager.connections[connection_id].last_heartbeat
+    await json_manager.expire_heartbeats(now=start + 40)
+    mock_redis.run_script.reset_mock()
+
+    await json_manager.update_heartbeat(connection_id)
+
+    statuses = [
+        c.kwargs["args"][0] for c in mock_redis.run_script.call_args_list
+    ]
+    assert statuses == ["online"]
+    assert not json_manager.connections[connection_id].away
+
+
+@pytest.mark.asyncio
+async def test_expire_heartbeats_only_touches_due_entries(
+    json_manager: ConnectionManager,
+    mock_redis: AsyncMock,
+    mock_websocket: AsyncMock,
+):
+    for i in range(100):
+        await json_manager.connect(
+            mock_websocket, f"user-{i}", connection_id=f"conn-{i}"
+        )
+
+    connections = json_manager.connections
+    start = min(c.last_heartbeat for c in connections.values())
+
+    # Nothing is due yet, so nothing is popped
+    assert await json_manager.expire_heartbeats(now=start + 1) == 0
+
+    # A fresh heartbeat only reschedules lazily when the old entry fires
+    await json_manager.update_heartbeat("conn-0")
+    connections["conn-0"].last_heartbeat = start + 35
+    processed = await json_manager.expire_heartbeats(now=start + 40)
+
+    assert processed == 100
+    assert not connections["conn-0"].away
+    assert sum(c.away for c in connections.values()) == 99
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_supervisor_start_stop(
+    json_manager: ConnectionManager, mock_redis: AsyncMock
+):
+    await json_manager.start_heartbeat_supervisor()
+    assert json_manager.heartbeat_task is not None
+
+    await asyncio.sleep(0)
+    await json_manager.stop_heartbeat_supervisor()
+
+    assert json_manager.heartbeat_task is None
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_refreshes_connection_registration(
+    json_manager: ConnectionManager,
+    mock_redis: AsyncMock,
+    mock_websocket: AsyncMock,
+):
+    user_id = "user-ttl"
+    ttl = json_manager.settings.WS_CONNECTION_TTL
+
+    connection_id = await json_manager.connect(mock_websocket, user_id)
+    mock_redis.batch.calls.clear()
+
+    # Within half the TTL the registration is left alone
+    await json_manager.update_heartbeat(connection_id)
+    assert mock_redis.batch.calls == []
+
+    json_manager._registration_refreshed[user_id] -= ttl / 2
+    await json_manager.update_heartbeat(connection_id)
+
+    (commands,) = mock_redis.batch.calls
+    assert commands[0] == ("expire", f"user:connections:{user_id}", ttl)
+
+
+@pytest.mark.asyncio
+async def test_protocol_ping_connection_is_not_timed_out(
+    protocol_manager: ConnectionManager,
+    mock_redis: AsyncMock,
+    mock_websocket: AsyncMock,
+):
+    connection_id = await protocol_manager.connect(mock_websocket, "user-1")
+    mock_redis.run_script.reset_mock()
+    connection = protocol_manager.connections[connection_id]
+    start = connection.last_heartbeat
+
+    # No JSON pings at all: the server's ping frames prove liveness
+    await protocol_manager.expire_heartbeats(now=start + 40)
+    await protocol_manager.expire_heartbeats(now=start + 120)
+
+    mock_websocket.close.assert_not_called()
+    assert connection_id in protocol_manager.connections
+    assert not connection.away
+    mock_redis.run_script.assert_not_called()
+
+    # The next check only comes due to refresh the registration
+    ttl = protocol_manager.settings.WS_CONNECTION_TTL
+    deadline, _, pending_id, _ = protocol_manager._heartbeat_deadlines[0]
+    assert pending_id == connection_id
+    assert deadline == start + 40 + ttl / 2
+
+    await protocol_manager.expire_heartbeats(now=deadline)
+    commands = mock_redis.batch.calls[-1]
+    assert commands[0] == ("expire", "user:connections:user-1", ttl)
+
+
+@pytest.mark.asyncio
+async def test_json_ping_client_is_supervised_with_protocol_ping(
+    protocol_manager: ConnectionManager,
+    mock_redis: AsyncMock,
+    mock_websocket: AsyncMock,
+):
+    connection_id = await protocol_manager.connect(mock_websocket, "user-1")
+    await protocol_manager.update_heartbeat(connection_id)
+    start = protocol_manager.connections[connection_id].last_heartbeat
+
+    await protocol_manager.expire_heartbeats(now=start + 40)
+    await protocol_manager.expire_heartbeats(now=start + 120)
+
+    mock_websocket.close.assert_called_once()
+    assert connection_id not in protocol_manager.connections
+
+
+@pytest.mark.asyncio
+async def test_first_json_ping_moves_up_refresh_deadline(
+    protocol_manager: ConnectionManager,
+    mock_redis: AsyncMock,
+    mock_websocket: AsyncMock,
+):
+    connection_id = await protocol_manager.connect(mock_websocket, "user-1")
+    connection = protocol_manager.connections[connection_id]
+    start = connection.last_heartbeat
+
+    # Under protocol pings the entry is pushed back to the next refresh
+    await protocol_manager.expire_heartbeats(now=start + 40)
+    await protocol_manager.update_heartbeat(connection_id)
+    connection.last_heartbeat = start + 40
+
+    # The superseded refresh entry is dropped, the away entry handled
+    await protocol_manager.expire_heartbeats(now=start + 80)
+    assert connection.away
+    assert connection.heartbeat_entry[3] == "timeout"
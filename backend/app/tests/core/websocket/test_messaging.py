@@ -1,8 +1,15 @@
+import asyncio
+import json
 from unittest.mock import AsyncMock
 
 import pytest
 
-from app.core.websocket import ConnectionManager
+from app.core.websocket import (
+    RECORD_AND_ROUTE_SCRIPT,
+    ROUTE_TO_CONVERSATIONS_SCRIPT,
+    ROUTE_TO_USERS_SCRIPT,
+    ConnectionManager,
+)
 
 
 @pytest.mark.asyncio
@@ -13,16 +20,19 @@ async def test_send_personal_message(
 ):
     websocket = AsyncMock()
     websocket.accept = AsyncMock()
-    websocket.send_json = AsyncMock()
+    websocket.send_text = AsyncMock()
 
     connection_id = await connection_manager.connect(websocket, test_user_id)
+    await asyncio.sleep(0)
 
-    websocket.send_json.reset_mock()
+    websocket.send_text.reset_mock()
 
     test_message = {"type": "test", "data": "hello"}
     await connection_manager.send_personal_message(connection_id, test_message)
+    await asyncio.sleep(0)
 
-    websocket.send_json.assert_called_once_with(test_message)
+    websocket.send_text.assert_called_once()
+    assert json.loads(websocket.send_text.call_args.args[0]) == test_message
 
 
 @pytest.mark.asyncio
@@ -34,16 +44,18 @@ async def test_send_personal_message_error(
 ):
     websocket = AsyncMock()
     websocket.accept = AsyncMock()
-    websocket.send_json = AsyncMock(side_effect=Exception("Send JSON failed!"))
+    websocket.send_text = AsyncMock(side_effect=Exception("Send JSON failed!"))
 
     connection_id = await connection_manager.connect(websocket, test_user_id)
+    await asyncio.sleep(0)
 
-    websocket.send_json.reset_mock()
+    websocket.send_text.reset_mock()
 
     test_message = {"type": "test", "data": "hello"}
     await connection_manager.send_personal_message(connection_id, test_message)
+    await asyncio.sleep(0)
 
-    websocket.send_json.assert_called_once_with(test_message)
+    websocket.send_text.assert_called_once()
 
     assert mock_logger.error.called
 
@@ -57,4 +69,137 @@ async def test_send_to_user(
     test_message = {"type": "test", "data": "hello"}
     await connection_manager.send_to_user(test_user_id, test_message)
 
-    assert mock_redis.publish.called
+    # Routed by script to the nodes holding the user's connections
+    mock_redis.run_script.assert_called_once()
+    script = mock_redis.run_script.call_args.args[0]
+    keys = mock_redis.run_script.call_args.kwargs["keys"]
+    prefix, payload = mock_redis.run_script.call_args.kwargs["args"]
+    assert script == ROUTE_TO_USERS_SCRIPT
+    assert keys == [f"user:connections:{test_user_id}"]
+    assert prefix == "node:"
+    assert json.loads(payload) == {
+        "kind": "user",
+        "user_id": test_user_id,
+        "message": test_message,
+    }
+    mock_redis.publish.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_broadcast_to_conversation_routes_to_member_nodes(
+    connection_manager: ConnectionManager, mock_redis: AsyncMock
+):
+    test_message = {"type": "test", "data": "hello"}
+    await connection_manager.broadcast_to_conversation(
+        "conv-1", test_message, exclude_user_id="user-1"
+    )
+
+    mock_redis.run_script.assert_called_once()
+    script = mock_redis.run_script.call_args.args[0]
+    keys = mock_redis.run_script.call_args.kwargs["keys"]
+    prefix, payload = mock_redis.run_script.call_args.kwargs["args"]
+    assert script == ROUTE_TO_CONVERSATIONS_SCRIPT
+    assert keys == ["conversation:nodes:conv-1"]
+    assert prefix == "node:"
+    assert json.loads(payload) == {
+        "kind": "conversation",
+        "conversation_id": "conv-1",
+        "message": test_message,
+        "exclude_user_id": "user-1",
+    }
+
+
+@pytest.mark.asyncio
+async def test_broadcast_encodes_each_event_once(
+    connection_manager: ConnectionManager,
+):
+    sockets = [AsyncMock() for _ in range(5)]
+    connection_ids = [
+        await connection_manager.connect(ws, f"user-{i}")
+        for i, ws in enumerate(sockets)
+    ]
+    await asyncio.sleep(0)
+    encode_count = connection_manager.encode_count
+
+    message = {"type": "new_message", "content": "hello"}
+    queued = connection_manager.broadcast(connection_ids, message)
+    await asyncio.sleep(0)
+
+    assert queued == 5
+    assert connection_manager.encode_count == encode_count + 1
+    frames = {ws.send_text.call_args.args[0] for ws in sockets}
+    assert len(frames) == 1
+    assert json.loads(frames.pop()) == message
+
+
+@pytest.mark.asyncio
+async def test_sequenced_broadcast_is_recorded_for_replay(
+    connection_manager: ConnectionManager, mock_redis: AsyncMock
+):
+    await connection_manager.broadcast_to_conversation(
+        "conv-1", {"type": "new_message"}, seq=7
+    )
+
+    script = mock_redis.run_script.call_args.args[0]
+    keys = mock_redis.run_script.call_args.kwargs["keys"]
+    args = mock_redis.run_script.call_args.kwargs["args"]
+    assert script == RECORD_AND_ROUTE_SCRIPT
+    assert keys == ["conversation:nodes:conv-1", "conversation:stream:conv-1"]
+    assert json.loads(args[1])["message"] == {"type": "new_message", "seq": 7}
+    assert args[2] == 7
+    assert json.loads(args[3]) == {"type": "new_message", "seq": 7}
+
+
+def stream_entry(seq: int) -> tuple[str, dict[str, str]]:
+    return f"{seq}-0", {"event": json.dumps({"type": "new_message", "seq": seq})}
+
+
+@pytest.mark.asyncio
+async def test_get_replay_returns_contiguous_delta(
+    connection_manager: ConnectionManager, mock_redis: AsyncMock
+):
+    mock_redis.batch.replies.append(
+        [
+            [stream_entry(12)],
+            [stream_entry(11), stream_entry(12)],
+            [stream_entry(5)],
+            [],
+        ]
+    )
+
+    replay = await connection_manager.get_replay(
+        {"conv-1": 10, "conv-2": 5}, limit=100
+    )
+
+    assert [event["seq"] for event in replay["conv-1"]] == [11, 12]
+    assert replay["conv-2"] == []
+    commands = mock_redis.batch.calls[-1]
+    assert commands[1] == (
+        "xrange",
+        "conversation:stream:conv-1",
+        "11-0",
+        "+",
+        100,
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_replay_detects_trimmed_or_missing_stream(
+    connection_manager: ConnectionManager, mock_redis: AsyncMock
+):
+    mock_redis.batch.replies.append(
+        [
+            # Trimmed: the oldest kept entry is past the client's position
+            [stream_entry(40)],
+            [stream_entry(30), stream_entry(40)],
+            # Expired
+            [],
+            [],
+        ]
+    )
+
+    replay = await connection_manager.get_replay(
+        {"conv-1": 10, "conv-2": 3}, limit=100
+    )
+
+    assert replay == {"conv-1": None, "conv-2": None}
@@ -13,7 +13,9 @@ async def test_start_pubsub_listener_subscribes_to_channel(
 ):
     await connection_manager.start_pubsub_listener()
 
-    mock_redis.subscribe.assert_called_once_with("presence")
+    mock_redis.subscribe.assert_called_once_with(
+        "presence", connection_manager.inbox_channel
+    )
 
     assert connection_manager.pubsub_task is not None
     assert isinstance(connection_manager.pubsub_task, asyncio.Task)
@@ -43,7 +45,12 @@ async def test_listener_loop_receives_and_processes_message(
     message = {
         "type": "message",
         "channel": "presence",
-        "data": json.dumps({"type": "user_online", "user_id": "user-123"}),
+        "data": json.dumps(
+            {
+                "message": {"type": "user_online", "user_id": "user-123"},
+                "conversation_ids": ["conv-1"],
+            }
+        ),
     }
 
     call_count = 0
@@ -58,7 +65,9 @@ async def test_listener_loop_receives_and_processes_message(
 
     mock_redis.get_message = AsyncMock(side_effect=mock_get_message)
 
-    _ = await connection_manager.connect(mock_websocket, "user-456")
+    _ = await connection_manager.connect(
+        mock_websocket, "user-456", conversation_ids=["conv-1"]
+    )
 
     await connection_manager.start_pubsub_listener()
 
@@ -66,11 +75,13 @@ async def test_listener_loop_receives_and_processes_message(
 
     await connection_manager.stop_pubsub_listener()
 
-    assert mock_websocket.send_json.call_count >= 2
+    assert mock_websocket.send_text.call_count >= 2
 
-    calls = mock_websocket.send_json.call_args_list
+    calls = mock_websocket.send_text.call_args_list
     presence_calls = [
-        call for call in calls if call[0][0].get("type") == "user_online"
+        call
+        for call in calls
+        if json.loads(call[0][0]).get("type") == "user_online"
     ]
     assert len(presence_calls) > 0
 
@@ -82,12 +93,13 @@ async def test_listener_loop_handles_user_message(
     mock_websocket: AsyncMock,
 ):
     user_id = "user-123"
+    event = {"type": "notification", "content": "You have a new message"}
 
     message = {
         "type": "message",
-        "channel": f"user:{user_id}",
+        "channel": connection_manager.inbox_channel,
         "data": json.dumps(
-            {"type": "notification", "content": "You have a new message"}
+            {"kind": "user", "user_id": user_id, "message": event}
         ),
     }
 
@@ -103,11 +115,9 @@ async def test_listener_loop_handles_user_message(
 
     mock_redis.get_message = AsyncMock(side_effect=mock_get_message)
 
-    mock_redis.smembers = AsyncMock(return_value={"conn-1"})
-
     _ = await connection_manager.connect(mock_websocket, user_id)
-
-    connection_manager.active_connections["conn-1"] = mock_websocket
+    await asyncio.sleep(0)
+    mock_websocket.send_text.reset_mock()
 
     await connection_manager.start_pubsub_listener()
 
@@ -116,7 +126,10 @@ async def test_listener_loop_handles_user_message(
     await connection_manager.stop_pubsub_listener()
 
     assert mock_redis.get_message.called
-    assert mock_websocket.send_json.called
+    mock_websocket.send_text.assert_called_once()
+    assert json.loads(mock_websocket.send_text.call_args.args[0]) == event
+    # Delivery uses the local user index, not Redis
+    mock_redis.smembers.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -127,9 +140,11 @@ async def test_listener_loop_handles_conversation_message(
 ):
     message = {
         "type": "message",
-        "channel": "conversation:conv-123",
+        "channel": connection_manager.inbox_channel,
         "data": json.dumps(
             {
+                "kind": "conversation",
+                "conversation_id": "conv-123",
                 "message": {
                     "type": "chat_message",
                     "content": "Hello everyone!",
@@ -153,14 +168,18 @@ async def test_listener_loop_handles_conversation_message(
 
     ws1 = AsyncMock()
     ws1.accept = AsyncMock()
-    ws1.send_json = AsyncMock()
+    ws1.send_text = AsyncMock()
 
     ws2 = AsyncMock()
     ws2.accept = AsyncMock()
-    ws2.send_json = AsyncMock()
+    ws2.send_text = AsyncMock()
 
-    _ = await connection_manager.connect(ws1, "user-1")
-    _ = await connection_manager.connect(ws2, "user-2")
+    _ = await connection_manager.connect(
+        ws1, "user-1", conversation_ids=["conv-123"]
+    )
+    _ = await connection_manager.connect(
+        ws2, "user-2", conversation_ids=["conv-123"]
+    )
 
     await connection_manager.start_pubsub_listener()
 
@@ -168,8 +187,8 @@ async def test_listener_loop_handles_conversation_message(
 
     await connection_manager.stop_pubsub_listener()
 
-    assert ws1.send_json.called
-    assert ws2.send_json.called
+    assert ws1.send_text.called
+    assert ws2.send_text.called
 
 
 @pytest.mark.asyncio
@@ -194,3 +213,125 @@ async def test_listener_loop_error(
     await asyncio.sleep(1.2)
     await connection_manager.stop_pubsub_listener()
     assert mock_logger.error.called
+
+
+@pytest.mark.asyncio
+async def test_conversation_nodes_are_reference_counted(
+    connection_manager: ConnectionManager, mock_redis: AsyncMock
+):
+    node_id = connection_manager.node_id
+    ws1 = AsyncMock()
+    ws2 = AsyncMock()
+
+    conn1 = await connection_manager.connect(
+        ws1, "user-1", conversation_ids=["conv-1"]
+    )
+    conn2 = await connection_manager.connect(
+        ws2, "user-2", conversation_ids=["conv-1"]
+    )
+
+    # The second local member must not register the node again
+    assert mock_redis.batch.calls == [
+        [
+            ("sadd", "conversation:nodes:conv-1", node_id),
+            ("sadd", connection_manager.node_conversations_key, "conv-1"),
+        ]
+    ]
+    assert connection_manager._conversation_refs == {"conv-1": 2}
+    mock_redis.batch.calls.clear()
+
+    await connection_manager.disconnect(conn1, "user-1")
+    assert mock_redis.batch.calls == []
+
+    await connection_manager.disconnect(conn2, "user-2")
+    assert mock_redis.batch.calls == [
+        [
+            ("srem", "conversation:nodes:conv-1", node_id),
+            ("srem", connection_manager.node_conversations_key, "conv-1"),
+        ]
+    ]
+    assert connection_manager._conversation_refs == {}
+
+
+@pytest.mark.asyncio
+async def test_join_and_leave_register_node_for_conversation(
+    connection_manager: ConnectionManager, mock_redis: AsyncMock
+):
+    node_id = connection_manager.node_id
+    await connection_manager.connect(AsyncMock(), "user-1")
+    mock_redis.batch.calls.clear()
+
+    await connection_manager.join_conversation("conv-7", "user-1")
+    assert mock_redis.batch.calls == [
+        [
+            ("sadd", "conversation:nodes:conv-7", node_id),
+            ("sadd", connection_manager.node_conversations_key, "conv-7"),
+        ]
+    ]
+    mock_redis.batch.calls.clear()
+
+    await connection_manager.leave_conversation("conv-7", "user-1")
+    assert mock_redis.batch.calls == [
+        [
+            ("srem", "conversation:nodes:conv-7", node_id),
+            ("srem", connection_manager.node_conversations_key, "conv-7"),
+        ]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_inbox_ignores_other_channels(
+    connection_manager: ConnectionManager, mock_websocket: AsyncMock
+):
+    await connection_manager.connect(mock_websocket, "user-1")
+    await asyncio.sleep(0)
+    mock_websocket.send_text.reset_mock()
+
+    await connection_manager._handle_node_message(
+        {"kind": "unknown", "user_id": "user-1", "message": {"type": "x"}}
+    )
+    await asyncio.sleep(0)
+
+    mock_websocket.send_text.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_stop_pubsub_listener_deregisters_node(
+    connection_manager: ConnectionManager, mock_redis: AsyncMock
+):
+    await connection_manager.connect(
+        AsyncMock(), "user-1", conversation_ids=["conv-1"]
+    )
+    mock_redis.batch.calls.clear()
+
+    await connection_manager.stop_pubsub_listener()
+
+    mock_redis.unsubscribe.assert_called_once_with(
+        "presence", connection_manager.inbox_channel
+    )
+    assert mock_redis.batch.calls == [
+        [
+            ("srem", "conversation:nodes:conv-1", connection_manager.node_id),
+            ("delete", connection_manager.node_conversations_key),
+        ]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_listener_loop_blocks_on_pubsub_socket(
+    connection_manager: ConnectionManager, mock_redis: AsyncMock
+):
+    async def mock_get_message(*args, **kwargs):
+        await asyncio.sleep(0.1)
+        return None
+
+    mock_redis.get_message = AsyncMock(side_effect=mock_get_message)
+
+    await connection_manager.start_pubsub_listener()
+    await asyncio.sleep(0.05)
+    await connection_manager.stop_pubsub_listener()
+
+    mock_redis.get_message.assert_called_once_with(
+        ignore_subscribe_messages=True,
+        timeout=connection_manager.settings.WS_PUBSUB_BLOCK_TIMEOUT,
+    )
@@ -0,0 +1,169 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.core.websocket import ConnectionManager, ConnectionWriter
+
+
+async def never_completes(_message):
+    await asyncio.sleep(3600)
+
+
+def make_writer(
+    max_size: int = 2, overflow_policy: str = "drop_ephemeral"
+) -> tuple[ConnectionWriter, MagicMock]:
+    on_overflow = MagicMock()
+    writer = ConnectionWriter(
+        AsyncMock(),
+        "conn-1",
+        logger=MagicMock(),
+        on_overflow=on_overflow,
+        max_size=max_size,
+        overflow_policy=overflow_policy,
+    )
+    return writer, on_overflow
+
+
+def test_full_queue_drops_incoming_ephemeral_frame():
+    writer, on_overflow = make_writer()
+    writer.enqueue("message-1")
+    writer.enqueue("message-2")
+
+    assert writer.enqueue("typing", droppable=True) is False
+
+    assert writer.dropped == 1
+    assert len(writer.queue) == 2
+    on_overflow.assert_not_called()
+
+
+def test_full_queue_evicts_oldest_ephemeral_frame():
+    writer, on_overflow = make_writer()
+    writer.enqueue("presence", droppable=True)
+    writer.enqueue("message-1")
+
+    assert writer.enqueue("message-2") is True
+
+    assert [frame for frame, _ in writer.queue] == ["message-1", "message-2"]
+    assert writer.dropped == 1
+    on_overflow.assert_not_called()
+
+
+def test_full_queue_without_ephemeral_frames_disconnects():
+    writer, on_overflow = make_writer()
+    writer.enqueue("message-1")
+    writer.enqueue("message-2")
+
+    assert writer.enqueue("message-3") is False
+
+    on_overflow.assert_called_once_with("conn-1")
+    assert writer.closed is True
+    assert writer.enqueue("message-4") is False
+
+
+def test_disconnect_policy_evicts_on_first_overflow():
+    writer, on_overflow = make_writer(overflow_policy="disconnect")
+    writer.enqueue("typing", droppable=True)
+    writer.enqueue("typing", droppable=True)
+
+    writer.enqueue("typing", droppable=True)
+
+    on_overflow.assert_called_once_with("conn-1")
+
+
+@pytest.mark.asyncio
+async def test_stalled_client_does_not_delay_others(
+    connection_manager: ConnectionManager,
+):
+    stalled = AsyncMock()
+    stalled.send_text = AsyncMock(side_effect=never_completes)
+    healthy = AsyncMock()
+
+    await connection_manager.connect(
+        stalled, "user-slow", conversation_ids=["conv-1"]
+    )
+    await connection_manager.connect(
+        healthy, "user-fast", conversation_ids=["conv-1"]
+    )
+
+    message = {"type": "new_message", "conversation_id": "conv-1"}
+    await asyncio.wait_for(
+        connection_manager._handle_conversation_message(
+            "conv-1", {"message": message, "exclude_user_id": None}
+        ),
+        timeout=1,
+    )
+    await asyncio.sleep(0)
+
+    frames = [json.loads(c.args[0]) for c in healthy.send_text.call_args_list]
+    assert message in frames
+
+
+@pytest.mark.asyncio
+async def test_overflow_closes_slow_consumer(
+    connection_manager: ConnectionManager,
+):
+    connection_manager.settings = connection_manager.settings.model_copy(
+        update={"WS_SEND_QUEUE_SIZE": 1}
+    )
+    stalled = AsyncMock()
+    stalled.send_text = AsyncMock(side_effect=never_completes)
+
+    connection_id = await connection_manager.connect(stalled, "user-slow")
+    await asyncio.sleep(0)  # writer picks up connection_established
+
+    for i in range(3):
+        await connection_manager.send_personal_message(
+            connection_id, {"type": "new_message", "id": i}
+        )
+    await asyncio.sleep(0)
+
+    stalled.close.assert_awaited_once_with(
+        code=connection_manager.settings.WS_SLOW_CONSUMER_CLOSE_CODE,
+        reason="Slow consumer",
+    )
+    assert connection_manager.connections[connection_id].writer.closed
+
+
+@pytest.mark.asyncio
+async def test_wait_for_room_returns_once_frames_are_written():
+    writer, _ = make_writer(max_size=2)
+    writer.enqueue("message-1")
+    writer.enqueue("message-2")
+    waiter = asyncio.create_task(writer.wait_for_room(1))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    writer.start()
+    assert await asyncio.wait_for(waiter, timeout=1) is True
+    writer.close()
+
+    # A closed writer never makes room
+    assert await writer.wait_for_room(1) is False
+
+
+@pytest.mark.asyncio
+async def test_backlog_longer_than_queue_is_paced_not_evicted(
+    connection_manager: ConnectionManager,
+):
+    websocket = AsyncMock()
+    connection_id = await connection_manager.connect(websocket, "user-1")
+    writer = connection_manager.connections[connection_id].writer
+    # More non-droppable events than the queue holds
+    events = [{"type": "new_message", "seq": seq} for seq in range(1, 301)]
+    assert len(events) > writer.max_size
+
+    queued = await asyncio.wait_for(
+        connection_manager.send_backlog(connection_id, events), timeout=1
+    )
+    while writer.queue:
+        await asyncio.sleep(0)
+
+    assert queued == 300
+    assert not writer.closed
+    websocket.close.assert_not_called()
+    frames = [json.loads(c.args[0]) for c in websocket.send_text.call_args_list]
+    assert [f["seq"] for f in frames if f["type"] == "new_message"] == list(
+        range(1, 301)
+    )
@@ -0,0 +1,162 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.core.websocket import FLUSH_TYPING_SCRIPT, ConnectionManager
+
+
+def published_summaries(
+    connection_manager: ConnectionManager, mock_redis: AsyncMock
+) -> list[dict]:
+    summaries = []
+    for call in mock_redis.run_script.call_args_list:
+        if call.args[0] != connection_manager.route_to_conversations_script:
+            continue
+        for payload in call.kwargs["args"][1:]:
+            summaries.append(json.loads(payload)["message"])
+    return summaries
+
+
+def flush_results(mock_redis: AsyncMock, *results: list | None):
+    """Answer the flush script calls with ``results``, one per call."""
+    replies = list(results)
+
+    async def run_script(script, keys, args):
+        if script == FLUSH_TYPING_SCRIPT:
+            return replies.pop(0)
+        return 1
+
+    mock_redis.run_script.side_effect = run_script
+
+
+@pytest.mark.asyncio
+async def test_typing_is_debounced(
+    connection_manager: ConnectionManager, mock_redis: AsyncMock
+):
+    for _ in range(10):
+        await connection_manager.set_typing_status("conv-1", "user-1", True)
+
+    # Only the first keystroke reaches Redis within the debounce window
+    assert len(mock_redis.batch.calls) == 1
+    assert mock_redis.batch.transactions == [True]
+
+    await connection_manager.set_typing_status("conv-1", "user-1", False)
+    await connection_manager.set_typing_status("conv-1", "user-1", True)
+
+    # Stopping resets the debounce
+    assert len(mock_redis.batch.calls) == 2
+
+    connection_manager._typing_flush_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_flush_typing_publishes_one_summary_per_conversation(
+    connection_manager: ConnectionManager, mock_redis: AsyncMock
+):
+    for user_id in ("user-1", "user-2", "user-3"):
+        await connection_manager.set_typing_status("conv-1", user_id, True)
+    connection_manager._typing_flush_task.cancel()
+    flush_results(mock_redis, [[2, ["user-1", "user-2"]]])
+
+    published = await connection_manager.flush_typing()
+
+    assert published == 1
+    flush = mock_redis.run_script.call_args_list[0]
+    assert flush.kwargs["keys"] == [
+        "conversation:typing:conv-1",
+        "conversation:typing_flush:conv-1",
+        "conversation:typing_announced:conv-1",
+    ]
+    assert flush.kwargs["args"][:2] == [connection_manager.node_id, 1000]
+    summaries = published_summaries(connection_manager, mock_redis)
+    assert summaries == [
+        {
+            "type": "typing_summary",
+            "conversation_id": "conv-1",
+            "user_ids": ["user-1", "user-2"],
+            "timestamp": summaries[0]["timestamp"],
+        }
+    ]
+
+
+@pytest.mark.asyncio
+async def test_flush_typing_skips_unchanged_summary(
+    connection_manager: ConnectionManager, mock_redis: AsyncMock
+):
+    connection_manager._typing_dirty.add("conv-1")
+    flush_results(mock_redis, [[2, ["user-1"]]], [[1, ["user-1"]]], [[2, []]])
+    assert await connection_manager.flush_typing() == 1
+
+    # Same typers on the next interval: nothing is published, but the
+    # conversation is re-checked until its typers go stale
+    assert await connection_manager.flush_typing() == 0
+    assert connection_manager._typing_announced == {"conv-1"}
+
+    # Typer went stale: an empty summary clears the indicator
+    assert await connection_manager.flush_typing() == 1
+    summaries = published_summaries(connection_manager, mock_redis)
+    assert summaries[-1]["user_ids"] == []
+    assert connection_manager._typing_announced == set()
+
+
+@pytest.mark.asyncio
+async def test_flush_typing_leaves_conversation_to_slot_holder(
+    connection_manager: ConnectionManager, mock_redis: AsyncMock
+):
+    connection_manager._typing_dirty.add("conv-1")
+    connection_manager._typing_announced.add("conv-2")
+    flush_results(mock_redis, [[0], [0]])
+
+    assert await connection_manager.flush_typing() == 0
+
+    # Another node flushes both this interval; the unsent change is retried
+    assert connection_manager._typing_dirty == {"conv-1"}
+    assert connection_manager._typing_announced == {"conv-2"}
+    assert published_summaries(connection_manager, mock_redis) == []
+
+
+@pytest.mark.asyncio
+async def test_flush_typing_redis_error(
+    connection_manager: ConnectionManager, mock_redis: AsyncMock
+):
+    connection_manager._typing_dirty.add("conv-1")
+    flush_results(mock_redis, None)
+
+    assert await connection_manager.flush_typing() == 0
+    assert connection_manager._typing_dirty == {"conv-1"}
+
+
+@pytest.mark.asyncio
+async def test_typing_summary_leaves_out_the_recipient(
+    connection_manager: ConnectionManager,
+):
+    sockets = {
+        user_id: AsyncMock() for user_id in ("user-1", "user-2", "user-3")
+    }
+    for user_id, ws in sockets.items():
+        await connection_manager.connect(
+            ws, user_id, conversation_ids=["conv-1"]
+        )
+    await asyncio.sleep(0)
+
+    summary = {
+        "type": "typing_summary",
+        "conversation_id": "conv-1",
+        "user_ids": ["user-1", "user-2"],
+    }
+    await connection_manager._handle_conversation_message(
+        "conv-1", {"message": summary, "exclude_user_id": None}
+    )
+    await asyncio.sleep(0)
+
+    seen = {
+        user_id: json.loads(ws.send_text.call_args.args[0])["user_ids"]
+        for user_id, ws in sockets.items()
+    }
+    assert seen == {
+        "user-1": ["user-2"],
+        "user-2": ["user-1"],
+        "user-3": ["user-1", "user-2"],
+    }
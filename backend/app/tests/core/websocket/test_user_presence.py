@@ -1,7 +1,10 @@
+import asyncio
+import json
 from unittest.mock import AsyncMock
 
 import pytest
 
+from app.core.config import get_settings
 from app.core.websocket import ConnectionManager
 
 
@@ -16,17 +19,22 @@ async def test_user_presence(
         "last_seen": "2024-01-01",
     }
 
-    await connection_manager.set_user_online(test_user_id)
+    assert await connection_manager.set_user_online(test_user_id) is True
 
-    assert mock_redis.hset.called
-    assert mock_redis.expire.called
-    assert mock_redis.publish.called
+    mock_redis.run_script.assert_called_once()
+    keys = mock_redis.run_script.call_args.kwargs["keys"]
+    args = mock_redis.run_script.call_args.kwargs["args"]
+    assert keys[0] == f"user:presence:{test_user_id}"
+    assert args[0] == "online"
+    assert args[2] == 3600
 
     presence = await connection_manager.get_user_presence(test_user_id)
     assert presence["status"] == "online"
 
     await connection_manager.set_user_offline(test_user_id)
-    assert mock_redis.hset.called
+    args = mock_redis.run_script.call_args.kwargs["args"]
+    assert args[0] == "offline"
+    assert args[2] == 86400
 
 
 @pytest.mark.asyncio
@@ -52,20 +60,22 @@ async def test_typing_status(
         conversation_id, test_user_id, is_typing=True
     )
 
-    assert mock_redis.hset.called, "hset should be called for typing=True"
-    assert mock_redis.expire.called, "expire should be called for typing=True"
-    assert mock_redis.publish.called, "publish should be called for broadcast"
+    commands = mock_redis.batch.calls[-1]
+    assert [c[0] for c in commands] == ["hset", "expire"]
+    # Participants are notified by the next typing_summary flush
+    assert not mock_redis.publish.called
+    assert conversation_id in connection_manager._typing_dirty
 
-    mock_redis.hset.reset_mock()
+    mock_redis.batch.calls.clear()
     mock_redis.hdel.reset_mock()
-    mock_redis.publish.reset_mock()
 
     await connection_manager.set_typing_status(
         conversation_id, test_user_id, is_typing=False
     )
 
     assert mock_redis.hdel.called, "hdel should be called for typing=False"
-    assert mock_redis.publish.called, "publish should be called for broadcast"
+
+    connection_manager._typing_flush_task.cancel()
 
 
 @pytest.mark.asyncio
@@ -76,14 +86,27 @@ async def test_set_user_away_updates_redis_and_broadcasts(
 ):
     await connection_manager.set_user_away(test_user_id)
 
-    hset_calls = [str(c) for c in mock_redis.hset.call_args_list]
-    assert any("away" in c for c in hset_calls)
+    mock_redis.run_script.assert_called_once()
+    status, _, _, payload = mock_redis.run_script.call_args.kwargs["args"]
+    assert status == "away"
+
+    event = json.loads(payload)["message"]
+    assert event["type"] == "presence_update"
+    assert event["status"] == "away"
+    assert event["user_id"] == test_user_id
+
+
+@pytest.mark.asyncio
+async def test_unchanged_status_is_not_reported(
+    connection_manager: ConnectionManager,
+    mock_redis: AsyncMock,
+    test_user_id: str,
+):
+    # The script returns 0 when the status did not change (no broadcast)
+    mock_redis.run_script.return_value = 0
 
-    mock_redis.publish.assert_called_once()
-    _, payload = mock_redis.publish.call_args.args
-    assert payload["type"] == "presence_update"
-    assert payload["status"] == "away"
-    assert payload["user_id"] == test_user_id
+    assert await connection_manager.set_user_away(test_user_id) is False
+    mock_redis.publish.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -93,12 +116,13 @@ async def test_get_bulk_presence_returns_all_users(
     user_ids = ["user-1", "user-2", "user-3"]
 
     # Simulate: user-1 online, others missing
-    def hgetall_side_effect(key: str):
-        if "user-1" in key:
-            return {"status": "online", "last_seen": "2026-02-15T10:00:00Z"}
-        return {}
-
-    mock_redis.hgetall.side_effect = hgetall_side_effect
+    mock_redis.batch.replies.append(
+        [
+            {"status": "online", "last_seen": "2026-02-15T10:00:00Z"},
+            {},
+            {},
+        ]
+    )
 
     results = await connection_manager.get_bulk_presence(user_ids)
 
@@ -107,3 +131,135 @@ async def test_get_bulk_presence_returns_all_users(
     assert results[0]["status"] == "online"
     assert results[1]["status"] == "offline"
     assert results[2]["status"] == "offline"
+
+
+@pytest.mark.asyncio
+async def test_get_bulk_presence_uses_one_round_trip(
+    connection_manager: ConnectionManager, mock_redis: AsyncMock
+):
+    user_ids = [f"user-{i}" for i in range(100)]
+    mock_redis.batch.replies.append([{} for _ in user_ids])
+
+    results = await connection_manager.get_bulk_presence(user_ids)
+
+    assert len(results) == 100
+    (commands,) = mock_redis.batch.calls
+    assert commands[0] == ("hgetall", "user:presence:user-0")
+    assert len(commands) == 100
+    mock_redis.hgetall.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_bulk_presence_redis_error_reports_offline(
+    connection_manager: ConnectionManager, mock_redis: AsyncMock
+):
+    mock_redis.batch.replies.append(None)
+
+    results = await connection_manager.get_bulk_presence(["user-1"])
+
+    assert results == [
+        {"user_id": "user-1", "status": "offline", "last_seen": None}
+    ]
+
+
+def presence_event(user_id: str, conversation_ids: list[str]) -> dict:
+    return {
+        "message": {
+            "type": "presence_update",
+            "user_id": user_id,
+            "status": "online",
+            "last_seen": "2026-02-15T10:00:00Z",
+        },
+        "conversation_ids": conversation_ids,
+    }
+
+
+def received_presence(websocket: AsyncMock) -> list[dict]:
+    frames = [json.loads(c.args[0]) for c in websocket.send_text.call_args_list]
+    return [f for f in frames if f["type"] == "presence_update"]
+
+
+@pytest.mark.asyncio
+async def test_presence_reaches_only_shared_conversations(
+    connection_manager: ConnectionManager, mock_redis: AsyncMock
+):
+    member = AsyncMock()
+    outsider = AsyncMock()
+    await connection_manager.connect(
+        member, "user-member", conversation_ids=["conv-1"]
+    )
+    await connection_manager.connect(
+        outsider, "user-outsider", conversation_ids=["conv-2"]
+    )
+
+    await connection_manager._handle_presence_message(
+        presence_event("user-1", ["conv-1"])
+    )
+    await asyncio.sleep(0)
+
+    assert len(received_presence(member)) == 1
+    assert received_presence(outsider) == []
+    assert connection_manager.presence_frames_sent.total == 1
+
+
+@pytest.mark.asyncio
+async def test_presence_subscription_delivers_and_unsubscribes(
+    connection_manager: ConnectionManager,
+    mock_redis: AsyncMock,
+    mock_websocket: AsyncMock,
+):
+    watcher = mock_websocket
+    connection_id = await connection_manager.connect(watcher, "user-watcher")
+
+    assert connection_manager.subscribe_presence(
+        connection_id, ["user-1", "user-2"]
+    ) == ["user-1", "user-2"]
+
+    await connection_manager._handle_presence_message(
+        presence_event("user-1", [])
+    )
+    await asyncio.sleep(0)
+    assert len(received_presence(watcher)) == 1
+
+    connection_manager.unsubscribe_presence(connection_id, ["user-1"])
+    await connection_manager._handle_presence_message(
+        presence_event("user-1", [])
+    )
+    await asyncio.sleep(0)
+    assert len(received_presence(watcher)) == 1
+    assert connection_manager.presence_subscribers == {"user-2": {connection_id}}
+
+    await connection_manager.disconnect(connection_id, "user-watcher")
+    assert connection_manager.presence_subscribers == {}
+    assert connection_manager.connections == {}
+
+
+@pytest.mark.asyncio
+async def test_presence_subscriptions_are_capped(
+    mock_logger: AsyncMock, mock_redis: AsyncMock, mock_websocket: AsyncMock
+):
+    settings = get_settings().model_copy(
+        update={"WS_PRESENCE_MAX_SUBSCRIPTIONS": 2}
+    )
+    manager = ConnectionManager(
+        logger=mock_logger, redis=mock_redis, settings=settings
+    )
+    connection_id = await manager.connect(mock_websocket, "user-watcher")
+
+    accepted = manager.subscribe_presence(connection_id, ["a", "b", "c"])
+
+    assert accepted == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_presence_transition_carries_conversations(
+    connection_manager: ConnectionManager,
+    mock_redis: AsyncMock,
+    mock_websocket: AsyncMock,
+):
+    await connection_manager.connect(
+        mock_websocket, "user-1", conversation_ids=["conv-1"]
+    )
+
+    payload = mock_redis.run_script.call_args.kwargs["args"][3]
+    assert json.loads(payload)["conversation_ids"] == ["conv-1"]
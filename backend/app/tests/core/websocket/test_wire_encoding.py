@@ -0,0 +1,82 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.core.websocket import (
+    WIRE_ENCODINGS,
+    ConnectionManager,
+    decode_frame,
+    negotiate_encoding,
+)
+
+msgpack = pytest.importorskip("msgpack")
+
+
+def test_negotiate_prefers_subprotocol():
+    assert negotiate_encoding(["json", "msgpack"]) == ("msgpack", "msgpack")
+    assert negotiate_encoding(["json"], "msgpack") == ("json", "json")
+
+
+def test_negotiate_query_parameter_and_fallback():
+    assert negotiate_encoding([], "msgpack") == ("msgpack", None)
+    assert negotiate_encoding([], "cbor") == ("json", None)
+    assert negotiate_encoding(["v2.chat"]) == ("json", None)
+    assert WIRE_ENCODINGS[0] == "msgpack"
+
+
+def test_decode_frame():
+    message = {"type": "ping", "timestamp": "2024-01-01"}
+
+    assert decode_frame(json.dumps(message)) == message
+    assert decode_frame(msgpack.packb(message), "msgpack") == message
+    with pytest.raises(ValueError):
+        decode_frame(b"\xc1", "msgpack")
+    with pytest.raises(ValueError):
+        decode_frame("invalid json{")
+
+
+@pytest.mark.asyncio
+async def test_connect_accepts_negotiated_subprotocol(
+    connection_manager: ConnectionManager, mock_websocket: AsyncMock
+):
+    connection_id = await connection_manager.connect(
+        mock_websocket, "user-1", encoding="msgpack", subprotocol="msgpack"
+    )
+    await asyncio.sleep(0)
+
+    mock_websocket.accept.assert_awaited_once_with(subprotocol="msgpack")
+    assert connection_manager.connections[connection_id].encoding == "msgpack"
+    welcome = msgpack.unpackb(mock_websocket.send_bytes.call_args.args[0])
+    assert welcome["type"] == "connection_established"
+    assert welcome["encoding"] == "msgpack"
+    mock_websocket.send_text.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_broadcast_encodes_once_per_encoding(
+    connection_manager: ConnectionManager,
+):
+    json_sockets = [AsyncMock() for _ in range(3)]
+    binary_sockets = [AsyncMock() for _ in range(3)]
+    connection_ids = [
+        await connection_manager.connect(ws, f"user-{i}")
+        for i, ws in enumerate(json_sockets)
+    ] + [
+        await connection_manager.connect(ws, f"user-b{i}", encoding="msgpack")
+        for i, ws in enumerate(binary_sockets)
+    ]
+    await asyncio.sleep(0)
+    encode_count = connection_manager.encode_count
+
+    message = {"type": "new_message", "content": "hello"}
+    queued = connection_manager.broadcast(connection_ids, message)
+    await asyncio.sleep(0)
+
+    assert queued == 6
+    assert connection_manager.encode_count == encode_count + 2
+    for ws in json_sockets:
+        assert json.loads(ws.send_text.call_args.args[0]) == message
+    for ws in binary_sockets:
+        assert msgpack.unpackb(ws.send_bytes.call_args.args[0]) == message
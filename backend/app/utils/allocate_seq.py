@@ -0,0 +1,33 @@
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.conversations import Conversation
+
+
+async def allocate_seq(
+    db: AsyncSession,
+    conversation_id: UUID,
+    last_message_at: datetime,
+    count: int = 1,
+) -> int:
+    """
+    Reserve ``count`` consecutive message sequence numbers in a conversation.
+
+    The counter row stays locked until the transaction ends, so concurrent
+    writers get disjoint, gap-free ranges in commit order.
+
+    :return: First reserved sequence number
+    """
+    result = await db.execute(
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        .values(
+            last_seq=Conversation.last_seq + count,
+            last_message_at=last_message_at,
+        )
+        .returning(Conversation.last_seq)
+    )
+    return result.scalar_one() - count + 1
@@ -0,0 +1,16 @@
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.conversation_participants import ConversationParticipant
+
+
+async def get_user_conversation_ids(db: AsyncSession, user_id: UUID) -> set[str]:
+    """Return the IDs of every conversation the user participates in."""
+    result = await db.execute(
+        select(ConversationParticipant.conversation_id).where(
+            ConversationParticipant.user_id == user_id
+        )
+    )
+    return {str(row[0]) for row in result.fetchall()}
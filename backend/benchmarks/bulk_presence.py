@@ -0,0 +1,64 @@
+"""
+Bulk presence lookup latency benchmark.
+
+Times ``ConnectionManager.get_bulk_presence`` for growing contact lists.
+With the default settings the near cache is off, so every call goes to
+Redis.
+Requires a running Redis configured via the usual ``REDIS_*`` settings.
+
+Usage::
+
+    python -m benchmarks.bulk_presence --sizes 10 50 100 --rounds 200
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.core.redis import RedisClient
+from app.core.websocket import ConnectionManager
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+    return ordered[index]
+
+
+async def run(sizes: list[int], rounds: int):
+    redis = RedisClient()
+    await redis.connect()
+
+    manager = ConnectionManager(redis=redis)
+
+    user_ids = [f"bench-presence-{i}" for i in range(max(sizes))]
+    for user_id in user_ids[::2]:
+        await manager.set_user_online(user_id)
+
+    for size in sizes:
+        timings = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            await manager.get_bulk_presence(user_ids[:size])
+            timings.append((time.perf_counter() - started) * 1000)
+        print(
+            f"{size:>5} ids | mean {statistics.mean(timings):7.3f} ms | "
+            f"p99 {percentile(timings, 99):7.3f} ms"
+        )
+
+    for user_id in user_ids:
+        await redis.delete(f"user:presence:{user_id}")
+    await redis.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
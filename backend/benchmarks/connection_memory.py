@@ -0,0 +1,147 @@
+"""
+Memory footprint per idle WebSocket connection.
+
+Compares the bytes of connection state kept by ``ConnectionManager`` in the
+legacy layout (parallel dicts keyed by connection ID, with a timezone-aware
+``datetime`` per heartbeat) with one slotted ``Connection`` record per
+socket, and reports the total cost of ``ConnectionManager.connect``
+including the writer task. Runs entirely in-process; Redis calls are
+replaced by no-ops.
+
+Usage::
+
+    python -m benchmarks.connection_memory --connections 100000
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable
+
+from app.core.logger import get_logger
+from app.core.websocket import Connection, ConnectionManager, ConnectionWriter
+
+
+class NullRedis:
+    """Accepts every RedisClient call and returns nothing."""
+
+    def __getattr__(self, name):
+        async def noop(*args, **kwargs):
+            return None
+
+        return noop
+
+
+class NullWebSocket:
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000, reason: str | None = None):
+        pass
+
+    async def send_text(self, frame: str):
+        pass
+
+
+def make_writer(websocket: NullWebSocket, connection_id: str, logger):
+    return ConnectionWriter(
+        websocket, connection_id, logger=logger, on_overflow=lambda _: None
+    )
+
+
+def legacy_layout(count: int) -> list:
+    """State of ``count`` idle connections in the parallel-dict layout."""
+    logger = get_logger()
+    websocket = NullWebSocket()
+    active_connections = {}
+    writers = {}
+    heartbeat = {}
+    last_heartbeat = {}
+    connection_user = {}
+    connection_conversations = {}
+    for i in range(count):
+        connection_id = f"conn-{i:08d}"
+        active_connections[connection_id] = websocket
+        writers[connection_id] = make_writer(websocket, connection_id, logger)
+        heartbeat[connection_id] = datetime.now(timezone.utc)
+        last_heartbeat[connection_id] = time.monotonic()
+        connection_user[connection_id] = f"user-{i:08d}"
+        connection_conversations[connection_id] = set()
+    return [
+        active_connections,
+        writers,
+        heartbeat,
+        last_heartbeat,
+        connection_user,
+        connection_conversations,
+    ]
+
+
+def record_layout(count: int) -> dict[str, Connection]:
+    """State of ``count`` idle connections as slotted records."""
+    logger = get_logger()
+    websocket = NullWebSocket()
+    connections = {}
+    for i in range(count):
+        connection_id = f"conn-{i:08d}"
+        connections[connection_id] = Connection(
+            websocket,
+            f"user-{i:08d}",
+            make_writer(websocket, connection_id, logger),
+            time.monotonic(),
+        )
+    return connections
+
+
+def measure(build: Callable[[int], object], count: int) -> float:
+    """Bytes allocated per connection by ``build`` and still held."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    state = build(count)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del state
+    return (after - before) / count
+
+
+async def measure_connect(count: int) -> float:
+    """Bytes per connection held after ``ConnectionManager.connect``."""
+    manager = ConnectionManager(redis=NullRedis())
+    websocket = NullWebSocket()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        await manager.connect(
+            websocket, f"user-{i:08d}", connection_id=f"conn-{i:08d}"
+        )
+    await asyncio.sleep(0)  # let writer tasks flush connection_established
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    for connection in manager.connections.values():
+        connection.writer.close()
+    return (after - before) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--connections", type=int, default=100000)
+    args = parser.parse_args()
+    count = args.connections
+
+    legacy = measure(legacy_layout, count)
+    record = measure(record_layout, count)
+    connect = asyncio.run(measure_connect(count))
+
+    print(f"connections       : {count}")
+    print(f"parallel dicts    : {legacy:.0f} B/conn")
+    print(f"slotted record    : {record:.0f} B/conn")
+    print(f"saved             : {legacy - record:.0f} B/conn")
+    print(f"connect() total   : {connect:.0f} B/conn (incl. writer task)")
+
+
+if __name__ == "__main__":
+    main()
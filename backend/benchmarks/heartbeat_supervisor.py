@@ -0,0 +1,115 @@
+"""
+Heartbeat supervision cost benchmark.
+
+Compares the CPU spent per heartbeat interval by the legacy design (one
+checker task per connection, each scanning every connection) with the
+node-wide deadline heap behind ``ConnectionManager.expire_heartbeats``,
+which pops each connection roughly once per away threshold. Runs entirely
+in-process; Redis calls are replaced by no-ops.
+
+Usage::
+
+    python -m benchmarks.heartbeat_supervisor --connections 10000 50000 100000
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from app.core.websocket import ConnectionManager
+
+
+class NullRedis:
+    """Accepts every RedisClient call and returns nothing."""
+
+    def __getattr__(self, name):
+        async def noop(*args, **kwargs):
+            return None
+
+        return noop
+
+
+class NullWebSocket:
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000, reason: str | None = None):
+        pass
+
+    async def send_text(self, frame: str):
+        pass
+
+
+def legacy_scan(heartbeats: dict[str, datetime], timeout: int, away: int) -> int:
+    """Per-tick work of the old scan: every connection is inspected."""
+    now = datetime.now(timezone.utc)
+    flagged = 0
+    for _, last_heartbeat in list(heartbeats.items()):
+        elapsed = (now - last_heartbeat).total_seconds()
+        if elapsed > timeout or elapsed > away:
+            flagged += 1
+    return flagged
+
+
+async def run(connections: int, idle: int):
+    manager = ConnectionManager(redis=NullRedis())
+    socket = NullWebSocket()
+    for i in range(connections):
+        await manager.connect(socket, f"user-{i}", connection_id=f"conn-{i}")
+
+    settings = manager.settings
+
+    # Legacy: every connection's checker scanned all connections once
+    # per interval, so one interval costs ``connections`` scans.
+    heartbeats = {
+        connection_id: datetime.now(timezone.utc)
+        for connection_id in manager.connections
+    }
+    started = time.perf_counter()
+    legacy_scan(
+        heartbeats, settings.WS_HEARTBEAT_TIMEOUT, settings.WS_AWAY_THRESHOLD
+    )
+    legacy = (time.perf_counter() - started) * connections
+
+    # Heap: everyone heartbeated during the interval except ``idle``
+    # connections, then every away deadline comes due once.
+    base = time.monotonic() + 1
+    for connection in manager.connections.values():
+        connection.last_heartbeat = base
+    for i in range(idle):
+        manager.connections[f"conn-{i}"].last_heartbeat = base - 3600
+
+    started = time.perf_counter()
+    processed = await manager.expire_heartbeats(
+        now=base + settings.WS_AWAY_THRESHOLD - 1
+    )
+    heap = time.perf_counter() - started
+
+    for connection in manager.connections.values():
+        connection.writer.close()
+
+    print(
+        f"{connections:>7} conns | legacy {legacy:9.3f} s/interval | "
+        f"heap {heap * 1000:8.3f} ms/interval ({processed} deadlines)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--connections", type=int, nargs="+", default=[10000, 50000, 100000]
+    )
+    parser.add_argument(
+        "--idle",
+        type=int,
+        default=10,
+        help="Connections that stopped sending heartbeats",
+    )
+    args = parser.parse_args()
+    for connections in args.connections:
+        asyncio.run(run(connections, args.idle))
+
+
+if __name__ == "__main__":
+    main()
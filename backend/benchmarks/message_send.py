@@ -0,0 +1,148 @@
+"""
+Chat message send throughput benchmark.
+
+Compares sending over ``POST /messages/{conversation_id}`` (one transaction
+per request) with the WebSocket ``message`` handler, which persists through
+the group-commit ``MessageWriter``. Requires the Postgres database
+configured via the usual settings; a throwaway user and conversation are
+created and removed again.
+
+Usage::
+
+    python -m benchmarks.message_send --senders 50 --messages 20
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from unittest.mock import patch
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import delete
+
+from app.api.websockets.messages import handle_chat_message
+from app.core.database import AsyncSessionLocal
+from app.core.message_writer import MessageWriter
+from app.core.security import create_access_token, hash_password
+from app.main import app
+from app.models.conversation_participants import ConversationParticipant
+from app.models.conversations import Conversation
+from app.models.users import User
+
+
+async def seed() -> tuple[User, Conversation]:
+    async with AsyncSessionLocal() as db:
+        suffix = uuid.uuid4().hex[:8]
+        user = User(
+            username=f"bench-{suffix}",
+            email=f"bench-{suffix}@example.org",
+            password_hash=hash_password("bench"),
+            is_active=True,
+            activation_token="bench",
+        )
+        db.add(user)
+        await db.flush()
+
+        conversation = Conversation(type="group", created_by=user.id)
+        db.add(conversation)
+        await db.flush()
+        db.add(
+            ConversationParticipant(
+                conversation_id=conversation.id, user_id=user.id, role="admin"
+            )
+        )
+        await db.commit()
+        return user, conversation
+
+
+async def cleanup(user: User, conversation: Conversation):
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            delete(Conversation).where(Conversation.id == conversation.id)
+        )
+        await db.execute(delete(User).where(User.id == user.id))
+        await db.commit()
+
+
+async def send_http(
+    user: User, conversation: Conversation, senders: int, messages: int
+) -> float:
+    token = create_access_token(str(user.id))
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = ASGITransport(app=app)
+
+    async with AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def sender():
+            for i in range(messages):
+                response = await client.post(
+                    f"/api/v1/messages/{conversation.id}",
+                    json={"content": f"http {i}"},
+                    headers=headers,
+                )
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*[sender() for _ in range(senders)])
+        return time.perf_counter() - started
+
+
+async def send_ws(
+    user: User, conversation: Conversation, senders: int, messages: int
+) -> tuple[float, MessageWriter]:
+    writer = MessageWriter()
+    await writer.start()
+
+    async def sender(n: int):
+        for i in range(messages):
+            await handle_chat_message(
+                str(user.id),
+                f"bench-conn-{n}",
+                {
+                    "type": "message",
+                    "conversation_id": str(conversation.id),
+                    "content": f"ws {i}",
+                },
+            )
+
+    with patch("app.api.websockets.messages.message_writer", writer):
+        started = time.perf_counter()
+        await asyncio.gather(*[sender(n) for n in range(senders)])
+        elapsed = time.perf_counter() - started
+
+    await writer.stop()
+    return elapsed, writer
+
+
+async def run(senders: int, messages: int):
+    user, conversation = await seed()
+    total = senders * messages
+    try:
+        http_elapsed = await send_http(user, conversation, senders, messages)
+        ws_elapsed, writer = await send_ws(user, conversation, senders, messages)
+    finally:
+        await cleanup(user, conversation)
+
+    print(f"messages        : {total} ({senders} senders)")
+    print(f"http (msg/s)    : {total / http_elapsed:.0f}")
+    print(f"ws   (msg/s)    : {total / ws_elapsed:.0f}")
+    print(f"ws commits      : {writer.batches_committed}")
+    print(
+        "ws batch (avg)  : "
+        f"{writer.messages_committed / max(writer.batches_committed, 1):.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--senders", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.senders, args.messages))
+
+
+if __name__ == "__main__":
+    main()
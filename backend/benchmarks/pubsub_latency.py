@@ -0,0 +1,133 @@
+"""
+End-to-end publish-to-socket latency benchmark.
+
+Measures the time from ``broadcast_to_conversation`` until the event
+reaches ``send_text`` of every local socket that is a member of the
+conversation, and the delivered event throughput. Events travel through
+the node inbox transport selected with ``--transport`` (Redis pub/sub or
+streams with consumer groups). Requires a running Redis configured via
+the usual ``REDIS_*`` settings.
+
+Usage::
+
+    python -m benchmarks.pubsub_latency --events 2000 --sockets 50
+    python -m benchmarks.pubsub_latency --transport streams
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from app.core.config import get_settings
+from app.core.redis import RedisClient
+from app.core.websocket import ConnectionManager
+
+
+class FakeWebSocket:
+    """Records the latency of every event carrying a ``sent_at`` stamp."""
+
+    def __init__(self, latencies: list[float]):
+        self.latencies = latencies
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000, reason: str | None = None):
+        pass
+
+    async def send_text(self, frame: str):
+        sent_at = json.loads(frame).get("sent_at")
+        if sent_at is not None:
+            self.latencies.append(time.perf_counter() - sent_at)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+    return ordered[index]
+
+
+async def run(events: int, sockets: int, interval: float, transport: str):
+    redis = RedisClient()
+    await redis.connect()
+
+    settings = get_settings().model_copy(
+        update={"WS_EVENT_TRANSPORT": transport}
+    )
+    manager = ConnectionManager(redis=redis, settings=settings)
+    await manager.start_pubsub_listener()
+
+    latencies: list[float] = []
+    connections = []
+    for i in range(sockets):
+        user_id = f"bench-user-{i}"
+        connection_id = await manager.connect(
+            FakeWebSocket(latencies), user_id, conversation_ids=["bench-conv"]
+        )
+        connections.append((connection_id, user_id))
+
+    # Let the subscriptions settle before measuring
+    await asyncio.sleep(0.2)
+
+    started = time.perf_counter()
+    for _ in range(events):
+        await manager.broadcast_to_conversation(
+            "bench-conv", {"type": "bench", "sent_at": time.perf_counter()}
+        )
+        if interval:
+            await asyncio.sleep(interval)
+
+    expected = events * sockets
+    deadline = time.perf_counter() + 10
+    while len(latencies) < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+
+    for connection_id, user_id in connections:
+        await manager.disconnect(connection_id, user_id)
+    await manager.stop_pubsub_listener()
+    await redis.disconnect()
+
+    if not latencies:
+        print("No events received")
+        return
+
+    ms = [value * 1000 for value in latencies]
+    print(f"transport  : {transport}")
+    print(f"delivered  : {len(latencies)}/{expected} in {elapsed:.2f}s")
+    print(f"events/s   : {len(latencies) / elapsed:.0f}")
+    print(f"mean (ms)  : {statistics.mean(ms):.3f}")
+    print(f"p50 (ms)   : {percentile(ms, 50):.3f}")
+    print(f"p95 (ms)   : {percentile(ms, 95):.3f}")
+    print(f"p99 (ms)   : {percentile(ms, 99):.3f}")
+    print(f"max (ms)   : {max(ms):.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--sockets", type=int, default=10)
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.001,
+        help="Seconds between published events (0 = back to back)",
+    )
+    parser.add_argument(
+        "--transport",
+        choices=["pubsub", "streams", "both"],
+        default="pubsub",
+        help="Node inbox transport to measure",
+    )
+    args = parser.parse_args()
+    transports = (
+        ["pubsub", "streams"] if args.transport == "both" else [args.transport]
+    )
+    for transport in transports:
+        asyncio.run(run(args.events, args.sockets, args.interval, transport))
+
+
+if __name__ == "__main__":
+    main()
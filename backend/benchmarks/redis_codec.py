@@ -0,0 +1,103 @@
+"""
+Redis payload codec benchmark.
+
+Compares the codecs of app.core.codec (stdlib JSON, orjson, MessagePack)
+on the payloads nodes exchange through Redis: presence transitions on the
+``presence`` channel and conversation message events routed to node
+inboxes. Reports bytes per payload and CPU time to encode it and to decode
+it as read back with decode_responses (str), which is what the pub/sub
+and stream listeners receive. JSON is decoded by orjson whenever it is
+installed, whichever codec wrote it.
+
+Usage::
+
+    python -m benchmarks.redis_codec --payloads 20000
+"""
+
+import argparse
+import time
+import uuid
+from datetime import datetime, timezone
+
+from app.core.codec import CODECS
+
+
+def now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def presence_payload(i: int) -> dict:
+    return {
+        "message": {
+            "type": "presence_update",
+            "user_id": str(uuid.uuid4()),
+            "status": ("online", "away", "offline")[i % 3],
+            "last_seen": now(),
+        },
+        "conversation_ids": [str(uuid.uuid4()) for _ in range(1 + i % 8)],
+    }
+
+
+def message_payload(i: int) -> dict:
+    return {
+        "kind": "conversation",
+        "conversation_id": "5f0c6b8e-8d9f-4a57-9a6e-2f1b0c3d4e5f",
+        "message": {
+            "type": "new_message",
+            "seq": 1000 + i,
+            "message": {
+                "id": str(uuid.uuid4()),
+                "conversation_id": "5f0c6b8e-8d9f-4a57-9a6e-2f1b0c3d4e5f",
+                "sender_id": "0b7e2c1d-3f4a-4b5c-8d6e-7f8091a2b3c4",
+                "content": f"See you at the station at {i % 24}:30",
+                "message_type": "text",
+                "reply_to_message_id": None,
+                "is_edited": False,
+                "created_at": now(),
+            },
+        },
+        "exclude_user_id": "0b7e2c1d-3f4a-4b5c-8d6e-7f8091a2b3c4",
+    }
+
+
+def as_read(payload: str | bytes) -> str:
+    """A payload as returned by a client with decode_responses."""
+    if isinstance(payload, bytes):
+        return payload.decode("utf-8", "surrogateescape")
+    return payload
+
+
+def run(name: str, build, count: int):
+    values = [build(i) for i in range(count)]
+    print(f"{name} ({count} payloads)")
+    for codec in CODECS.values():
+        started = time.perf_counter()
+        payloads = [codec.dumps(value) for value in values]
+        encode_us = (time.perf_counter() - started) / count * 1e6
+
+        size = (
+            sum(len(p if isinstance(p, bytes) else p.encode()) for p in payloads)
+            / count
+        )
+        payloads = [as_read(payload) for payload in payloads]
+        started = time.perf_counter()
+        for payload in payloads:
+            codec.loads(payload)
+        decode_us = (time.perf_counter() - started) / count * 1e6
+
+        print(
+            f"  {codec.name:<8} {size:7.1f} B/payload | "
+            f"encode {encode_us:5.2f} us | decode {decode_us:5.2f} us"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--payloads", type=int, default=20000)
+    args = parser.parse_args()
+    run("presence", presence_payload, args.payloads)
+    run("message", message_payload, args.payloads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+WebSocket wire encoding benchmark.
+
+Compares JSON text frames with binary MessagePack frames for typical chat,
+presence and typing events: bytes per frame, with and without
+permessage-deflate (modelled as one raw DEFLATE stream with context
+takeover, flushed per frame), and CPU time to encode and decode a frame.
+
+Usage::
+
+    python -m benchmarks.wire_encoding --frames 20000
+"""
+
+import argparse
+import json
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+
+import msgpack
+
+
+def now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def chat_event(i: int) -> dict:
+    return {
+        "type": "new_message",
+        "seq": 1000 + i,
+        "message": {
+            "id": str(uuid.uuid4()),
+            "conversation_id": "5f0c6b8e-8d9f-4a57-9a6e-2f1b0c3d4e5f",
+            "sender_id": "0b7e2c1d-3f4a-4b5c-8d6e-7f8091a2b3c4",
+            "content": f"See you at the station at {i % 24}:30, bring tickets",
+            "message_type": "text",
+            "reply_to_message_id": None,
+            "is_edited": False,
+            "created_at": now(),
+        },
+    }
+
+
+def presence_event(i: int) -> dict:
+    return {
+        "type": "presence_update",
+        "user_id": str(uuid.uuid4()),
+        "status": ("online", "away", "offline")[i % 3],
+        "last_seen": now(),
+    }
+
+
+def typing_event(i: int) -> dict:
+    return {
+        "type": "typing_summary",
+        "conversation_id": "5f0c6b8e-8d9f-4a57-9a6e-2f1b0c3d4e5f",
+        "user_ids": [str(uuid.uuid4()) for _ in range(1 + i % 3)],
+    }
+
+
+ENCODINGS = {
+    "json": (
+        lambda message: json.dumps(
+            message, separators=(",", ":"), ensure_ascii=False
+        ).encode(),
+        json.loads,
+    ),
+    "msgpack": (msgpack.packb, msgpack.unpackb),
+}
+
+
+def deflated_size(frames: list[bytes]) -> int:
+    """Bytes on the wire with permessage-deflate and context takeover."""
+    compressor = zlib.compressobj(wbits=-15)
+    total = 0
+    for frame in frames:
+        data = compressor.compress(frame) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        # The trailing 00 00 ff ff of every flush is not transmitted
+        total += len(data) - 4
+    return total
+
+
+def run(name: str, build, count: int):
+    messages = [build(i) for i in range(count)]
+    print(f"{name} ({count} frames)")
+    for encoding, (encode, decode) in ENCODINGS.items():
+        started = time.perf_counter()
+        frames = [encode(message) for message in messages]
+        encode_us = (time.perf_counter() - started) / count * 1e6
+
+        started = time.perf_counter()
+        for frame in frames:
+            decode(frame)
+        decode_us = (time.perf_counter() - started) / count * 1e6
+
+        raw = sum(len(frame) for frame in frames) / count
+        deflated = deflated_size(frames) / count
+        print(
+            f"  {encoding:<8} {raw:7.1f} B/frame | deflate {deflated:6.1f} "
+            f"B/frame | encode {encode_us:5.2f} us | decode {decode_us:5.2f} us"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", type=int, default=20000)
+    args = parser.parse_args()
+    run("chat", chat_event, args.frames)
+    run("presence", presence_event, args.frames)
+    run("typing", typing_event, args.frames)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""add_message_sequence_numbers
+
+Revision ID: c7d9e2f4a813
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d9e2f4a813'
+down_revision: Union[str, Sequence[str], None] = 'a1b2c3d4e5f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'conversations',
+        sa.Column(
+            'last_seq', sa.BigInteger(), server_default='0', nullable=False
+        ),
+    )
+    op.add_column('messages', sa.Column('seq', sa.BigInteger(), nullable=True))
+
+    # Number existing messages in creation order per conversation
+    op.execute(
+        """
+        UPDATE messages AS m
+        SET seq = numbered.seq
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY conversation_id ORDER BY created_at, id
+            ) AS seq
+            FROM messages
+        ) AS numbered
+        WHERE m.id = numbered.id
+        """
+    )
+    op.execute(
+        """
+        UPDATE conversations AS c
+        SET last_seq = counts.last_seq
+        FROM (
+            SELECT conversation_id, MAX(seq) AS last_seq
+            FROM messages
+            GROUP BY conversation_id
+        ) AS counts
+        WHERE c.id = counts.conversation_id
+        """
+    )
+
+    op.create_index(
+        'idx_messages_conversation_seq',
+        'messages',
+        ['conversation_id', 'seq'],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_messages_conversation_seq', table_name='messages')
+    op.drop_column('messages', 'seq')
+    op.drop_column('conversations', 'last_seq')